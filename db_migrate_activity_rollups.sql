@@ -0,0 +1,47 @@
+-- ============================================================
+-- Migration: Incremental activity rollups
+-- Daily aggregates for /admin activity, folded from new egb_log ids
+-- by lib/activity_rollup.py (egb_rollup_state keeps the last folded id).
+-- The first run folds the whole existing log, in batches.
+-- ============================================================
+
+USE nosgoth_egb;
+
+-- ============================================================
+-- Step 1: Create the rollup tables
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS egb_rollup_state (
+    name VARCHAR(50) PRIMARY KEY,
+    last_log_id INT NOT NULL DEFAULT 0,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS egb_rollup_daily_actions (
+    day DATE NOT NULL,
+    action_code TINYINT UNSIGNED NOT NULL,
+    count INT NOT NULL DEFAULT 0,
+    successes INT NOT NULL DEFAULT 0,
+    amount_sum BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, action_code)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS egb_rollup_daily_attackers (
+    day DATE NOT NULL,
+    discord_id BIGINT NOT NULL,
+    count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, discord_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS egb_rollup_daily_levels (
+    day DATE NOT NULL,
+    level INT NOT NULL,
+    players INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, level)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- ============================================================
+-- Verify
+-- ============================================================
+
+SHOW TABLES LIKE 'egb_rollup_%';
@@ -0,0 +1,38 @@
+-- ============================================================
+-- Migration: Multi-instance mode
+-- egb_change_feed carries the cache invalidations between bot processes
+-- sharing this database (lib/change_feed.py); egb_leases elects the
+-- process that runs the maintenance jobs (lib/leader_lease.py).
+-- Only used with MULTI_INSTANCE=1; feed rows older than one hour are
+-- removed by the compactor.
+-- ============================================================
+
+USE nosgoth_egb;
+
+-- ============================================================
+-- Step 1: Create the tables
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS egb_change_feed (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    instance_id VARCHAR(64) NOT NULL,
+    guild_id BIGINT NOT NULL,
+    kind VARCHAR(20) NOT NULL,
+    discord_id BIGINT NULL,
+    payload JSON NULL,
+    created_at DATETIME(3) DEFAULT CURRENT_TIMESTAMP(3) NOT NULL,
+    INDEX idx_change_feed_created (created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS egb_leases (
+    name VARCHAR(50) PRIMARY KEY,
+    holder VARCHAR(64) NOT NULL,
+    expires_at DATETIME NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- ============================================================
+-- Verify
+-- ============================================================
+
+SHOW TABLES LIKE 'egb_change_feed';
+SHOW TABLES LIKE 'egb_leases';
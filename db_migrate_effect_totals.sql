@@ -0,0 +1,51 @@
+-- ============================================================
+-- Migration: Running effect totals on egb_character_bonuses
+-- /levelup and the sacrifice check used to SUM egb_character_effects
+-- on every read. The per-type sums are now maintained on write.
+-- ============================================================
+
+USE nosgoth_egb;
+
+-- ============================================================
+-- Step 1: Add the total columns
+-- ============================================================
+
+ALTER TABLE egb_character_bonuses
+    ADD COLUMN bless_total INT NOT NULL DEFAULT 0 AFTER shield_until,
+    ADD COLUMN curse_total INT NOT NULL DEFAULT 0 AFTER bless_total,
+    ADD COLUMN steal_bonus_total INT NOT NULL DEFAULT 0 AFTER curse_total,
+    ADD COLUMN steal_malus_total INT NOT NULL DEFAULT 0 AFTER steal_bonus_total;
+
+-- ============================================================
+-- Step 2: Make sure every player with effects has a bonus row
+-- ============================================================
+
+INSERT IGNORE INTO egb_character_bonuses (discord_id)
+SELECT DISTINCT discord_id FROM egb_character_effects;
+
+-- ============================================================
+-- Step 3: Backfill totals from existing effect rows
+-- ============================================================
+
+UPDATE egb_character_bonuses b
+INNER JOIN (
+    SELECT discord_id,
+           SUM(CASE WHEN effect_type = 'bless' THEN amount ELSE 0 END) AS bless_total,
+           SUM(CASE WHEN effect_type = 'curse' THEN amount ELSE 0 END) AS curse_total,
+           SUM(CASE WHEN effect_type = 'steal_bonus' THEN amount ELSE 0 END) AS steal_bonus_total,
+           SUM(CASE WHEN effect_type = 'steal_malus' THEN amount ELSE 0 END) AS steal_malus_total
+    FROM egb_character_effects
+    GROUP BY discord_id
+) e ON e.discord_id = b.discord_id
+SET b.bless_total = e.bless_total,
+    b.curse_total = e.curse_total,
+    b.steal_bonus_total = e.steal_bonus_total,
+    b.steal_malus_total = e.steal_malus_total;
+
+-- ============================================================
+-- Verify
+-- ============================================================
+
+SELECT 'players with effect totals' AS label, COUNT(*) AS count
+FROM egb_character_bonuses
+WHERE bless_total + curse_total + steal_bonus_total + steal_malus_total > 0;
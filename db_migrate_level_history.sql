@@ -0,0 +1,30 @@
+-- ============================================================
+-- Migration: Level history
+-- egb_level_history gets one compact row per level change (levelup,
+-- chaussette, pact propagation, sacrifice leveldown), written by the bot
+-- (lib/level_history.py) and read by /history with an indexed range on
+-- (guild_id, discord_id, day). Existing progression is not backfilled:
+-- egb_log does not record the new level of every levelup.
+-- ============================================================
+
+USE nosgoth_egb;
+
+-- ============================================================
+-- Step 1: Create the table
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS egb_level_history (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    guild_id BIGINT NOT NULL,
+    discord_id BIGINT NOT NULL,
+    day DATE NOT NULL,
+    level SMALLINT UNSIGNED NOT NULL,
+    cause TINYINT UNSIGNED NOT NULL,
+    INDEX idx_level_history_character_day (guild_id, discord_id, day)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- ============================================================
+-- Verify
+-- ============================================================
+
+SHOW TABLES LIKE 'egb_level_history';
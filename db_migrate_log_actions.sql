@@ -0,0 +1,93 @@
+-- ============================================================
+-- Migration: Structured action log
+-- egb_log.Action held free-form strings, so per-action analytics
+-- needed LIKE scans over TEXT. ElderGod.log now writes an action code
+-- (lib/log_actions.py), a target id and numeric amount/outcome columns.
+-- Readers of the old strings can use the egb_log_text view.
+-- ============================================================
+
+USE nosgoth_egb;
+
+-- ============================================================
+-- Step 1: Add the structured columns, make the legacy text optional
+-- ============================================================
+
+ALTER TABLE egb_log
+    ADD COLUMN ActionCode TINYINT UNSIGNED NOT NULL DEFAULT 0 AFTER LogTime,
+    ADD COLUMN TargetId BIGINT NULL AFTER ActionCode,
+    ADD COLUMN Amount INT NULL AFTER TargetId,
+    ADD COLUMN Outcome TINYINT(1) NULL AFTER Amount,
+    ADD COLUMN Details JSON NULL AFTER Outcome,
+    MODIFY COLUMN Action TEXT NULL,
+    ADD INDEX idx_log_action_time (ActionCode, LogTime);
+
+-- ============================================================
+-- Step 2: Backfill action codes of existing rows (one-time scan)
+-- The legacy text is kept: egb_log_text returns it as is.
+-- ============================================================
+
+UPDATE egb_log SET ActionCode = CASE
+        WHEN Action LIKE 'quote %' THEN 1
+        WHEN Action LIKE 'levelup attempt%' THEN 2
+        WHEN Action LIKE 'pact levelup from %' THEN 3
+        WHEN Action LIKE 'sacrifice leveldown by %' THEN 4
+        WHEN Action = 'chaussette' THEN 5
+        WHEN Action LIKE 'devour%' THEN 6
+        WHEN Action LIKE 'swim%' THEN 7
+        WHEN Action LIKE 'curse on %' THEN 8
+        WHEN Action LIKE 'evolve%' THEN 9
+        WHEN Action LIKE 'spectral%' THEN 10
+        WHEN Action LIKE 'entomb %' THEN 11
+        WHEN Action LIKE 'bless %' THEN 12
+        WHEN Action LIKE 'oppress %' THEN 13
+        WHEN Action LIKE 'steal %' THEN 14
+        WHEN Action LIKE 'sacrifice on %' THEN 15
+        WHEN Action LIKE 'shield%' THEN 16
+        WHEN Action LIKE 'pact accepted with %' THEN 17
+        WHEN Action LIKE 'pact declined from %' THEN 18
+        ELSE 0
+    END,
+    Outcome = CASE
+        WHEN Action = 'levelup attempt (success)' THEN 1
+        WHEN Action = 'levelup attempt (fail)' THEN 0
+        ELSE NULL
+    END
+WHERE ActionCode = 0 AND Action IS NOT NULL;
+
+-- ============================================================
+-- Step 3: Compatibility view with the legacy Action string
+-- ============================================================
+
+CREATE OR REPLACE VIEW egb_log_text AS
+SELECT id, DiscordId, LogTime,
+       COALESCE(Action, CASE ActionCode
+           WHEN 1 THEN CONCAT('quote ', JSON_UNQUOTE(JSON_EXTRACT(Details, '$.character')))
+           WHEN 2 THEN CONCAT('levelup attempt (', IF(Outcome, 'success', 'fail'), ')')
+           WHEN 3 THEN CONCAT('pact levelup from ', TargetId, ' (now level ', Amount, ')')
+           WHEN 4 THEN CONCAT('sacrifice leveldown by ', TargetId, ' (now level ', Amount, ')')
+           WHEN 5 THEN 'chaussette'
+           WHEN 6 THEN CONCAT('devour (+', Amount, '%)')
+           WHEN 7 THEN 'swim (bypass cooldown)'
+           WHEN 8 THEN CONCAT('curse on ', TargetId)
+           WHEN 9 THEN 'evolve (obtained wings)'
+           WHEN 10 THEN 'spectral (view leaderboard)'
+           WHEN 11 THEN CONCAT('entomb ', TargetId)
+           WHEN 12 THEN CONCAT('bless ', TargetId, ' (+', Amount, '%)')
+           WHEN 13 THEN CONCAT('oppress ', Amount, '% until ', JSON_UNQUOTE(JSON_EXTRACT(Details, '$.until')))
+           WHEN 14 THEN CONCAT('steal ', Amount, '% from ', TargetId)
+           WHEN 15 THEN CONCAT('sacrifice on ', TargetId)
+           WHEN 16 THEN CONCAT('shield (until ', JSON_UNQUOTE(JSON_EXTRACT(Details, '$.until')), ')')
+           WHEN 17 THEN CONCAT('pact accepted with ', TargetId)
+           WHEN 18 THEN CONCAT('pact declined from ', TargetId)
+       END) AS Action,
+       created_at
+FROM egb_log;
+
+-- ============================================================
+-- Verify
+-- ============================================================
+
+SELECT ActionCode, COUNT(*) AS count
+FROM egb_log
+GROUP BY ActionCode
+ORDER BY ActionCode;
@@ -0,0 +1,41 @@
+-- ============================================================
+-- Migration: Monthly partitions on egb_log
+-- egb_log grew without bound. It is now partitioned by month on LogTime,
+-- so old months can be exported and dropped in one fast statement
+-- (see lib/log_archiver.py and LOG_RETENTION_MONTHS).
+-- MANUAL STEP: adjust the dates below so that p_history ends at the first
+-- day of the current month; the bot creates the following months itself.
+-- ============================================================
+
+USE nosgoth_egb;
+
+-- ============================================================
+-- Step 1: Include LogTime in the primary key (required for partitioning)
+-- and drop idx_log_discord_id (covered by idx_log_discord_time)
+-- ============================================================
+
+ALTER TABLE egb_log
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (id, LogTime),
+    DROP INDEX idx_log_discord_id;
+
+-- ============================================================
+-- Step 2: Partition by month
+-- ============================================================
+
+ALTER TABLE egb_log
+PARTITION BY RANGE COLUMNS(LogTime) (
+    PARTITION p_history VALUES LESS THAN ('2026-10-01'),
+    PARTITION p202610 VALUES LESS THAN ('2026-11-01'),
+    PARTITION p202611 VALUES LESS THAN ('2026-12-01'),
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
+);
+
+-- ============================================================
+-- Verify
+-- ============================================================
+
+SELECT PARTITION_NAME, PARTITION_DESCRIPTION, TABLE_ROWS
+FROM information_schema.PARTITIONS
+WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'egb_log'
+ORDER BY PARTITION_ORDINAL_POSITION;
@@ -0,0 +1,152 @@
+-- ============================================================
+-- Migration: Multi-guild support
+-- Game state was keyed by discord_id only, so one bot process could
+-- serve a single server. Every state table now carries guild_id,
+-- with keys and indexes leading on it, and egb_log records GuildId.
+-- Existing rows belong to the guild the bot was running on:
+-- replace {{GUILD_ID}} below with the former GUILD_ID value.
+-- ============================================================
+
+USE nosgoth_egb;
+
+SET @guild_id = {{GUILD_ID}};
+
+-- ============================================================
+-- Step 1: Characters
+-- ============================================================
+
+ALTER TABLE egb_characters ADD COLUMN guild_id BIGINT NOT NULL DEFAULT 0 FIRST;
+UPDATE egb_characters SET guild_id = @guild_id;
+ALTER TABLE egb_characters
+    ALTER COLUMN guild_id DROP DEFAULT,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (guild_id, discord_id),
+    DROP INDEX idx_characters_level,
+    ADD INDEX idx_characters_level (guild_id, level DESC, last_successful_levelup ASC);
+
+-- ============================================================
+-- Step 2: Ability usage (cooldowns)
+-- ============================================================
+
+ALTER TABLE egb_ability_usage ADD COLUMN guild_id BIGINT NOT NULL DEFAULT 0 FIRST;
+UPDATE egb_ability_usage SET guild_id = @guild_id;
+ALTER TABLE egb_ability_usage
+    ALTER COLUMN guild_id DROP DEFAULT,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (guild_id, discord_id, ability_name),
+    DROP INDEX idx_ability_usage_discord_id,
+    DROP INDEX idx_ability_usage_ability,
+    ADD INDEX idx_ability_usage_ability (guild_id, ability_name, last_used);
+
+-- ============================================================
+-- Step 3: Bonuses and effects
+-- ============================================================
+
+ALTER TABLE egb_character_bonuses ADD COLUMN guild_id BIGINT NOT NULL DEFAULT 0 FIRST;
+UPDATE egb_character_bonuses SET guild_id = @guild_id;
+ALTER TABLE egb_character_bonuses
+    ALTER COLUMN guild_id DROP DEFAULT,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (guild_id, discord_id),
+    DROP INDEX idx_character_bonuses_discord_id;
+
+ALTER TABLE egb_character_effects ADD COLUMN guild_id BIGINT NOT NULL DEFAULT 0 AFTER id;
+UPDATE egb_character_effects SET guild_id = @guild_id;
+ALTER TABLE egb_character_effects
+    ALTER COLUMN guild_id DROP DEFAULT,
+    DROP INDEX idx_effects_discord_id,
+    DROP INDEX idx_effects_source,
+    DROP INDEX idx_effects_discord_type,
+    ADD INDEX idx_effects_source (guild_id, source_discord_id),
+    ADD INDEX idx_effects_discord_type (guild_id, discord_id, effect_type);
+
+-- ============================================================
+-- Step 4: Pacts and sacrifice links
+-- ============================================================
+
+ALTER TABLE egb_pacts ADD COLUMN guild_id BIGINT NOT NULL DEFAULT 0 AFTER id;
+UPDATE egb_pacts SET guild_id = @guild_id;
+ALTER TABLE egb_pacts
+    ALTER COLUMN guild_id DROP DEFAULT,
+    DROP INDEX idx_pacts_requester,
+    DROP INDEX idx_pacts_target,
+    DROP INDEX idx_pacts_status_expires,
+    ADD INDEX idx_pacts_requester (guild_id, requester_id),
+    ADD INDEX idx_pacts_target (guild_id, target_id),
+    ADD INDEX idx_pacts_status_expires (guild_id, status, expires_at);
+
+ALTER TABLE egb_sacrifice_links ADD COLUMN guild_id BIGINT NOT NULL DEFAULT 0 AFTER id;
+UPDATE egb_sacrifice_links SET guild_id = @guild_id;
+ALTER TABLE egb_sacrifice_links
+    ALTER COLUMN guild_id DROP DEFAULT,
+    DROP INDEX idx_sacrifice_victim,
+    DROP INDEX idx_sacrifice_caster,
+    ADD INDEX idx_sacrifice_victim (guild_id, victim_id, active),
+    ADD INDEX idx_sacrifice_caster (guild_id, caster_id);
+
+-- ============================================================
+-- Step 5: Log (GuildId 0 = no guild) and its text view
+-- ============================================================
+
+ALTER TABLE egb_log
+    ADD COLUMN GuildId BIGINT NOT NULL DEFAULT 0 AFTER id,
+    ADD INDEX idx_log_guild_time (GuildId, LogTime);
+UPDATE egb_log SET GuildId = @guild_id;
+
+CREATE OR REPLACE VIEW egb_log_text AS
+SELECT id, GuildId, DiscordId, LogTime,
+       COALESCE(Action, CASE ActionCode
+           WHEN 1 THEN CONCAT('quote ', JSON_UNQUOTE(JSON_EXTRACT(Details, '$.character')))
+           WHEN 2 THEN CONCAT('levelup attempt (', IF(Outcome, 'success', 'fail'), ')')
+           WHEN 3 THEN CONCAT('pact levelup from ', TargetId, ' (now level ', Amount, ')')
+           WHEN 4 THEN CONCAT('sacrifice leveldown by ', TargetId, ' (now level ', Amount, ')')
+           WHEN 5 THEN 'chaussette'
+           WHEN 6 THEN CONCAT('devour (+', Amount, '%)')
+           WHEN 7 THEN 'swim (bypass cooldown)'
+           WHEN 8 THEN CONCAT('curse on ', TargetId)
+           WHEN 9 THEN 'evolve (obtained wings)'
+           WHEN 10 THEN 'spectral (view leaderboard)'
+           WHEN 11 THEN CONCAT('entomb ', TargetId)
+           WHEN 12 THEN CONCAT('bless ', TargetId, ' (+', Amount, '%)')
+           WHEN 13 THEN CONCAT('oppress ', Amount, '% until ', JSON_UNQUOTE(JSON_EXTRACT(Details, '$.until')))
+           WHEN 14 THEN CONCAT('steal ', Amount, '% from ', TargetId)
+           WHEN 15 THEN CONCAT('sacrifice on ', TargetId)
+           WHEN 16 THEN CONCAT('shield (until ', JSON_UNQUOTE(JSON_EXTRACT(Details, '$.until')), ')')
+           WHEN 17 THEN CONCAT('pact accepted with ', TargetId)
+           WHEN 18 THEN CONCAT('pact declined from ', TargetId)
+       END) AS Action,
+       created_at
+FROM egb_log;
+
+-- ============================================================
+-- Step 6: Activity rollups
+-- ============================================================
+
+ALTER TABLE egb_rollup_daily_actions ADD COLUMN guild_id BIGINT NOT NULL DEFAULT 0 FIRST;
+UPDATE egb_rollup_daily_actions SET guild_id = @guild_id;
+ALTER TABLE egb_rollup_daily_actions
+    ALTER COLUMN guild_id DROP DEFAULT,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (guild_id, day, action_code);
+
+ALTER TABLE egb_rollup_daily_attackers ADD COLUMN guild_id BIGINT NOT NULL DEFAULT 0 FIRST;
+UPDATE egb_rollup_daily_attackers SET guild_id = @guild_id;
+ALTER TABLE egb_rollup_daily_attackers
+    ALTER COLUMN guild_id DROP DEFAULT,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (guild_id, day, discord_id);
+
+ALTER TABLE egb_rollup_daily_levels ADD COLUMN guild_id BIGINT NOT NULL DEFAULT 0 FIRST;
+UPDATE egb_rollup_daily_levels SET guild_id = @guild_id;
+ALTER TABLE egb_rollup_daily_levels
+    ALTER COLUMN guild_id DROP DEFAULT,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (guild_id, day, level);
+
+-- ============================================================
+-- Verify
+-- ============================================================
+
+SELECT guild_id, COUNT(*) AS characters FROM egb_characters GROUP BY guild_id;
+SHOW INDEX FROM egb_characters;
+SHOW INDEX FROM egb_ability_usage;
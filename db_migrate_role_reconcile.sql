@@ -0,0 +1,25 @@
+-- ============================================================
+-- Migration: Clan role reconciliation checkpoint
+-- egb_role_reconcile_state keeps, per guild, the last member id
+-- checked by a role reconciliation run that ran out of request
+-- budget (lib/role_reconciler.py). The next run resumes after it,
+-- on whichever instance serves the guild.
+-- ============================================================
+
+USE nosgoth_egb;
+
+-- ============================================================
+-- Step 1: Create the table
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS egb_role_reconcile_state (
+    guild_id BIGINT PRIMARY KEY,
+    last_member_id BIGINT NOT NULL,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- ============================================================
+-- Verify
+-- ============================================================
+
+SHOW TABLES LIKE 'egb_role_reconcile_state';
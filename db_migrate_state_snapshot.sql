@@ -0,0 +1,30 @@
+-- ============================================================
+-- Migration: Warm-restart snapshot
+-- On startup the bot loads out/state_snapshot.bin and re-reads only
+-- the rows changed since the snapshot was written (lib/state_snapshot.py).
+-- These indexes keep that reconciliation proportional to the changed
+-- rows rather than to the table size.
+-- ============================================================
+
+USE nosgoth_egb;
+
+-- ============================================================
+-- Step 1: Indexes on the change timestamps
+-- ============================================================
+
+ALTER TABLE egb_characters
+    ADD INDEX idx_characters_updated (guild_id, updated_at);
+
+ALTER TABLE egb_character_bonuses
+    ADD INDEX idx_bonuses_updated (guild_id, updated_at);
+
+ALTER TABLE egb_ability_usage
+    ADD INDEX idx_ability_usage_last_used (guild_id, last_used);
+
+-- ============================================================
+-- Verify
+-- ============================================================
+
+SHOW INDEX FROM egb_characters WHERE Key_name = 'idx_characters_updated';
+SHOW INDEX FROM egb_character_bonuses WHERE Key_name = 'idx_bonuses_updated';
+SHOW INDEX FROM egb_ability_usage WHERE Key_name = 'idx_ability_usage_last_used';
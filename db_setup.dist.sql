@@ -20,83 +20,111 @@ USE nosgoth_egb;
 SET NAMES utf8mb4;
 SET CHARACTER SET utf8mb4;
 
+-- Game state is scoped per guild: every state table carries guild_id and its keys and
+-- indexes lead on it, so a guild only ever reads its own rows.
+
 -- Table: egb_characters
 CREATE TABLE IF NOT EXISTS egb_characters (
-    discord_id BIGINT PRIMARY KEY,
+    guild_id BIGINT NOT NULL,
+    discord_id BIGINT NOT NULL,
     level INT DEFAULT 1 NOT NULL,
     last_attempt DATETIME NULL,
     last_successful_levelup DATE NULL,
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
     updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP NOT NULL,
-    INDEX idx_characters_level (level DESC, last_successful_levelup ASC),
+    PRIMARY KEY (guild_id, discord_id),
+    INDEX idx_characters_level (guild_id, level DESC, last_successful_levelup ASC),
+    INDEX idx_characters_updated (guild_id, updated_at),
     INDEX idx_characters_discord_id (discord_id)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- Table: egb_log
+-- Monthly RANGE partitions on LogTime. The bot creates upcoming months by splitting pmax,
+-- exports partitions older than LOG_RETENTION_MONTHS to out/ (gzip JSONL) and drops them.
 CREATE TABLE IF NOT EXISTS egb_log (
-    id INT AUTO_INCREMENT PRIMARY KEY,
+    id INT AUTO_INCREMENT,
+    GuildId BIGINT NOT NULL DEFAULT 0,  -- 0: no guild (rows written before multi-guild support)
     DiscordId BIGINT NOT NULL,
     LogTime DATETIME NOT NULL,
-    Action TEXT NOT NULL,
+    ActionCode TINYINT UNSIGNED NOT NULL DEFAULT 0,  -- lib/log_actions.py LogAction
+    TargetId BIGINT NULL,
+    Amount INT NULL,
+    Outcome TINYINT(1) NULL,
+    Details JSON NULL,
+    Action TEXT NULL,  -- legacy free-form text (rows written before ActionCode), read through egb_log_text
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
-    INDEX idx_log_discord_id (DiscordId),
+    PRIMARY KEY (id, LogTime),
     INDEX idx_log_time (LogTime DESC),
-    INDEX idx_log_discord_time (DiscordId, LogTime DESC)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+    INDEX idx_log_discord_time (DiscordId, LogTime DESC),
+    INDEX idx_log_action_time (ActionCode, LogTime),
+    INDEX idx_log_guild_time (GuildId, LogTime)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+PARTITION BY RANGE COLUMNS(LogTime) (
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
+);
 
 -- Table: egb_ability_usage
 CREATE TABLE IF NOT EXISTS egb_ability_usage (
+    guild_id BIGINT NOT NULL,
     discord_id BIGINT NOT NULL,
     ability_name VARCHAR(50) NOT NULL,
     last_used DATETIME NOT NULL,
-    PRIMARY KEY (discord_id, ability_name),
-    INDEX idx_ability_usage_discord_id (discord_id),
-    INDEX idx_ability_usage_ability (ability_name)
+    PRIMARY KEY (guild_id, discord_id, ability_name),
+    INDEX idx_ability_usage_ability (guild_id, ability_name, last_used),
+    INDEX idx_ability_usage_last_used (guild_id, last_used)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- Table: egb_character_bonuses
--- Single-source effects only. Multi-source effects (bless, curse, steal) live in egb_character_effects.
+-- Single-source effects. Multi-source effects (bless, curse, steal) live in egb_character_effects;
+-- their per-type sums are kept here (*_total) and updated in the same transaction as each effect insert.
 CREATE TABLE IF NOT EXISTS egb_character_bonuses (
-    discord_id BIGINT PRIMARY KEY,
+    guild_id BIGINT NOT NULL,
+    discord_id BIGINT NOT NULL,
     devour_bonus INT DEFAULT 0,
     swim_active BOOLEAN DEFAULT FALSE,
     leader_curse_until DATETIME NULL,
     oppression_malus INT DEFAULT 0,
     oppression_until DATETIME NULL,
     shield_until DATETIME NULL,
+    bless_total INT NOT NULL DEFAULT 0,
+    curse_total INT NOT NULL DEFAULT 0,
+    steal_bonus_total INT NOT NULL DEFAULT 0,
+    steal_malus_total INT NOT NULL DEFAULT 0,
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
     updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP NOT NULL,
-    INDEX idx_character_bonuses_discord_id (discord_id)
+    PRIMARY KEY (guild_id, discord_id),
+    INDEX idx_bonuses_updated (guild_id, updated_at)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- Table: egb_character_effects
 -- Tracks multi-source effects: bless, curse, steal_bonus, steal_malus.
--- One row per (source → target) interaction. Cleared after the target's next /levelup.
+-- One row per (source → target) interaction, kept for attribution. Cleared after the target's next /levelup.
 -- source_discord_id = -1 means unknown source (legacy migrated data).
 CREATE TABLE IF NOT EXISTS egb_character_effects (
     id INT AUTO_INCREMENT PRIMARY KEY,
+    guild_id BIGINT NOT NULL,
     discord_id BIGINT NOT NULL,
     source_discord_id BIGINT NOT NULL,
     effect_type ENUM('bless', 'curse', 'steal_bonus', 'steal_malus') NOT NULL,
     amount INT NOT NULL,
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-    INDEX idx_effects_discord_id (discord_id),
-    INDEX idx_effects_source (source_discord_id),
-    INDEX idx_effects_discord_type (discord_id, effect_type)
+    INDEX idx_effects_source (guild_id, source_discord_id),
+    INDEX idx_effects_discord_type (guild_id, discord_id, effect_type)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- Table: egb_pacts
 CREATE TABLE IF NOT EXISTS egb_pacts (
     id INT AUTO_INCREMENT PRIMARY KEY,
+    guild_id BIGINT NOT NULL,
     requester_id BIGINT NOT NULL,
     target_id BIGINT NOT NULL,
     status ENUM('active', 'expired', 'declined') NOT NULL DEFAULT 'active',
     accepted_at DATETIME NULL,
     expires_at DATETIME NULL,
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-    INDEX idx_pacts_requester (requester_id),
-    INDEX idx_pacts_target (target_id),
-    INDEX idx_pacts_status_expires (status, expires_at)
+    INDEX idx_pacts_requester (guild_id, requester_id),
+    INDEX idx_pacts_target (guild_id, target_id),
+    INDEX idx_pacts_status_expires (guild_id, status, expires_at)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- Table: egb_sacrifice_links
@@ -105,13 +133,122 @@ CREATE TABLE IF NOT EXISTS egb_pacts (
 -- One active link per victim (y) at a time.
 CREATE TABLE IF NOT EXISTS egb_sacrifice_links (
     id INT AUTO_INCREMENT PRIMARY KEY,
+    guild_id BIGINT NOT NULL,
     caster_id BIGINT NOT NULL,
     victim_id BIGINT NOT NULL,
     expires_at DATETIME NOT NULL,
     active BOOLEAN DEFAULT TRUE,
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-    INDEX idx_sacrifice_victim (victim_id, active),
-    INDEX idx_sacrifice_caster (caster_id)
+    INDEX idx_sacrifice_victim (guild_id, victim_id, active),
+    INDEX idx_sacrifice_caster (guild_id, caster_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- View: egb_log_text
+-- Rebuilds the legacy Action string from the structured columns (keep in sync with LogAction)
+CREATE OR REPLACE VIEW egb_log_text AS
+SELECT id, GuildId, DiscordId, LogTime,
+       COALESCE(Action, CASE ActionCode
+           WHEN 1 THEN CONCAT('quote ', JSON_UNQUOTE(JSON_EXTRACT(Details, '$.character')))
+           WHEN 2 THEN CONCAT('levelup attempt (', IF(Outcome, 'success', 'fail'), ')')
+           WHEN 3 THEN CONCAT('pact levelup from ', TargetId, ' (now level ', Amount, ')')
+           WHEN 4 THEN CONCAT('sacrifice leveldown by ', TargetId, ' (now level ', Amount, ')')
+           WHEN 5 THEN 'chaussette'
+           WHEN 6 THEN CONCAT('devour (+', Amount, '%)')
+           WHEN 7 THEN 'swim (bypass cooldown)'
+           WHEN 8 THEN CONCAT('curse on ', TargetId)
+           WHEN 9 THEN 'evolve (obtained wings)'
+           WHEN 10 THEN 'spectral (view leaderboard)'
+           WHEN 11 THEN CONCAT('entomb ', TargetId)
+           WHEN 12 THEN CONCAT('bless ', TargetId, ' (+', Amount, '%)')
+           WHEN 13 THEN CONCAT('oppress ', Amount, '% until ', JSON_UNQUOTE(JSON_EXTRACT(Details, '$.until')))
+           WHEN 14 THEN CONCAT('steal ', Amount, '% from ', TargetId)
+           WHEN 15 THEN CONCAT('sacrifice on ', TargetId)
+           WHEN 16 THEN CONCAT('shield (until ', JSON_UNQUOTE(JSON_EXTRACT(Details, '$.until')), ')')
+           WHEN 17 THEN CONCAT('pact accepted with ', TargetId)
+           WHEN 18 THEN CONCAT('pact declined from ', TargetId)
+       END) AS Action,
+       created_at
+FROM egb_log;
+
+-- Table: egb_rollup_state
+-- Incremental analytics: last egb_log id folded into the rollup tables
+CREATE TABLE IF NOT EXISTS egb_rollup_state (
+    name VARCHAR(50) PRIMARY KEY,
+    last_log_id INT NOT NULL DEFAULT 0,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Table: egb_rollup_daily_actions
+-- Per guild x day x action code: number of rows, successes (Outcome = 1) and sum of Amount
+CREATE TABLE IF NOT EXISTS egb_rollup_daily_actions (
+    guild_id BIGINT NOT NULL,
+    day DATE NOT NULL,
+    action_code TINYINT UNSIGNED NOT NULL,
+    count INT NOT NULL DEFAULT 0,
+    successes INT NOT NULL DEFAULT 0,
+    amount_sum BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (guild_id, day, action_code)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Table: egb_rollup_daily_attackers
+-- Per guild x day x player: offensive abilities used (curse, entomb, oppress, steal, sacrifice)
+CREATE TABLE IF NOT EXISTS egb_rollup_daily_attackers (
+    guild_id BIGINT NOT NULL,
+    day DATE NOT NULL,
+    discord_id BIGINT NOT NULL,
+    count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (guild_id, day, discord_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Table: egb_rollup_daily_levels
+-- Per guild x day x level: number of players (snapshot of the level distribution)
+CREATE TABLE IF NOT EXISTS egb_rollup_daily_levels (
+    guild_id BIGINT NOT NULL,
+    day DATE NOT NULL,
+    level INT NOT NULL,
+    players INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (guild_id, day, level)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Table: egb_level_history
+-- Append-only: one row per level change (lib/level_history.py LevelCause), read by /history
+CREATE TABLE IF NOT EXISTS egb_level_history (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    guild_id BIGINT NOT NULL,
+    discord_id BIGINT NOT NULL,
+    day DATE NOT NULL,
+    level SMALLINT UNSIGNED NOT NULL,
+    cause TINYINT UNSIGNED NOT NULL,
+    INDEX idx_level_history_character_day (guild_id, discord_id, day)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Table: egb_role_reconcile_state
+-- Clan role reconciliation: last member id checked by a run that ran out of budget, per guild
+CREATE TABLE IF NOT EXISTS egb_role_reconcile_state (
+    guild_id BIGINT PRIMARY KEY,
+    last_member_id BIGINT NOT NULL,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Table: egb_change_feed
+-- Multi-instance mode: cache invalidations written by one bot process, polled by id by the others
+CREATE TABLE IF NOT EXISTS egb_change_feed (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    instance_id VARCHAR(64) NOT NULL,
+    guild_id BIGINT NOT NULL,
+    kind VARCHAR(20) NOT NULL,
+    discord_id BIGINT NULL,
+    payload JSON NULL,
+    created_at DATETIME(3) DEFAULT CURRENT_TIMESTAMP(3) NOT NULL,
+    INDEX idx_change_feed_created (created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Table: egb_leases
+-- Multi-instance mode: time-bound leases (the background holder runs the maintenance jobs)
+CREATE TABLE IF NOT EXISTS egb_leases (
+    name VARCHAR(50) PRIMARY KEY,
+    holder VARCHAR(64) NOT NULL,
+    expires_at DATETIME NOT NULL
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- Table: egb_dim_characters
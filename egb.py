@@ -1,12 +1,17 @@
+import logging
 import os
 import discord
+import signal
 import sys
 from dotenv import load_dotenv
 from eldergod import ElderGod
+from lib.config import Config
+from lib.logging_setup import setup_logging
 
-def main():
+def main() -> int:
     """
-    Main entry point for the Discord bot
+    Main entry point for the Discord bot.
+    Returns the exit code: non-zero when the bot could not start or crashed (start_egb.py restarts it)
     """
     # Load environment variables
     load_dotenv()
@@ -18,14 +23,23 @@ def main():
         'DB_MDB_USER',
         'DB_MDB_USER_PWD',
         'CLAVARDEUR_ID',
-        'DEFAULT_LANGUAGE',
-        'GUILD_ID'
+        'DEFAULT_LANGUAGE'
     ]
 
     missing_vars = [var for var in required_vars if not os.getenv(var)]
     if missing_vars:
         print(f"ERROR: Missing required environment variables: {', '.join(missing_vars)}", file=sys.stderr)
-        return
+        return 1
+
+    try:
+        config = Config.from_env()
+    except ValueError as e:
+        print(f"ERROR: Invalid configuration - {e}", file=sys.stderr)
+        return 1
+
+    # Logging: records are written by a background thread (out/egb.log, JSON lines)
+    listener = setup_logging(config, os.path.join(os.path.dirname(__file__), "out"))
+    logger = logging.getLogger(__name__)
 
     # Setup intents
     intents = discord.Intents.default()
@@ -33,14 +47,26 @@ def main():
     intents.members = True          # For member join events
 
     # Create and run bot
-    bot = ElderGod(command_prefix='/', intents=intents)
+    bot = ElderGod(
+        command_prefix='/', intents=intents, config=config,
+        shard_count=config.shard_count, shard_ids=list(config.shard_ids) or None
+    )
+
+    # SIGTERM (supervisor, service manager) shuts down cleanly like Ctrl+C: bot.run() closes the bot
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
 
     try:
-        bot.run(os.getenv('DISCORD_TOKEN'))
+        # log_handler=None: discord.py logs go through our handlers instead of its own
+        bot.run(os.getenv('DISCORD_TOKEN'), log_handler=None)
     except discord.LoginFailure:
-        print("ERROR: Invalid Discord token", file=sys.stderr)
+        logger.error("Invalid Discord token")
+        return 1
     except Exception as e:
-        print(f"ERROR: Bot crashed - {e}", file=sys.stderr)
+        logger.critical(f"Bot crashed - {e}", exc_info=e)
+        return 1
+    finally:
+        listener.stop()
+    return 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -1,76 +1,172 @@
 import os
 import aiomysql
-import sys
+import asyncio
+import io
+import json
+import logging
+import math
+import signal
+import socket
+import time
 from datetime import datetime
 import discord
 from discord.ext import commands
 from discord import app_commands
 import typing
 from typing import Optional
-from lib.character import Character
-from lib.character_repository import CharacterRepository
 from lib.clan_system import ClanSystem
-from lib.ability_manager import AbilityManager
 from lib.ability_commands import AbilityCommands
-from lib.pact_manager import PactManager
-
-class ElderGod(commands.Bot):
+from lib.admin_commands import AdminCommands
+from lib.command_sync import CommandSync
+from lib.config import Config
+from dotenv import load_dotenv
+from lib.guild_state import GuildState
+from lib.level_history import LevelCause
+from lib.probability import ProbabilityEngine
+from lib.user_resolver import UserResolver
+from lib.expiry_scheduler import ExpiryScheduler
+from lib.compactor import Compactor
+from lib.log_archiver import LogArchiver
+from lib.log_actions import LogAction
+from lib.activity_rollup import ActivityRollup
+from lib.change_feed import ChangeFeed
+from lib.leader_lease import LeaderLease
+from lib.state_snapshot import StateSnapshot
+from lib.loop_monitor import LoopMonitor
+from lib.role_reconciler import RoleReconciler
+from lib.logging_setup import apply_levels, log_context
+
+logger = logging.getLogger(__name__)
+
+
+class LoggingCommandTree(app_commands.CommandTree):
+    """Command tree tagging every record logged while handling an interaction with its command and user"""
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        # Runs in the task of the command callback: the context follows it (contextvars)
+        log_context.set({
+            'command': interaction.command.qualified_name if interaction.command else None,
+            'user_id': interaction.user.id,
+            'guild_id': interaction.guild_id,
+        })
+        return True
+
+
+class ElderGod(commands.AutoShardedBot):
     """
     Main Discord bot class
-    Handles commands and coordinates between Discord API and business logic
+    Handles commands and coordinates between Discord API and business logic.
+    Game state is kept per guild (GuildState), so one process can serve several servers.
     """
 
     ALLOWED_LANGUAGES = ['en', 'fr']
+    WARM_UP_CONCURRENCY = 2  # guilds warmed up at the same time (each one streams 5 queries)
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, config: Optional[Config] = None, **kwargs):
+        kwargs.setdefault('tree_cls', LoggingCommandTree)
         super().__init__(*args, **kwargs)
+        self.config = config or Config.from_env()
+        self.probability = ProbabilityEngine.from_config(self.config)
+        ClanSystem.configure(self.config)
         self.mdb_con = None
-        self.character_repo = None
-        self.ability_manager = None
-        self.pact_manager = None
-        self.pending_pacts: set[int] = set()
+        self.guild_states: dict[int, GuildState] = {}
+        self.user_resolver = UserResolver(self)
+        self.expiry_scheduler = ExpiryScheduler(self)
+        self.compactor = None
+        self.log_archiver = None
+        self.activity_rollup = None
+        self.state_snapshot = None
+        self.loop_monitor = LoopMonitor(
+            alert_ms=self.config.loop_lag_alert_ms, watchdog_ms=self.config.loop_watchdog_ms,
+            heartbeat_path=os.path.join(os.path.dirname(__file__), "out", "egb.heartbeat")
+        )
+        self.role_reconciler = None
+        self.welcome_image: Optional[bytes] = None  # assets/welcome.png, read once in setup_hook
+        # Multi-instance mode: cache invalidation between processes and a lease for the background jobs
+        self.instance_id = self.config.instance_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.change_feed = None
+        self.leader_lease = None
         self.add_commands()
+        self.command_sync = CommandSync(
+            self.tree,
+            os.path.join(os.path.dirname(__file__), "out", "command_tree.json"),
+            guild_id=self.config.guild_id if self.config.command_sync_guild_only else None
+        )
         self.characters = []  # Cache for autocomplete
-        self._discord_characters = {}  # In-memory cache of Character objects
+        self._warmed_up = False
 
     async def on_member_join(self, member):
         """Event handler when a new member joins the server"""
         try:
-            channel_id = int(os.getenv('CLAVARDEUR_ID'))
-            channel = self.get_channel(channel_id)
-
-            if channel:
-                # Chemin relatif vers l'image (depuis la racine du projet)
-                image_path = os.path.join(os.path.dirname(__file__), "assets", "welcome.png")
-
-                file = discord.File(image_path, filename="welcome.png")
-                await channel.send(f"Bienvenue, {member.mention} !", file=file)
-        except FileNotFoundError:
-            print(f"Image not found at path: {image_path}", file=sys.stderr)
+            channel = self.get_channel(self.config.clavardeur_id)
+
+            # CLAVARDEUR_ID is a channel of one guild: other guilds get no welcome message
+            if channel and channel.guild.id == member.guild.id:
+                # Image read once at startup: no file I/O on the event loop for each join
+                if self.welcome_image:
+                    file = discord.File(io.BytesIO(self.welcome_image), filename="welcome.png")
+                    await channel.send(f"Bienvenue, {member.mention} !", file=file)
+                else:
+                    await channel.send(f"Bienvenue, {member.mention} !")
         except Exception as e:
-            print(f"Error in on_member_join: {e}", file=sys.stderr)
+            logger.error(f"Error in on_member_join: {e}")
 
     async def setup_hook(self):
         """Initialize database connection and repository"""
         if not self.mdb_con:
-            print("Setting up database connection...", file=sys.stdout)
+            logger.info("Setting up database connection...")
             try:
                 self.mdb_con = await aiomysql.create_pool(
-                    host = os.getenv('DB_MDB_HOST', 'localhost'),
-                    port=int(os.getenv('DB_MDB_PORT', '3306')),
-                    user=os.getenv('DB_MDB_USER'),
-                    password=os.getenv('DB_MDB_USER_PWD'),
-                    db=os.getenv('DB_MDB'),
+                    host=self.config.db_host,
+                    port=self.config.db_port,
+                    user=self.config.db_user,
+                    password=self.config.db_password,
+                    db=self.config.db_name,
                     autocommit=True
                 )
-                self.character_repo = CharacterRepository(self.mdb_con)
-                self.ability_manager = AbilityManager(self.mdb_con)
-                self.pact_manager = PactManager(self.mdb_con)
-                print("Database connected successfully!", file=sys.stdout)
+                self.compactor = Compactor(
+                    self.mdb_con,
+                    batch_size=self.config.compactor_batch_size,
+                    pause_seconds=self.config.compactor_pause_ms / 1000,
+                    change_feed=self.config.multi_instance
+                )
+                self.log_archiver = LogArchiver(
+                    self.mdb_con,
+                    os.path.join(os.path.dirname(__file__), "out"),
+                    retention_months=self.config.log_retention_months
+                )
+                self.activity_rollup = ActivityRollup(self.mdb_con)
+                self.role_reconciler = RoleReconciler(
+                    self, self.mdb_con,
+                    requests_per_minute=self.config.role_reconcile_requests_per_minute,
+                    budget=self.config.role_reconcile_budget
+                )
+                self.state_snapshot = StateSnapshot(
+                    self.mdb_con,
+                    os.path.join(os.path.dirname(__file__), "out", "state_snapshot.bin")
+                )
+                if self.config.multi_instance:
+                    self.change_feed = ChangeFeed(
+                        self.mdb_con, self.instance_id, self._apply_change,
+                        poll_interval=self.config.change_feed_poll_ms / 1000
+                    )
+                    self.leader_lease = LeaderLease(self.mdb_con, 'background', self.instance_id)
+                logger.info("Database connected successfully!")
             except Exception as e:
-                print(f"Error setting up database: {e}", file=sys.stderr)
+                logger.error(f"Error setting up database: {e}")
                 raise
 
+        self.loop_monitor.start()
+        if self.welcome_image is None:
+            self.welcome_image = await asyncio.to_thread(self._read_welcome_image)
+
+        # Hot reload of the configuration on SIGHUP (not available on Windows)
+        if hasattr(signal, 'SIGHUP'):
+            try:
+                asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, self._reload_config_from_signal)
+            except (NotImplementedError, RuntimeError):
+                pass
+
         @self.tree.error
         async def on_tree_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
             if isinstance(error, app_commands.NoPrivateMessage):
@@ -82,18 +178,182 @@ class ElderGod(commands.Bot):
                 except Exception:
                     pass
                 return
-            print(f"Unhandled tree error: {error}", file=sys.stderr)
+            logger.error(f"Unhandled tree error: {error}", exc_info=error)
+
+    async def on_app_command_completion(self, interaction: discord.Interaction, command):
+        """One structured record per completed command, with its latency since the interaction was created"""
+        latency = discord.utils.utcnow() - interaction.created_at
+        logger.info(
+            "Command completed",
+            extra={
+                'command': command.qualified_name, 'user_id': interaction.user.id,
+                'guild_id': interaction.guild_id, 'latency_ms': round(latency.total_seconds() * 1000),
+            }
+        )
+
+    @staticmethod
+    def _read_welcome_image() -> Optional[bytes]:
+        # Chemin relatif vers l'image (depuis la racine du projet)
+        image_path = os.path.join(os.path.dirname(__file__), "assets", "welcome.png")
+        try:
+            with open(image_path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            logger.warning(f"Image not found at path: {image_path}")
+            return None
 
     async def on_ready(self):
-        """Event handler when bot is ready"""
+        """Event handler when every shard is ready"""
+        if self._warmed_up:
+            # Gateway reconnect: caches are already warm
+            return
+
+        await asyncio.gather(self._sync_commands(), self.warm_up(), self.get_all_characters())
+        logger.info(f"{__name__} is up and ready on {len(self.guilds)} guild(s), {self.shard_count} shard(s)!")
+
+    async def on_guild_join(self, guild: discord.Guild):
+        """Warm up the game state of a guild the bot was just added to"""
+        if self._warmed_up:
+            await self._warm_up_guild(self.guild_state(guild.id))
+
+    async def on_guild_remove(self, guild: discord.Guild):
+        """Free the caches of a guild the bot left (its rows stay in the database)"""
+        self.guild_states.pop(guild.id, None)
+
+    def guild_state(self, guild_id: int) -> GuildState:
+        """Game state of a guild, created on first use (cold: reads fall back to the database)"""
+        state = self.guild_states.get(guild_id)
+        if state is None:
+            state = GuildState(self.mdb_con, guild_id, self.expiry_scheduler, self.change_feed)
+            self.guild_states[guild_id] = state
+        return state
+
+    async def _apply_change(self, guild_id: int, kind: str, discord_id: Optional[int], payload: Optional[dict]):
+        """Change written by another instance: only guilds with caches in this process are affected"""
+        state = self.guild_states.get(guild_id)
+        if state:
+            await state.apply_change(kind, discord_id, payload)
+
+    async def close(self):
+        """Stop background tasks before closing the connection to Discord"""
+        await self.expiry_scheduler.stop()
+        if self.state_snapshot:
+            await self.state_snapshot.stop()
+            if self._warmed_up and self.config.snapshot_interval_minutes:
+                # Freshest possible snapshot for the next start
+                try:
+                    await self.state_snapshot.save(list(self.guild_states.values()))
+                except Exception as e:
+                    logger.error(f"Error writing state snapshot: {e}")
+        if self.leader_lease:
+            await self.leader_lease.stop()
+        await self._stop_background_jobs()
+        if self.activity_rollup:
+            await self.activity_rollup.stop_levels()
+        if self.role_reconciler:
+            await self.role_reconciler.stop()
+        if self.change_feed:
+            await self.change_feed.stop()
+        await self.loop_monitor.stop()
+        await super().close()
+
+    async def _sync_commands(self):
+        """Sync the application command tree with Discord, only if it changed since the last sync"""
         try:
-            sc = await self.tree.sync()
-            print(f"Synced {len(sc)} commands globally", file=sys.stdout)
+            count = await self.command_sync.sync()
+            scope = f"to guild {self.command_sync.guild_id}" if self.command_sync.guild_id else "globally"
+            if count is None:
+                logger.info("Command tree unchanged, skipping sync")
+            else:
+                logger.info(f"Synced {count} commands {scope}")
         except Exception as e:
-            print(f"Error syncing commands: {e}", file=sys.stderr)
+            logger.error(f"Error syncing commands: {e}")
 
-        await self.get_all_characters()
-        print(f"{__name__} is up and ready!", file=sys.stdout)
+    async def warm_up(self):
+        """
+        Bulk-load the game state of every guild into the in-process caches (characters,
+        bonuses, effects, ability usage, active pacts, active sacrifice links), a few guilds
+        at a time; each guild only reads its own rows (indexes lead on guild_id).
+        Until a guild is warm, its reads fall back to the database.
+
+        Guilds found in the state snapshot are restored from it instead, re-reading only
+        the rows changed since it was written, so the time to ready does not grow with the tables.
+        """
+        start = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.WARM_UP_CONCURRENCY)
+        snapshot = None
+        if self.config.snapshot_interval_minutes:
+            snapshot = await asyncio.to_thread(self.state_snapshot.read)
+        mark, snapshot_guilds = snapshot or (None, {})
+        if self.change_feed:
+            # Changes written from now on are applied on top of the warm caches
+            await self.change_feed.prime()
+            self.change_feed.start()
+
+        async def warm(guild: discord.Guild):
+            async with semaphore:
+                await self._warm_up_guild(self.guild_state(guild.id), snapshot_guilds.get(guild.id), mark)
+
+        await asyncio.gather(*(warm(guild) for guild in self.guilds))
+        self._warmed_up = True
+        self.state_snapshot.start(lambda: list(self.guild_states.values()), self.config.snapshot_interval_minutes)
+        # Every instance expires the timed states of its guilds: each transition is a conditional
+        # UPDATE (or SELECT ... FOR UPDATE), so only one instance applies it and notifies
+        self.expiry_scheduler.start()
+        # Level distributions and role reconciliation need the guild's members and characters:
+        # every instance handles the guilds of its shards
+        self.activity_rollup.start_levels(self.get_all_levels)
+        self.role_reconciler.start(self.config.role_reconcile_interval_hours)
+        if self.leader_lease:
+            self.leader_lease.start(self._start_background_jobs, self._stop_background_jobs)
+        else:
+            await self._start_background_jobs()
+        logger.info(f"Warm-up of {len(self.guilds)} guild(s) done in {time.perf_counter() - start:.2f}s")
+
+    async def _start_background_jobs(self):
+        """Database maintenance jobs (only on the lease holder in multi-instance mode)"""
+        self.compactor.start(self.config.compactor_interval_hours)
+        self.log_archiver.start()
+        self.activity_rollup.start()
+
+    async def _stop_background_jobs(self):
+        """Stop the maintenance jobs (lease lost or shutdown)"""
+        if self.compactor:
+            await self.compactor.stop()
+        if self.log_archiver:
+            await self.log_archiver.stop()
+        if self.activity_rollup:
+            await self.activity_rollup.stop()
+
+    async def _warm_up_guild(self, state: GuildState, snapshot: Optional[dict] = None,
+                             since: Optional[datetime] = None):
+        """Load one guild's caches (from its snapshot if any) and schedule its timed states"""
+        start = time.perf_counter()
+        results, expiries = await asyncio.gather(
+            state.restore(snapshot, since) if snapshot else state.load_all(),
+            self.expiry_scheduler.load_guild(state),
+            return_exceptions=True
+        )
+        if isinstance(results, Exception):
+            results = {'game state': results}
+        results['expiries'] = expiries
+        for name, result in results.items():
+            if isinstance(result, Exception):
+                logger.error(f"Error warming up {name} of guild {state.guild_id}: {result}")
+
+        def fmt(name):
+            result = results.get(name)
+            if isinstance(result, Exception) or result is None:
+                return '?'
+            return '/'.join(map(str, result)) if isinstance(result, tuple) else str(result)
+
+        source = "snapshot + changed rows" if snapshot else "database"
+        logger.info(
+            f"Guild {state.guild_id} warmed up from {source} in {time.perf_counter() - start:.2f}s: "
+            f"{fmt('characters')} characters, {fmt('bonuses/effects')} bonuses/effects, "
+            f"{fmt('ability usage')} ability usages, {fmt('pacts')} pacts, "
+            f"{fmt('sacrifice links')} sacrifice links, {fmt('expiries')} scheduled expiries"
+        )
 
     def add_commands(self):
         """Register all slash commands"""
@@ -101,11 +361,14 @@ class ElderGod(commands.Bot):
         # Register ability commands
         AbilityCommands.register_commands(self)
 
+        # Register owner-only maintenance commands
+        AdminCommands.register_commands(self)
+
         # ===== QUOTE COMMAND =====
         @app_commands.guild_only()
         @self.tree.command(name="quote", description="Affiche une citation aléatoire de l'univers LoK")
         @app_commands.describe(character="Qui l'a dit ?")
-        @app_commands.describe(lang=f"Langue de la citation : en | fr. Par défaut : {os.getenv('DEFAULT_LANGUAGE', 'fr')}")
+        @app_commands.describe(lang=f"Langue de la citation : en | fr. Par défaut : {self.config.default_language}")
         async def quote(interaction: discord.Interaction, character: str, lang: Optional[str] = None):
             try:
                 lang = self._validate_language(lang)
@@ -113,7 +376,7 @@ class ElderGod(commands.Bot):
                 if await self.lok_character_exists(character, lang):
                     q = await self.get_random_quote(character, lang)
                     if q:
-                        clan_info = await self._get_user_clan_info(interaction.user.id)
+                        clan_info = await self._get_user_clan_info(interaction.guild_id, interaction.user.id)
                         embed = discord.Embed(
                             description=f'{q}\n\n*— {character}*',
                             color=clan_info['color']
@@ -130,11 +393,14 @@ class ElderGod(commands.Bot):
                         f'Personnage **{character}** introuvable'
                     )
 
-                await self.log(interaction.user.id, datetime.now(), f'quote {character}')
+                await self.log(
+                    interaction.guild_id, interaction.user.id, datetime.now(), LogAction.QUOTE,
+                    details={'character': character}
+                )
             except ValueError as e:
                 await self._send_error_embed(interaction, str(e))
             except Exception as e:
-                print(f"Error in quote command: {e}", file=sys.stderr)
+                logger.error(f"Error in quote command: {e}")
                 await self._send_error_embed(
                     interaction,
                     "Une erreur est survenue lors de la récupération de la citation"
@@ -163,38 +429,40 @@ class ElderGod(commands.Bot):
                 )
                 return
 
+            state = self.guild_state(interaction.guild_id)
+
+            # Fast rejection from cached state: cooldown and daily limit need no DB access
+            rejection = self._precheck_levelup(state, interaction.user.id)
+            if rejection:
+                try:
+                    character = state.characters[interaction.user.id]
+                    clan_info = ClanSystem.get_clan_by_level(character.get_level())
+                    embed = discord.Embed(
+                        title="🎲 Tentative de Level Up",
+                        description=rejection,
+                        color=clan_info['color']
+                    )
+                    await interaction.response.send_message(embed=embed, ephemeral=True)
+                    await self.log(interaction.guild_id, interaction.user.id, datetime.now(), LogAction.LEVELUP, outcome=False)
+                except Exception as e:
+                    logger.error(f"Error in levelup precheck: {e}")
+                return
+
             try:
                 await interaction.response.defer(ephemeral=True)
 
-                character = await self.get_or_create_character(interaction.user.id)
+                character = await state.get_or_create_character(interaction.user.id)
                 old_level = character.get_level()
 
                 # Get config from env
-                base_chance = int(os.getenv('BASE_LEVELUP_CHANCE', '20'))
-                bonus_per_hour = int(os.getenv('BONUS_PER_HOUR', '5'))
-                max_chance = int(os.getenv('MAX_LEVELUP_CHANCE', '80'))
-                cooldown_hours = int(os.getenv('LEVELUP_COOLDOWN_HOURS', '1'))
-
-                # Check for bonuses/penalties
-                async with self.mdb_con.acquire() as conn:
-                    async with conn.cursor(aiomysql.DictCursor) as cursor:
-                        await cursor.execute(
-                            'SELECT devour_bonus, swim_active, leader_curse_until, oppression_malus, oppression_until FROM egb_character_bonuses WHERE discord_id = %s',
-                            (interaction.user.id,)
-                        )
-                        bonuses = await cursor.fetchone()
-
-                async with self.mdb_con.acquire() as conn:
-                    async with conn.cursor(aiomysql.DictCursor) as cursor:
-                        await cursor.execute(
-                            '''SELECT effect_type, SUM(amount) as total
-                               FROM egb_character_effects
-                               WHERE discord_id = %s
-                               GROUP BY effect_type''',
-                            (interaction.user.id,)
-                        )
-                        effects_rows = await cursor.fetchall()
-                effects = {row['effect_type']: int(row['total']) for row in (effects_rows or [])}
+                config = self.config  # one snapshot for the whole attempt
+                base_chance = config.base_levelup_chance
+                bonus_per_hour = config.bonus_per_hour
+                max_chance = config.max_levelup_chance
+                cooldown_hours = config.levelup_cooldown_hours
+
+                # Check for bonuses/penalties (effect totals live on the same row)
+                bonuses = await state.bonus_manager.get_bonuses(interaction.user.id)
 
                 # Check for leader curse
                 if bonuses and bonuses.get('leader_curse_until'):
@@ -208,43 +476,19 @@ class ElderGod(commands.Bot):
                         return
 
                 # Apply bonuses
-                total_bonus = 0
-                has_swim = False
-
-                if bonuses:
-                    if bonuses.get('devour_bonus'):
-                        total_bonus += bonuses['devour_bonus']
-                    if bonuses.get('swim_active'):
-                        has_swim = True
-                    if bonuses.get('oppression_malus') and bonuses.get('oppression_until'):
-                        ou = bonuses['oppression_until']
-                        if ou > datetime.now():
-                            total_bonus += bonuses['oppression_malus']
-
-                total_bonus += effects.get('bless', 0)
-                total_bonus -= effects.get('curse', 0)
-                total_bonus += effects.get('steal_bonus', 0)
-                total_bonus -= effects.get('steal_malus', 0)
+                has_swim = bool(bonuses and bonuses.get('swim_active'))
+                total_bonus = ProbabilityEngine.flat_bonus(bonuses)
 
+                attempted, _ = character.can_attempt_levelup(cooldown_hours, has_swim)
                 success, message, probability = character.attempt_to_levelup(
                     base_chance, bonus_per_hour, max_chance, total_bonus, cooldown_hours, has_swim
                 )
 
-                await self.character_repo.save_character(character)
-                self._discord_characters[character.get_discord_id()] = character
+                await state.save_character(character, LevelCause.LEVELUP if success else None)
 
-                # Clear bonuses after use
-                async with self.mdb_con.acquire() as conn:
-                    async with conn.cursor() as cursor:
-                        await cursor.execute(
-                            'UPDATE egb_character_bonuses SET devour_bonus = 0, swim_active = FALSE WHERE discord_id = %s',
-                            (interaction.user.id,)
-                        )
-                        await cursor.execute(
-                            'DELETE FROM egb_character_effects WHERE discord_id = %s',
-                            (interaction.user.id,)
-                        )
-                        await conn.commit()
+                # Clear bonuses after use (a cooldown / daily limit rejection keeps them, like the precheck)
+                if attempted:
+                    await state.bonus_manager.consume_levelup_bonuses(interaction.user.id)
 
                 clan_info = ClanSystem.get_clan_by_level(character.get_level())
                 embed = discord.Embed(
@@ -313,12 +557,14 @@ class ElderGod(commands.Bot):
 
                 await interaction.followup.send(embed=embed, ephemeral=True)
                 await self.log(
+                    interaction.guild_id,
                     interaction.user.id,
                     datetime.now(),
-                    f'levelup attempt ({"success" if success else "fail"})'
+                    LogAction.LEVELUP,
+                    outcome=success
                 )
             except Exception as e:
-                print(f"Error in levelup command: {e}", file=sys.stderr)
+                logger.error(f"Error in levelup command: {e}")
                 await self._send_error_embed(
                     interaction,
                     "Une erreur est survenue lors de la tentative de level up",
@@ -337,7 +583,8 @@ class ElderGod(commands.Bot):
                 return
 
             try:
-                character = await self.get_or_create_character(interaction.user.id)
+                state = self.guild_state(interaction.guild_id)
+                character = await state.get_or_create_character(interaction.user.id)
                 clan_info = ClanSystem.get_clan_by_level(character.get_level())
                 has_bonusmalus = False
 
@@ -349,6 +596,7 @@ class ElderGod(commands.Bot):
                 embed.set_thumbnail(url=interaction.user.display_avatar.url)
 
                 embed.add_field(name="Niveau", value=f"**{character.get_level()}**", inline=True)
+                await self._add_rank_field(embed, state, character)
 
                 # Show clan role
                 clan_role = discord.utils.get(interaction.guild.roles, name=clan_info['name'])
@@ -357,7 +605,7 @@ class ElderGod(commands.Bot):
 
                 # Show wings role if Razielim
                 if clan_info['has_wings']:
-                    wings_role_name = os.getenv('ROLE_WINGS', 'Ailes')
+                    wings_role_name = self.config.role_wings
                     wings_role = discord.utils.get(interaction.guild.roles, name=wings_role_name)
                     if wings_role and wings_role in interaction.user.roles:
                         embed.add_field(name="✨ Ailes", value=wings_role.mention, inline=True)
@@ -378,31 +626,12 @@ class ElderGod(commands.Bot):
                     )
 
                 # Status and success chance
-                can_attempt, msg = character.can_attempt_levelup()
-                base_chance = int(os.getenv('BASE_LEVELUP_CHANCE', '20'))
-                bonus_per_hour = int(os.getenv('BONUS_PER_HOUR', '5'))
-                max_chance = int(os.getenv('MAX_LEVELUP_CHANCE', '80'))
-                success_chance = character.calculate_success_chance(base_chance, bonus_per_hour, max_chance)
+                can_attempt, msg = character.can_attempt_levelup(self.config.levelup_cooldown_hours)
+                success_chance = self.probability.time_chance(character.get_last_attempt())
 
                 # Get bonuses/penalties
-                async with self.mdb_con.acquire() as conn:
-                    async with conn.cursor(aiomysql.DictCursor) as cursor:
-                        await cursor.execute(
-                            'SELECT devour_bonus, swim_active, leader_curse_until, oppression_malus, oppression_until, shield_until FROM egb_character_bonuses WHERE discord_id = %s',
-                            (interaction.user.id,)
-                        )
-                        bonuses = await cursor.fetchone()
-
-                async with self.mdb_con.acquire() as conn:
-                    async with conn.cursor(aiomysql.DictCursor) as cursor:
-                        await cursor.execute(
-                            '''SELECT effect_type, amount, source_discord_id
-                               FROM egb_character_effects
-                               WHERE discord_id = %s
-                               ORDER BY effect_type, created_at''',
-                            (interaction.user.id,)
-                        )
-                        effects_rows = await cursor.fetchall()
+                bonuses = await state.bonus_manager.get_bonuses(interaction.user.id)
+                effects_rows = await state.bonus_manager.get_effects(interaction.user.id)
 
                 has_swim = bonuses and bonuses.get('swim_active')
                 if has_swim and not can_attempt:
@@ -411,7 +640,6 @@ class ElderGod(commands.Bot):
                     status_text = f"{msg}\nChance de succès : {success_chance:.1f}%"
 
                 # Display bonuses/penalties
-                total_bonus = 0
                 bonus_details = []
                 leader_cursed = False
                 has_bonusmalus = False
@@ -424,14 +652,12 @@ class ElderGod(commands.Bot):
                         bonus_details.append("🌊 Nage active (cooldown contourné)")
                         has_bonusmalus = True
                     if bonuses.get('devour_bonus'):
-                        total_bonus += bonuses['devour_bonus']
                         bonus_details.append(f"Devour: +{bonuses['devour_bonus']}%")
                         has_bonusmalus = True
 
                     if bonuses.get('oppression_until'):
                         oppression_until = bonuses['oppression_until']
                         if oppression_until > datetime.now():
-                            total_bonus += bonuses['oppression_malus']
                             bonus_details.append(f"Oppression: {bonuses['oppression_malus']}%")
                             has_bonusmalus = True
 
@@ -450,48 +676,44 @@ class ElderGod(commands.Bot):
                             effects_by_type[et] = []
                         effects_by_type[et].append(row)
 
+                    # Cache-only lookups: /stats answers without deferring
                     def get_member_name(source_id):
                         if source_id == -1:
                             return "Inconnu"
-                        member = interaction.guild.get_member(source_id)
-                        return member.display_name if member else f"#{source_id}"
+                        return self.user_resolver.cached_display_name(source_id, interaction.guild)
 
                     if 'bless' in effects_by_type:
                         parts = [f"{get_member_name(r['source_discord_id'])} (+{r['amount']}%)" for r in effects_by_type['bless']]
                         bless_total = sum(r['amount'] for r in effects_by_type['bless'])
-                        total_bonus += bless_total
                         bonus_details.append(f"Béni par: {', '.join(parts)} → **+{bless_total}%**")
                         has_bonusmalus = True
 
                     if 'curse' in effects_by_type:
                         parts = [f"{get_member_name(r['source_discord_id'])} (-{r['amount']}%)" for r in effects_by_type['curse']]
                         curse_total = sum(r['amount'] for r in effects_by_type['curse'])
-                        total_bonus -= curse_total
                         bonus_details.append(f"Maudit par: {', '.join(parts)} → **-{curse_total}%**")
                         has_bonusmalus = True
 
                     if 'steal_bonus' in effects_by_type:
                         parts = [f"volé sur {get_member_name(r['source_discord_id'])} (+{r['amount']}%)" for r in effects_by_type['steal_bonus']]
                         steal_bonus_total = sum(r['amount'] for r in effects_by_type['steal_bonus'])
-                        total_bonus += steal_bonus_total
                         bonus_details.append(f"Vol: {', '.join(parts)} → **+{steal_bonus_total}%**")
                         has_bonusmalus = True
 
                     if 'steal_malus' in effects_by_type:
                         parts = [f"par {get_member_name(r['source_discord_id'])} (-{r['amount']}%)" for r in effects_by_type['steal_malus']]
                         steal_malus_total = sum(r['amount'] for r in effects_by_type['steal_malus'])
-                        total_bonus -= steal_malus_total
                         bonus_details.append(f"Siphonné: {', '.join(parts)} → **-{steal_malus_total}%**")
                         has_bonusmalus = True
 
-                if leader_cursed:
-                    total_bonus = success_chance * -1
-
                 if bonus_details:
                     status_text += "\n\n**Effets actifs:**\n" + "\n".join(bonus_details)
 
                 if has_bonusmalus:
-                    status_text += f"\n**Chance totale: {min((success_chance + total_bonus), 100.0):.1f}%**"
+                    total_chance = self.probability.success_chance(
+                        character.get_last_attempt(), ProbabilityEngine.flat_bonus(bonuses), leader_cursed
+                    )
+                    status_text += f"\n**Chance totale: {total_chance:.1f}%**"
 
                 # Show bonus/maledictions
                 embed.add_field(
@@ -503,7 +725,7 @@ class ElderGod(commands.Bot):
                 # Show unlocked abilities
                 abilities = ClanSystem.get_unlocked_abilities(character.get_level())
                 if abilities:
-                    top_chars = await self.character_repo.get_top_characters(limit=1)
+                    top_chars = await state.get_top_characters(limit=1)
                     leader_id = top_chars[0].get_discord_id() if top_chars else None
                     is_leader = leader_id == interaction.user.id
 
@@ -512,7 +734,7 @@ class ElderGod(commands.Bot):
                         if a['command'] == '/oppress' and not is_leader:
                             continue
                         user_id = -1 if a['is_cooldown_global'] else interaction.user.id
-                        result = await self.ability_manager.can_use_ability(
+                        result = await state.ability_manager.can_use_ability(
                             user_id,
                             a['command'].replace('/',''),
                             a['cooldown_days'],
@@ -539,7 +761,7 @@ class ElderGod(commands.Bot):
 
                 await interaction.response.send_message(embed=embed, ephemeral=True)
             except Exception as e:
-                print(f"Error in stats command: {e}", file=sys.stderr)
+                logger.error(f"Error in stats command: {e}")
                 await self._send_error_embed(
                     interaction,
                     "Une erreur est survenue lors de la récupération des statistiques"
@@ -560,7 +782,8 @@ class ElderGod(commands.Bot):
                     )
                     return
 
-                character = await self.character_repo.get_character(target_user.id)
+                state = self.guild_state(interaction.guild_id)
+                character = await state.get_character(target_user.id)
                 if not character:
                     await self._send_error_embed(
                         interaction,
@@ -578,6 +801,7 @@ class ElderGod(commands.Bot):
                 embed.set_thumbnail(url=target_user.display_avatar.url)
 
                 embed.add_field(name="Niveau", value=f"**{character.get_level()}**", inline=True)
+                await self._add_rank_field(embed, state, character)
 
                 # Show clan role
                 clan_role = discord.utils.get(interaction.guild.roles, name=clan_info['name'])
@@ -586,14 +810,14 @@ class ElderGod(commands.Bot):
 
                 # Show wings if applicable
                 if clan_info['has_wings']:
-                    wings_role_name = os.getenv('ROLE_WINGS', 'Ailes')
+                    wings_role_name = self.config.role_wings
                     wings_role = discord.utils.get(interaction.guild.roles, name=wings_role_name)
                     if wings_role and wings_role in target_user.roles:
                         embed.add_field(name="✨ Ailes", value=wings_role.mention, inline=True)
 
                 await self._send_public(interaction, embed)
             except Exception as e:
-                print(f"Error in profile command: {e}", file=sys.stderr)
+                logger.error(f"Error in profile command: {e}")
                 await self._send_error_embed(
                     interaction,
                     "Une erreur est survenue lors de la récupération du profil"
@@ -605,7 +829,8 @@ class ElderGod(commands.Bot):
         If the member is in an active pact, give the partner a free level.
         Also updates the requester's embed to mention the pact partner got a level.
         """
-        partner_id = await self.pact_manager.get_active_pact_partner(member.id)
+        state = self.guild_state(member.guild.id)
+        partner_id = await state.pact_manager.get_active_pact_partner(member.id)
         if not partner_id:
             return
 
@@ -613,11 +838,10 @@ class ElderGod(commands.Bot):
         if not partner:
             return
 
-        partner_char = await self.get_or_create_character(partner_id)
+        partner_char = await state.get_or_create_character(partner_id)
         old_level = partner_char.get_level()
         partner_char._level_up()
-        await self.character_repo.save_character(partner_char)
-        self._discord_characters[partner_char.get_discord_id()] = partner_char
+        await state.save_character(partner_char, LevelCause.PACT)
         new_level = partner_char.get_level()
 
         # Handle clan change for partner
@@ -656,21 +880,30 @@ class ElderGod(commands.Bot):
             inline=False
         )
 
-        await self.log(partner_id, datetime.now(), f'pact levelup from {member.id} (now level {new_level})')
+        await self.log(member.guild.id, partner_id, datetime.now(), LogAction.PACT_LEVELUP, target_id=member.id, amount=new_level)
 
     # ===== CHARACTER MANAGEMENT =====
-    async def get_or_create_character(self, discord_id: int) -> Character:
-        """Get character from cache or database, create if doesn't exist"""
-        if discord_id in self._discord_characters:
-            return self._discord_characters[discord_id]
-
-        character = await self.character_repo.get_character(discord_id)
+    def _precheck_levelup(self, state: GuildState, discord_id: int) -> Optional[str]:
+        """
+        Check the levelup cooldown and daily limit from cached state only (no DB access).
+        Returns the rejection message, or None if the full attempt has to run
+        (attempt allowed, leader curse active, or character / swim flag not cached yet).
+        """
+        character = state.characters.get(discord_id)
+        has_swim = state.bonus_manager.get_cached_swim_flag(discord_id)
+        if character is None or has_swim is None:
+            return None
+        # The leader curse message comes first, as in the full path
+        curse_until = state.bonus_manager.get_cached_leader_curse(discord_id)
+        if curse_until and curse_until > datetime.now():
+            return None
 
-        if not character:
-            character = await self.character_repo.create_character(discord_id)
+        can_attempt, msg = character.can_attempt_levelup(self.config.levelup_cooldown_hours, has_swim)
+        return None if can_attempt else msg
 
-        self._discord_characters[discord_id] = character
-        return character
+    def get_all_levels(self) -> dict[int, list[int]]:
+        """Levels of every cached character, per guild (level distribution without a table scan)"""
+        return {guild_id: state.get_all_levels() for guild_id, state in self.guild_states.items()}
 
     # ===== ROLE MANAGEMENT =====
     async def _assign_clan_role(self, member: discord.Member, clan_info: dict) -> bool:
@@ -701,7 +934,7 @@ class ElderGod(commands.Bot):
             await member.add_roles(clan_role)
 
             # Handle wings role for Razielim
-            wings_role_name = os.getenv('ROLE_WINGS', 'Ailes')
+            wings_role_name = self.config.role_wings
             wings_role = discord.utils.get(guild.roles, name=wings_role_name)
 
             if clan_info['has_wings']:
@@ -722,7 +955,7 @@ class ElderGod(commands.Bot):
             return True
 
         except discord.Forbidden:
-            print(f"⚠️ Cannot assign role to {member.id} (insufficient permissions)", file=sys.stderr)
+            logger.warning(f"⚠️ Cannot assign role to {member.id} (insufficient permissions)")
             return False
 
     async def _send_admin_dm(self, user: discord.Member, clan_info: dict):
@@ -741,7 +974,7 @@ class ElderGod(commands.Bot):
 
             # Add wings info if applicable
             if clan_info['has_wings']:
-                wings_role_name = os.getenv('ROLE_WINGS', 'Ailes')
+                wings_role_name = self.config.role_wings
                 embed.add_field(
                     name="✨ Ailes",
                     value=f"N'oublie pas de t'attribuer également le rôle **{wings_role_name}** !",
@@ -750,38 +983,22 @@ class ElderGod(commands.Bot):
 
             await user.send(embed=embed)
         except discord.Forbidden:
-            print(f"Cannot send DM to {user.name}", file=sys.stderr)
+            logger.warning(f"Cannot send DM to {user.name}")
         except Exception as e:
-            print(f"Error sending admin DM: {e}", file=sys.stderr)
+            logger.error(f"Error sending admin DM: {e}")
 
-    async def _check_and_consume_shield(self, target_id: int) -> bool:
+    async def _check_and_consume_shield(self, guild_id: int, target_id: int) -> bool:
         """Check if target has an active shield and consume it. Returns True if blocked."""
-        async with self.mdb_con.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cursor:
-                await cursor.execute(
-                    'SELECT shield_until FROM egb_character_bonuses WHERE discord_id = %s',
-                    (target_id,)
-                )
-                row = await cursor.fetchone()
-        if row and row.get('shield_until') and row['shield_until'] > datetime.now():
-            async with self.mdb_con.acquire() as conn:
-                async with conn.cursor() as cursor:
-                    await cursor.execute(
-                        'UPDATE egb_character_bonuses SET shield_until = NULL WHERE discord_id = %s',
-                        (target_id,)
-                    )
-                    await conn.commit()
-            return True
-        return False
+        return await self.guild_state(guild_id).bonus_manager.consume_shield(target_id)
 
     async def _post_to_commands_channel(self, guild: discord.Guild, embed: discord.Embed) -> bool:
         """
         Post an embed directly to COMMANDS_CHANNEL_ID if configured.
         Returns True if posted, False if channel not configured or not found.
         """
-        commands_channel_id = os.getenv('COMMANDS_CHANNEL_ID', '').strip()
+        commands_channel_id = self.config.commands_channel_id
         if commands_channel_id:
-            channel = guild.get_channel(int(commands_channel_id))
+            channel = guild.get_channel(commands_channel_id)
             if channel:
                 await channel.send(embed=embed)
                 return True
@@ -797,16 +1014,23 @@ class ElderGod(commands.Bot):
         else:
             await interaction.response.send_message(embed=embed, ephemeral=False)
 
+    async def _add_rank_field(self, embed: discord.Embed, state: GuildState, character):
+        """Add the ranking position and percentile of a character to a stats/profile embed"""
+        rank = await state.get_rank(character)
+        if rank:
+            position, total = rank
+            percentile = max(1, math.ceil(position * 100 / total))
+            embed.add_field(name="Classement", value=f"**#{position}** / {total} (top {percentile}%)", inline=True)
+
     async def _has_player_role(self, member: discord.Member) -> bool:
         """Check if user has the 'Joueur' role"""
-        player_role_name = os.getenv('ROLE_PLAYER', 'Joueur')
-        player_role = discord.utils.get(member.guild.roles, name=player_role_name)
+        player_role = discord.utils.get(member.guild.roles, name=self.config.role_player)
         return player_role and player_role in member.roles
 
-    async def _get_user_clan_info(self, discord_id: int) -> dict:
-        """Get clan info for a user (for embed colors)"""
+    async def _get_user_clan_info(self, guild_id: Optional[int], discord_id: int) -> dict:
+        """Get clan info for a user in a guild (for embed colors)"""
         try:
-            character = await self.character_repo.get_character(discord_id)
+            character = await self.guild_state(guild_id).get_character(discord_id) if guild_id else None
             if character:
                 return ClanSystem.get_clan_by_level(character.get_level())
         except:
@@ -817,7 +1041,7 @@ class ElderGod(commands.Bot):
 
     async def _send_cd_msg_embed(self, interaction: discord.Interaction, message: str, followup: bool = False):
         """Send an error message as an embed"""
-        clan_info = await self._get_user_clan_info(interaction.user.id)
+        clan_info = await self._get_user_clan_info(interaction.guild_id, interaction.user.id)
         embed = discord.Embed(
             title="Le temps est un cercle",
             description=message,
@@ -833,7 +1057,7 @@ class ElderGod(commands.Bot):
 
     async def _send_error_embed(self, interaction: discord.Interaction, message: str, followup: bool = False):
         """Send an error message as an embed"""
-        clan_info = await self._get_user_clan_info(interaction.user.id)
+        clan_info = await self._get_user_clan_info(interaction.guild_id, interaction.user.id)
         embed = discord.Embed(
             title="❌ Erreur",
             description=message,
@@ -860,13 +1084,13 @@ class ElderGod(commands.Bot):
                     result = await cursor.fetchone()
                     return result[0] > 0
         except Exception as e:
-            print(f"Error checking character existence: {e}", file=sys.stderr)
+            logger.error(f"Error checking character existence: {e}")
             return False
 
     async def get_all_characters(self):
         """Load all character names for autocomplete"""
         try:
-            lang = os.getenv('DEFAULT_LANGUAGE', 'fr').lower()
+            lang = self.config.default_language
             lang = self._validate_language(lang)
 
             async with self.mdb_con.acquire() as conn:
@@ -877,9 +1101,9 @@ class ElderGod(commands.Bot):
                     resultset = await cursor.fetchall()
 
             self.characters = [row[0] for row in resultset]
-            print(f"Loaded {len(self.characters)} characters for autocomplete")
+            logger.info(f"Loaded {len(self.characters)} characters for autocomplete")
         except Exception as e:
-            print(f"Error loading characters: {e}", file=sys.stderr)
+            logger.error(f"Error loading characters: {e}")
 
     async def get_random_quote(self, character: str, lang: str) -> Optional[str]:
         """Get a random quote from a specific character"""
@@ -901,26 +1125,36 @@ class ElderGod(commands.Bot):
 
             return result[0] if result else None
         except Exception as e:
-            print(f"Error fetching quote: {e}", file=sys.stderr)
+            logger.error(f"Error fetching quote: {e}")
             return None
 
     # ===== UTILITY METHODS =====
-    async def log(self, user_id: int, time: datetime, action: str):
-        """Log user action to database"""
+    async def log(self, guild_id: Optional[int], user_id: int, time: datetime, action: LogAction,
+                  target_id: Optional[int] = None, amount: Optional[int] = None, outcome: Optional[bool] = None,
+                  details: Optional[dict] = None):
+        """
+        Log user action in a guild to database as a structured row
+        (the readable text is rebuilt by the egb_log_text view)
+        """
         try:
             async with self.mdb_con.acquire() as conn:
                 async with conn.cursor() as cursor:
                     await cursor.execute(
-                        'INSERT INTO egb_log(DiscordId, LogTime, Action) VALUES (%s, %s, %s)',
-                        (user_id, time, action)
+                        '''INSERT INTO egb_log(GuildId, DiscordId, LogTime, ActionCode, TargetId, Amount, Outcome, Details)
+                           VALUES (%s, %s, %s, %s, %s, %s, %s, %s)''',
+                        (
+                            guild_id or 0, user_id, time, int(action), target_id, amount,
+                            None if outcome is None else int(outcome),
+                            json.dumps(details, default=str) if details else None
+                        )
                     )
         except Exception as e:
-            print(f"Error logging action: {e}", file=sys.stderr)
+            logger.error(f"Error logging action: {e}")
 
     def _validate_language(self, lang: Optional[str]) -> str:
         """Validate and normalize language parameter"""
         if lang is None:
-            lang = os.getenv('DEFAULT_LANGUAGE', 'fr')
+            lang = self.config.default_language
 
         lang = lang.lower()
 
@@ -933,6 +1167,34 @@ class ElderGod(commands.Bot):
         """Get configuration value from environment"""
         return os.getenv(key, default)
 
+    def reload_config(self) -> Config:
+        """
+        Re-read .env, validate and swap the configuration in one assignment.
+        Raises ValueError and keeps the current configuration if the new one is invalid.
+        """
+        load_dotenv(override=True)
+        config = Config.from_env()
+        ClanSystem.configure(config)
+        self.probability = ProbabilityEngine.from_config(config)
+        self.loop_monitor.alert_ms = config.loop_lag_alert_ms  # the watchdog needs a restart
+        if self.role_reconciler:
+            self.role_reconciler.requests_per_minute = config.role_reconcile_requests_per_minute
+            self.role_reconciler.budget = config.role_reconcile_budget
+        apply_levels(config)
+        self.config = config
+        logger.info(
+            f"Configuration reloaded (levelup: base {config.base_levelup_chance}%, "
+            f"+{config.bonus_per_hour}%/h, max {config.max_levelup_chance}%, "
+            f"cooldown {config.levelup_cooldown_hours}h)"
+        )
+        return config
+
+    def _reload_config_from_signal(self):
+        try:
+            self.reload_config()
+        except ValueError as e:
+            logger.warning(f"Invalid configuration, keeping the current one: {e}")
+
     def get_clan_info_for_user(self, level: int) -> dict:
         """Get clan information for a given level"""
         return ClanSystem.get_clan_by_level(level)
@@ -945,19 +1207,13 @@ class ElderGod(commands.Bot):
         """
         try:
             # Check for active sacrifice link where this player is the caster
-            async with self.mdb_con.acquire() as conn:
-                async with conn.cursor(aiomysql.DictCursor) as cursor:
-                    await cursor.execute(
-                        '''SELECT id, victim_id FROM egb_sacrifice_links
-                           WHERE caster_id = %s AND active = TRUE AND expires_at > NOW()''',
-                        (caster_id,)
-                    )
-                    link = await cursor.fetchone()
+            state = self.guild_state(guild.id)
+            link = await state.sacrifice_manager.get_active_link_by_caster(caster_id)
 
             if not link:
                 return
 
-            probability = await self._compute_current_probability(caster_id)
+            probability = await self._compute_current_probability(guild.id, caster_id)
             if probability > 0:
                 return
 
@@ -966,27 +1222,20 @@ class ElderGod(commands.Bot):
             link_id = link['id']
 
             # Deactivate the link
-            async with self.mdb_con.acquire() as conn:
-                async with conn.cursor() as cursor:
-                    await cursor.execute(
-                        'UPDATE egb_sacrifice_links SET active = FALSE WHERE id = %s',
-                        (link_id,)
-                    )
-                    await conn.commit()
+            await state.sacrifice_manager.deactivate_link(link_id)
 
             # Apply 7-day immunity on victim
-            await self.ability_manager.use_ability(victim_id, 'sacrifice_victim')
+            await state.ability_manager.use_ability(victim_id, 'sacrifice_victim')
 
             # Level down the victim
-            victim_char = await self.get_or_create_character(victim_id)
+            victim_char = await state.get_or_create_character(victim_id)
             old_level = victim_char.get_level()
             if old_level <= 1:
                 # Can't go below 1 — still counts as triggered
                 pass
             else:
                 victim_char._level_down()
-                await self.character_repo.save_character(victim_char)
-                self._discord_characters[victim_char.get_discord_id()] = victim_char
+                await state.save_character(victim_char, LevelCause.SACRIFICE_LEVELDOWN)
                 new_level = victim_char.get_level()
 
                 # Handle clan role downgrade if needed
@@ -1047,58 +1296,20 @@ class ElderGod(commands.Bot):
             except Exception:
                 pass
 
-            await self.log(victim_id, datetime.now(), f'sacrifice leveldown by {caster_id} (now level {victim_char.get_level()})')
+            await self.log(guild.id, victim_id, datetime.now(), LogAction.SACRIFICE_LEVELDOWN, target_id=caster_id, amount=victim_char.get_level())
 
         except Exception as e:
-            print(f"Error in _check_sacrifice_trigger: {e}", file=sys.stderr)
+            logger.error(f"Error in _check_sacrifice_trigger: {e}")
 
-    async def _compute_current_probability(self, discord_id: int) -> float:
+    async def _compute_current_probability(self, guild_id: int, discord_id: int) -> float:
         """
-        Compute the full current levelup probability for a player,
+        Compute the full current levelup probability for a player of a guild,
         including all active bonuses/maluses (same logic as /levelup).
         """
-        base_chance = int(os.getenv('BASE_LEVELUP_CHANCE', '20'))
-        bonus_per_hour = int(os.getenv('BONUS_PER_HOUR', '5'))
-        max_chance = int(os.getenv('MAX_LEVELUP_CHANCE', '80'))
-
-        character = await self.get_or_create_character(discord_id)
-        probability = character.calculate_success_chance(base_chance, bonus_per_hour, max_chance)
-
-        async with self.mdb_con.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cursor:
-                await cursor.execute(
-                    'SELECT devour_bonus, oppression_malus, oppression_until FROM egb_character_bonuses WHERE discord_id = %s',
-                    (discord_id,)
-                )
-                bonuses = await cursor.fetchone()
-
-        async with self.mdb_con.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cursor:
-                await cursor.execute(
-                    '''SELECT effect_type, SUM(amount) as total
-                       FROM egb_character_effects
-                       WHERE discord_id = %s
-                       GROUP BY effect_type''',
-                    (discord_id,)
-                )
-                effects_rows = await cursor.fetchall()
-
-        effects = {row['effect_type']: int(row['total']) for row in (effects_rows or [])}
-        total_bonus = 0
-
-        if bonuses:
-            if bonuses.get('devour_bonus'):
-                total_bonus += bonuses['devour_bonus']
-            if bonuses.get('oppression_malus') and bonuses.get('oppression_until'):
-                if bonuses['oppression_until'] > datetime.now():
-                    total_bonus += bonuses['oppression_malus']
-
-        total_bonus += effects.get('bless', 0)
-        total_bonus -= effects.get('curse', 0)
-        total_bonus += effects.get('steal_bonus', 0)
-        total_bonus -= effects.get('steal_malus', 0)
-
-        return max(min(probability + total_bonus, 100.0), 0.0)
+        state = self.guild_state(guild_id)
+        character = await state.get_or_create_character(discord_id)
+        bonuses = await state.bonus_manager.get_bonuses(discord_id)
+        return self.probability.success_chance(character.get_last_attempt(), ProbabilityEngine.flat_bonus(bonuses))
 
     def has_clan_changed(self, old_level: int, new_level: int) -> bool:
         """Check if clan changed between levels"""
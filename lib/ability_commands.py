@@ -1,12 +1,15 @@
-import os
 import discord
-import aiomysql
 from discord import app_commands
 from datetime import datetime
 from datetime import timedelta
 from .clan_system import ClanSystem
+from .level_history import LevelCause
+from .log_actions import LogAction
+from typing import Optional
 import random
-import sys
+import logging
+
+logger = logging.getLogger(__name__)
 
 class AbilityCommands:
     """
@@ -21,12 +24,13 @@ class AbilityCommands:
         @app_commands.guild_only()
         @bot.tree.command(name="chaussette", description="Crier CHAUSSETTE pour un level gratuit par semaine")
         async def chaussette(interaction: discord.Interaction):
+            state = bot.guild_state(interaction.guild_id)
             if not await bot._has_player_role(interaction.user):
                 await bot._send_error_embed(interaction, "Tu dois avoir le rôle **Joueur**.")
                 return
             
             try:
-                character = await bot.get_or_create_character(interaction.user.id)
+                character = await state.get_or_create_character(interaction.user.id)
                 
                 # Check level requirement
                 if character.get_level() < 5:
@@ -37,7 +41,7 @@ class AbilityCommands:
                     return
                 
                 # Check cooldown (once per week)
-                can_use, msg = await bot.ability_manager.can_use_ability(
+                can_use, msg = await state.ability_manager.can_use_ability(
                     interaction.user.id, 
                     'chaussette', 
                     cooldown_days=7
@@ -49,23 +53,12 @@ class AbilityCommands:
 
                 # Level up !
                 character._level_up()
-                await bot.character_repo.save_character(character)
-                bot._discord_characters[character.get_discord_id()] = character
+                await state.save_character(character, LevelCause.CHAUSSETTE)
 
                 # Clear bonuses after use
-                async with bot.mdb_con.acquire() as conn:
-                    async with conn.cursor() as cursor:
-                        await cursor.execute(
-                            'UPDATE egb_character_bonuses SET devour_bonus = 0, swim_active = FALSE WHERE discord_id = %s',
-                            (interaction.user.id,)
-                        )
-                        await cursor.execute(
-                            'DELETE FROM egb_character_effects WHERE discord_id = %s',
-                            (interaction.user.id,)
-                        )
-                        await conn.commit()
+                await state.bonus_manager.consume_levelup_bonuses(interaction.user.id)
 
-                await bot.ability_manager.use_ability(interaction.user.id, 'chaussette')
+                await state.ability_manager.use_ability(interaction.user.id, 'chaussette')
                 
                 clan_info = bot.get_clan_info_for_user(character.get_level())
                 embed = discord.Embed(
@@ -109,22 +102,23 @@ class AbilityCommands:
                 
                 await bot._apply_pact_level(interaction.user, embed)
                 await interaction.response.send_message(embed=embed, ephemeral=True)
-                await bot.log(interaction.user.id, datetime.now(), f'chaussette')
+                await bot.log(interaction.guild_id, interaction.user.id, datetime.now(), LogAction.CHAUSSETTE)
                 
             except Exception as e:
-                print(f"Error in chaussette command: {e}")
+                logger.error(f"Error in chaussette command: {e}")
                 await bot._send_error_embed(interaction, "Une erreur est survenue.")
 
         # ===== DEVOUR (Level 5+) =====
         @app_commands.guild_only()
         @bot.tree.command(name="devour", description="Dévorer les âmes pour un bonus d'XP")
         async def devour(interaction: discord.Interaction):
+            state = bot.guild_state(interaction.guild_id)
             if not await bot._has_player_role(interaction.user):
                 await bot._send_error_embed(interaction, "Tu dois avoir le rôle **Joueur**.")
                 return
             
             try:
-                character = await bot.get_or_create_character(interaction.user.id)
+                character = await state.get_or_create_character(interaction.user.id)
                 
                 # Check level requirement
                 if character.get_level() < 5:
@@ -135,7 +129,7 @@ class AbilityCommands:
                     return
                 
                 # Check cooldown (once per day)
-                can_use, msg = await bot.ability_manager.can_use_ability(
+                can_use, msg = await state.ability_manager.can_use_ability(
                     interaction.user.id, 
                     'devour', 
                     cooldown_days=1
@@ -149,31 +143,15 @@ class AbilityCommands:
                 bonus = random.randint(3, 8)
                 
                 # Store bonus in character
-                async with bot.mdb_con.acquire() as conn:
-                    async with conn.cursor() as cursor:
-                        await cursor.execute(
-                            '''INSERT INTO egb_character_bonuses (discord_id, devour_bonus)
-                               VALUES (%s, %s)
-                               ON DUPLICATE KEY UPDATE 
-                               devour_bonus = devour_bonus + %s''',
-                            (character.get_discord_id(), bonus, bonus)
-                        )
+                await state.bonus_manager.add_devour_bonus(character.get_discord_id(), bonus)
                 
-                await bot.ability_manager.use_ability(interaction.user.id, 'devour')
+                await state.ability_manager.use_ability(interaction.user.id, 'devour')
 
-                partner_id = await bot.pact_manager.get_active_pact_partner(interaction.user.id)
+                partner_id = await state.pact_manager.get_active_pact_partner(interaction.user.id)
                 if partner_id:
-                    async with bot.mdb_con.acquire() as conn:
-                        async with conn.cursor() as cursor:
-                            await cursor.execute(
-                                '''INSERT INTO egb_character_bonuses (discord_id, devour_bonus)
-                                   VALUES (%s, %s)
-                                   ON DUPLICATE KEY UPDATE devour_bonus = devour_bonus + %s''',
-                                (partner_id, bonus, bonus)
-                            )
-                            await conn.commit()
+                    await state.bonus_manager.add_devour_bonus(partner_id, bonus)
                     try:
-                        partner_user = await bot.fetch_user(partner_id)
+                        partner_user = await bot.user_resolver.resolve(partner_id, interaction.guild)
                         await partner_user.send(embed=discord.Embed(
                             title="🩸 Pacte de Sang — Dévoration",
                             description=f"Ton pacte avec **{interaction.user.display_name}** t'a transmis un bonus de dévoration (**+{bonus}%**) pour ton prochain levelup !",
@@ -190,22 +168,23 @@ class AbilityCommands:
                 )
                 
                 await interaction.response.send_message(embed=embed, ephemeral=True)
-                await bot.log(interaction.user.id, datetime.now(), f'devour (+{bonus}%)')
+                await bot.log(interaction.guild_id, interaction.user.id, datetime.now(), LogAction.DEVOUR, amount=bonus)
                 
             except Exception as e:
-                print(f"Error in devour command: {e}")
+                logger.error(f"Error in devour command: {e}")
                 await bot._send_error_embed(interaction, "Une erreur est survenue.")
         
         # ===== SWIM (Level 20+) =====
         @app_commands.guild_only()
         @bot.tree.command(name="swim", description="Contourner le cooldown quotidien une fois par semaine")
         async def swim(interaction: discord.Interaction):
+            state = bot.guild_state(interaction.guild_id)
             if not await bot._has_player_role(interaction.user):
                 await bot._send_error_embed(interaction, "Tu dois avoir le rôle **Joueur**.")
                 return
             
             try:
-                character = await bot.get_or_create_character(interaction.user.id)
+                character = await state.get_or_create_character(interaction.user.id)
                 
                 if character.get_level() < 20:
                     await bot._send_error_embed(
@@ -224,7 +203,7 @@ class AbilityCommands:
                     return
                 
                 # Check weekly cooldown
-                can_use, cooldown_msg = await bot.ability_manager.can_use_ability(
+                can_use, cooldown_msg = await state.ability_manager.can_use_ability(
                     interaction.user.id,
                     'swim',
                     cooldown_days=7
@@ -235,30 +214,15 @@ class AbilityCommands:
                     return
                 
                 # Grant swim bonus (bypasses cooldowns on next attempt)
-                async with bot.mdb_con.acquire() as conn:
-                    async with conn.cursor() as cursor:
-                        await cursor.execute(
-                            '''INSERT INTO egb_character_bonuses (discord_id, swim_active)
-                               VALUES (%s, TRUE)
-                               ON DUPLICATE KEY UPDATE swim_active = TRUE''',
-                            (character.get_discord_id(),)
-                        )
-                
-                await bot.ability_manager.use_ability(interaction.user.id, 'swim')
+                await state.bonus_manager.activate_swim(character.get_discord_id())
+
+                await state.ability_manager.use_ability(interaction.user.id, 'swim')
 
-                partner_id = await bot.pact_manager.get_active_pact_partner(interaction.user.id)
+                partner_id = await state.pact_manager.get_active_pact_partner(interaction.user.id)
                 if partner_id:
-                    async with bot.mdb_con.acquire() as conn:
-                        async with conn.cursor() as cursor:
-                            await cursor.execute(
-                                '''INSERT INTO egb_character_bonuses (discord_id, swim_active)
-                                   VALUES (%s, TRUE)
-                                   ON DUPLICATE KEY UPDATE swim_active = TRUE''',
-                                (partner_id,)
-                            )
-                            await conn.commit()
+                    await state.bonus_manager.activate_swim(partner_id)
                     try:
-                        partner_user = await bot.fetch_user(partner_id)
+                        partner_user = await bot.user_resolver.resolve(partner_id, interaction.guild)
                         await partner_user.send(embed=discord.Embed(
                             title="🌊 Pacte de Sang — Nage",
                             description=f"Ton pacte avec **{interaction.user.display_name}** t'a transmis le bonus de nage !\nTu peux contourner le cooldown de levelup sur ta prochaine tentative.",
@@ -275,10 +239,10 @@ class AbilityCommands:
                 )
                 
                 await interaction.response.send_message(embed=embed, ephemeral=True)
-                await bot.log(interaction.user.id, datetime.now(), 'swim (bypass cooldown)')
+                await bot.log(interaction.guild_id, interaction.user.id, datetime.now(), LogAction.SWIM)
                 
             except Exception as e:
-                print(f"Error in swim command: {e}")
+                logger.error(f"Error in swim command: {e}")
                 await bot._send_error_embed(interaction, "Une erreur est survenue.")
             
         # ===== CURSE (Level 10+) =====
@@ -286,12 +250,13 @@ class AbilityCommands:
         @bot.tree.command(name="curse", description="Maudire un autre joueur (-5% sur sa prochaine tentative)")
         @app_commands.describe(target="Le joueur à maudire")
         async def curse(interaction: discord.Interaction, target: discord.Member):
+            state = bot.guild_state(interaction.guild_id)
             if not await bot._has_player_role(interaction.user):
                 await bot._send_error_embed(interaction, "Tu dois avoir le rôle **Joueur**.")
                 return
             
             try:
-                character = await bot.get_or_create_character(interaction.user.id)
+                character = await state.get_or_create_character(interaction.user.id)
                 
                 if character.get_level() < 10:
                     await bot._send_error_embed(
@@ -311,7 +276,7 @@ class AbilityCommands:
                     return
                 
                 # Check cooldown (once per week)
-                can_use, cooldown_msg = await bot.ability_manager.can_use_ability(
+                can_use, cooldown_msg = await state.ability_manager.can_use_ability(
                     interaction.user.id,
                     'curse',
                     cooldown_days=7
@@ -321,10 +286,10 @@ class AbilityCommands:
                     await bot._send_cd_msg_embed(interaction, f"Capacité en cooldown. {cooldown_msg}")
                     return
                 
-                await bot.ability_manager.use_ability(interaction.user.id, 'curse')
+                await state.ability_manager.use_ability(interaction.user.id, 'curse')
 
                 # Check target's shield
-                if await bot._check_and_consume_shield(target.id):
+                if await bot._check_and_consume_shield(interaction.guild_id, target.id):
                     await interaction.response.send_message(
                         embed=discord.Embed(
                             title="🛡️ Bouclier !",
@@ -345,29 +310,15 @@ class AbilityCommands:
 
                 # Apply curse
                 curse_amount = 5
-                async with bot.mdb_con.acquire() as conn:
-                    async with conn.cursor() as cursor:
-                        await cursor.execute(
-                            '''INSERT INTO egb_character_effects (discord_id, source_discord_id, effect_type, amount)
-                               VALUES (%s, %s, 'curse', %s)''',
-                            (target.id, interaction.user.id, curse_amount)
-                        )
-                        await conn.commit()
+                await state.bonus_manager.add_effect(target.id, interaction.user.id, 'curse', curse_amount)
 
-                target_partner_id = await bot.pact_manager.get_active_pact_partner(target.id)
+                target_partner_id = await state.pact_manager.get_active_pact_partner(target.id)
                 if target_partner_id:
-                    partner_blocked = await bot._check_and_consume_shield(target_partner_id)
+                    partner_blocked = await bot._check_and_consume_shield(interaction.guild_id, target_partner_id)
                     if not partner_blocked:
-                        async with bot.mdb_con.acquire() as conn:
-                            async with conn.cursor() as cursor:
-                                await cursor.execute(
-                                    '''INSERT INTO egb_character_effects (discord_id, source_discord_id, effect_type, amount)
-                                       VALUES (%s, %s, 'curse', %s)''',
-                                    (target_partner_id, interaction.user.id, curse_amount)
-                                )
-                                await conn.commit()
+                        await state.bonus_manager.add_effect(target_partner_id, interaction.user.id, 'curse', curse_amount)
                         try:
-                            partner_user = await bot.fetch_user(target_partner_id)
+                            partner_user = await bot.user_resolver.resolve(target_partner_id, interaction.guild)
                             await partner_user.send(embed=discord.Embed(
                                 title="💀 Pacte de Sang — Malédiction",
                                 description=f"**{interaction.user.display_name}** a maudit ton partenaire de pacte **{target.display_name}** !\nGrâce au pacte, tu subis également **-{curse_amount}%** pour ton prochain levelup.",
@@ -379,7 +330,7 @@ class AbilityCommands:
                         await bot._check_sacrifice_trigger(target_partner_id, interaction.guild)
                     else:
                         try:
-                            partner_user = await bot.fetch_user(target_partner_id)
+                            partner_user = await bot.user_resolver.resolve(target_partner_id, interaction.guild)
                             await partner_user.send(embed=discord.Embed(
                                 title="🛡️ Bouclier Activé !",
                                 description=f"Ton bouclier a absorbé la malédiction de **{interaction.user.display_name}** (transmise via le pacte de **{target.display_name}**) !",
@@ -407,25 +358,26 @@ class AbilityCommands:
                     pass  # User has DMs disabled
                 
                 await interaction.response.send_message(embed=embed, ephemeral=True)
-                await bot.log(interaction.user.id, datetime.now(), f'curse on {target.id}')
+                await bot.log(interaction.guild_id, interaction.user.id, datetime.now(), LogAction.CURSE, target_id=target.id, amount=curse_amount)
 
                 # Check if curse on target triggers a sacrifice (target is x in a sacrifice link)
                 await bot._check_sacrifice_trigger(target.id, interaction.guild)
 
             except Exception as e:
-                print(f"Error in curse command: {e}")
+                logger.error(f"Error in curse command: {e}")
                 await bot._send_error_embed(interaction, "Une erreur est survenue.")
 
         # ===== EVOLVE (Level 30+) =====
         @app_commands.guild_only()
         @bot.tree.command(name="evolve", description="Obtenir les ailes de Raziel (rôle cosmétique)")
         async def evolve(interaction: discord.Interaction):
+            state = bot.guild_state(interaction.guild_id)
             if not await bot._has_player_role(interaction.user):
                 await bot._send_error_embed(interaction, "Tu dois avoir le rôle **Joueur**.")
                 return
             
             try:
-                character = await bot.get_or_create_character(interaction.user.id)
+                character = await state.get_or_create_character(interaction.user.id)
                 
                 if character.get_level() < 30:
                     await bot._send_error_embed(
@@ -434,7 +386,7 @@ class AbilityCommands:
                     )
                     return
                 
-                wings_role_name = os.getenv('ROLE_WINGS', 'Ailes')
+                wings_role_name = bot.config.role_wings
                 wings_role = discord.utils.get(interaction.guild.roles, name=wings_role_name)
                 
                 if not wings_role:
@@ -463,7 +415,7 @@ class AbilityCommands:
                     embed.set_image(url="https://media.tenor.com/cChWq5iFrh4AAAAd/legacy-of-kain.gif")  
                     
                     await interaction.response.send_message(embed=embed, ephemeral=True)
-                    await bot.log(interaction.user.id, datetime.now(), 'evolve (obtained wings)')
+                    await bot.log(interaction.guild_id, interaction.user.id, datetime.now(), LogAction.EVOLVE)
                     
                 except discord.Forbidden:
                     await bot._send_error_embed(
@@ -472,13 +424,14 @@ class AbilityCommands:
                     )
                 
             except Exception as e:
-                print(f"Error in evolve command: {e}")
+                logger.error(f"Error in evolve command: {e}")
                 await bot._send_error_embed(interaction, "Une erreur est survenue.")
         
         # ===== SPECTRAL (Level 30+) =====
         @app_commands.guild_only()
         @bot.tree.command(name="spectral", description="Voir le royaume spectral (classement caché)")
         async def spectral(interaction: discord.Interaction):
+            state = bot.guild_state(interaction.guild_id)
             if not await bot._has_player_role(interaction.user):
                 await bot._send_error_embed(interaction, "Tu dois avoir le rôle **Joueur**.")
                 return
@@ -486,7 +439,7 @@ class AbilityCommands:
             await interaction.response.defer(ephemeral=True)
 
             try:
-                character = await bot.get_or_create_character(interaction.user.id)
+                character = await state.get_or_create_character(interaction.user.id)
                 
                 if character.get_level() < 30:
                     await bot._send_error_embed(
@@ -496,7 +449,7 @@ class AbilityCommands:
                     return
                 
                 # Get top characters with additional hidden stats
-                top_characters = await bot.character_repo.get_top_characters(limit=10)
+                top_characters = await state.get_top_characters(limit=10)
                 
                 if not top_characters:
                     await bot._send_error_embed(interaction, "Aucun personnage trouvé.")
@@ -509,46 +462,107 @@ class AbilityCommands:
                     color=clan_info['color']
                 )
                 
+                # One IN query for the bonus rows, one batch pass for the probabilities
+                top_ids = [c.get_discord_id() for c in top_characters]
+                bonuses_by_id = await state.bonus_manager.get_bonuses_many(top_ids)
+                chances = bot.probability.score(top_characters, bonuses_by_id)
+
+                # Names from the member/user caches, missing ones fetched concurrently
+                names = await bot.user_resolver.display_names(top_ids, interaction.guild)
+
                 for idx, char in enumerate(top_characters, 1):
-                    try:
-                        user = await bot.fetch_user(char.get_discord_id())
-                        char_clan = bot.get_clan_info_for_user(char.get_level())
-                        
-                        # Show hidden stats
-                        last_attempt = char.get_last_attempt()
-                        last_attempt_str = last_attempt.strftime("%d/%m %H:%M") if last_attempt else "Jamais"
-                        
-                        # Calculate their current success chance
-                        base = int(os.getenv('BASE_LEVELUP_CHANCE', '20'))
-                        bonus = int(os.getenv('BONUS_PER_HOUR', '5'))
-                        max_c = int(os.getenv('MAX_LEVELUP_CHANCE', '80'))
-                        success_chance = char.calculate_success_chance(base, bonus, max_c)
-                        
-                        embed.add_field(
-                            name=f"{idx}. {user.display_name}",
-                            value=f"**Niveau {char.get_level()}** - {char_clan['name']}\nDernière tentative: {last_attempt_str}\nChance actuelle: {success_chance:.1f}%",
-                            inline=False
-                        )
-                    except:
-                        pass
-                
+                    char_clan = bot.get_clan_info_for_user(char.get_level())
+
+                    # Show hidden stats
+                    last_attempt = char.get_last_attempt()
+                    last_attempt_str = last_attempt.strftime("%d/%m %H:%M") if last_attempt else "Jamais"
+
+                    embed.add_field(
+                        name=f"{idx}. {names[char.get_discord_id()]}",
+                        value=f"**Niveau {char.get_level()}** - {char_clan['name']}\nDernière tentative: {last_attempt_str}\nChance actuelle: {chances[char.get_discord_id()]:.1f}%",
+                        inline=False
+                    )
+
                 await interaction.followup.send(embed=embed, ephemeral=True)
-                await bot.log(interaction.user.id, datetime.now(), 'spectral (view leaderboard)')
+                await bot.log(interaction.guild_id, interaction.user.id, datetime.now(), LogAction.SPECTRAL)
 
             except Exception as e:
-                print(f"Error in spectral command: {e}")
+                logger.error(f"Error in spectral command: {e}")
                 await interaction.followup.send("❌ Une erreur est survenue.", ephemeral=True)
 
+        # ===== LEADERBOARD (public) =====
+        @app_commands.guild_only()
+        @bot.tree.command(name="leaderboard", description="Afficher le classement des joueurs du serveur")
+        async def leaderboard(interaction: discord.Interaction):
+            await interaction.response.defer()
+            try:
+                view = LeaderboardView(bot=bot, guild=interaction.guild, author_id=interaction.user.id)
+                embed = await view.load_page(0)
+                if embed is None:
+                    await bot._send_error_embed(interaction, "Aucun personnage trouvé.", followup=True)
+                    return
+                await interaction.followup.send(embed=embed, view=view)
+            except Exception as e:
+                logger.error(f"Error in leaderboard command: {e}")
+                await bot._send_error_embed(interaction, "Une erreur est survenue.", followup=True)
+
+        # ===== HISTORY =====
+        @app_commands.guild_only()
+        @bot.tree.command(name="history", description="Voir la progression de niveau d'un joueur")
+        @app_commands.describe(
+            user="Le joueur dont tu veux voir la progression",
+            days="Nombre de jours affichés (1 à 365, par défaut : 30)"
+        )
+        async def history(interaction: discord.Interaction, user: Optional[discord.Member] = None,
+                          days: app_commands.Range[int, 1, 365] = 30):
+            if not await bot._has_player_role(interaction.user):
+                await bot._send_error_embed(interaction, "Tu dois avoir le rôle **Joueur**.")
+                return
+
+            target_user = user if user else interaction.user
+            await interaction.response.defer(ephemeral=True)
+            try:
+                periods = await bot.guild_state(interaction.guild_id).level_history.get_history(target_user.id, days)
+                if not periods:
+                    await bot._send_error_embed(
+                        interaction,
+                        f"Aucun changement de niveau pour **{target_user.display_name}** sur les {days} dernier(s) jour(s).",
+                        followup=True
+                    )
+                    return
+
+                clan_info = ClanSystem.get_clan_by_level(periods[-1]['level'])
+                embed = discord.Embed(
+                    title=f"📜 Progression de {target_user.display_name} — {days} dernier(s) jour(s)",
+                    color=clan_info['color']
+                )
+                lines = []
+                for period in periods:
+                    when = period['start'].strftime('%d/%m')
+                    if period['end'] != period['start']:
+                        when += f" → {period['end'].strftime('%d/%m')}"
+                    spread = (f" ({period['min_level']}–{period['max_level']})"
+                              if period['min_level'] != period['max_level'] else "")
+                    lines.append(
+                        f"`{when}` niveau **{period['level']}**{spread} · {period['changes']} changement(s)"
+                    )
+                embed.add_field(name="Niveau après chaque période", value="\n".join(lines), inline=False)
+                await interaction.followup.send(embed=embed, ephemeral=True)
+            except Exception as e:
+                logger.error(f"Error in history command: {e}")
+                await bot._send_error_embed(interaction, "Une erreur est survenue.", followup=True)
+
         # ===== entomb (Level 10+) =====
         @app_commands.guild_only()
         @bot.tree.command(name="entomb", description="Condamner le leader à ne pas pouvoir levelup pendant 1-2 jours")
         async def entomb(interaction: discord.Interaction):
+            state = bot.guild_state(interaction.guild_id)
             if not await bot._has_player_role(interaction.user):
                 await bot._send_error_embed(interaction, "Tu dois avoir le rôle **Joueur**.")
                 return
             
             try:
-                character = await bot.get_or_create_character(interaction.user.id)
+                character = await state.get_or_create_character(interaction.user.id)
                 
                 # Check level requirement
                 if character.get_level() < 10:
@@ -559,7 +573,7 @@ class AbilityCommands:
                     return
                 
                 # Check cooldown (once per week)
-                can_use, msg = await bot.ability_manager.can_use_ability(
+                can_use, msg = await state.ability_manager.can_use_ability(
                     -1, 
                     'entomb', 
                     cooldown_days=7
@@ -570,7 +584,7 @@ class AbilityCommands:
                     return
                 
                 # Get the top player (highest level, earliest if tied)
-                top_characters = await bot.character_repo.get_top_characters(limit=1)
+                top_characters = await state.get_top_characters(limit=1)
                 
                 if not top_characters:
                     await bot._send_error_embed(interaction, "Aucun joueur trouvé.")
@@ -588,30 +602,23 @@ class AbilityCommands:
                     return
                 
                 # Check if leader is already cursed
-                async with bot.mdb_con.acquire() as conn:
-                    async with conn.cursor(aiomysql.DictCursor) as cursor:
-                        await cursor.execute(
-                            'SELECT leader_curse_until FROM egb_character_bonuses WHERE discord_id = %s',
-                            (leader_id,)
+                result = await state.bonus_manager.get_bonuses(leader_id)
+                if result and result['leader_curse_until']:
+                    curse_until = result['leader_curse_until']
+                    if curse_until > datetime.now():
+                        await bot._send_error_embed(
+                            interaction,
+                            f"⚠️ Le leader est déjà sous l'effet d'une condamnation jusqu'au {curse_until.strftime('%d/%m/%Y à %H:%M')} !"
                         )
-                        result = await cursor.fetchone()
-                        
-                        if result and result['leader_curse_until']:
-                            curse_until = result['leader_curse_until']
-                            if curse_until > datetime.now():
-                                await bot._send_error_embed(
-                                    interaction,
-                                    f"⚠️ Le leader est déjà sous l'effet d'une condamnation jusqu'au {curse_until.strftime('%d/%m/%Y à %H:%M')} !"
-                                )
-                                return
+                        return
                 
                 # Mark ability as used before shield check
-                await bot.ability_manager.use_ability(interaction.user.id, 'entomb')
+                await state.ability_manager.use_ability(interaction.user.id, 'entomb')
 
                 # Check leader's shield
-                if await bot._check_and_consume_shield(leader_id):
+                if await bot._check_and_consume_shield(interaction.guild_id, leader_id):
                     try:
-                        leader_user = await bot.fetch_user(leader_id)
+                        leader_user = await bot.user_resolver.resolve(leader_id, interaction.guild)
                         await leader_user.send(embed=discord.Embed(
                             title="🛡️ Bouclier Activé !",
                             description=f"Ton bouclier a absorbé la condamnation de **{interaction.user.display_name}** !",
@@ -636,37 +643,21 @@ class AbilityCommands:
 
                 # Fetch leader_user before pact mirror (needed for DM text)
                 try:
-                    leader_user = await bot.fetch_user(leader_id)
+                    leader_user = await bot.user_resolver.resolve(leader_id, interaction.guild)
                 except Exception:
                     leader_user = None
                 leader_display = leader_user.display_name if leader_user else f"#{leader_id}"
 
-                async with bot.mdb_con.acquire() as conn:
-                    async with conn.cursor() as cursor:
-                        await cursor.execute(
-                            '''INSERT INTO egb_character_bonuses (discord_id, leader_curse_until)
-                               VALUES (%s, %s)
-                               ON DUPLICATE KEY UPDATE leader_curse_until = %s''',
-                            (leader_id, curse_until, curse_until)
-                        )
-                        await conn.commit()
+                await state.bonus_manager.set_leader_curse(leader_id, curse_until)
 
                 # Mirror entomb to leader's pact partner if any
-                leader_partner_id = await bot.pact_manager.get_active_pact_partner(leader_id)
+                leader_partner_id = await state.pact_manager.get_active_pact_partner(leader_id)
                 if leader_partner_id:
-                    partner_blocked = await bot._check_and_consume_shield(leader_partner_id)
+                    partner_blocked = await bot._check_and_consume_shield(interaction.guild_id, leader_partner_id)
                     if not partner_blocked:
-                        async with bot.mdb_con.acquire() as conn:
-                            async with conn.cursor() as cursor:
-                                await cursor.execute(
-                                    '''INSERT INTO egb_character_bonuses (discord_id, leader_curse_until)
-                                       VALUES (%s, %s)
-                                       ON DUPLICATE KEY UPDATE leader_curse_until = %s''',
-                                    (leader_partner_id, curse_until, curse_until)
-                                )
-                                await conn.commit()
+                        await state.bonus_manager.set_leader_curse(leader_partner_id, curse_until)
                         try:
-                            partner_user = await bot.fetch_user(leader_partner_id)
+                            partner_user = await bot.user_resolver.resolve(leader_partner_id, interaction.guild)
                             partner_dm = discord.Embed(
                                 title="⚡ Condamnation Divine !",
                                 description=f"Ton pacte avec **{leader_display}** t'entraîne dans sa condamnation !\nTu ne pourras pas monter de niveau pendant **{curse_days} jour(s)** !",
@@ -678,7 +669,7 @@ class AbilityCommands:
                             pass
                     else:
                         try:
-                            partner_user = await bot.fetch_user(leader_partner_id)
+                            partner_user = await bot.user_resolver.resolve(leader_partner_id, interaction.guild)
                             await partner_user.send(embed=discord.Embed(
                                 title="🛡️ Bouclier Activé !",
                                 description=f"Ton bouclier a absorbé la condamnation de **{interaction.user.display_name}** (transmise via le pacte de **{leader_display}**) !",
@@ -719,10 +710,10 @@ class AbilityCommands:
                 )
                 
                 await bot._send_public(interaction, embed)
-                await bot.log(interaction.user.id, datetime.now(), f'entomb {leader_id}')
+                await bot.log(interaction.guild_id, interaction.user.id, datetime.now(), LogAction.ENTOMB, target_id=leader_id)
                 
             except Exception as e:
-                print(f"Error in entomb command: {e}", file=sys.stderr)
+                logger.error(f"Error in entomb command: {e}")
                 await bot._send_error_embed(interaction, "Une erreur est survenue.")
         
         # ===== BLESS (All levels) =====
@@ -730,6 +721,7 @@ class AbilityCommands:
         @bot.tree.command(name="bless", description="Bénir un joueur pour lui donner un bonus de 3-8% au prochain levelup")
         @app_commands.describe(target="Le joueur à bénir")
         async def bless(interaction: discord.Interaction, target: discord.Member):
+            state = bot.guild_state(interaction.guild_id)
             if not await bot._has_player_role(interaction.user):
                 await bot._send_error_embed(interaction, "Tu dois avoir le rôle **Joueur**.")
                 return
@@ -752,7 +744,7 @@ class AbilityCommands:
                     return
                 
                 # Check cooldown (once per week)
-                can_use, msg = await bot.ability_manager.can_use_ability(
+                can_use, msg = await state.ability_manager.can_use_ability(
                     interaction.user.id, 
                     'bless', 
                     cooldown_days=7
@@ -766,30 +758,16 @@ class AbilityCommands:
                 bonus = random.randint(3, 8)
                 
                 # Store bless effect
-                async with bot.mdb_con.acquire() as conn:
-                    async with conn.cursor() as cursor:
-                        await cursor.execute(
-                            '''INSERT INTO egb_character_effects (discord_id, source_discord_id, effect_type, amount)
-                               VALUES (%s, %s, 'bless', %s)''',
-                            (target.id, interaction.user.id, bonus)
-                        )
-                        await conn.commit()
+                await state.bonus_manager.add_effect(target.id, interaction.user.id, 'bless', bonus)
                 
                 # Mark ability as used
-                await bot.ability_manager.use_ability(interaction.user.id, 'bless')
+                await state.ability_manager.use_ability(interaction.user.id, 'bless')
 
-                target_partner_id = await bot.pact_manager.get_active_pact_partner(target.id)
+                target_partner_id = await state.pact_manager.get_active_pact_partner(target.id)
                 if target_partner_id:
-                    async with bot.mdb_con.acquire() as conn:
-                        async with conn.cursor() as cursor:
-                            await cursor.execute(
-                                '''INSERT INTO egb_character_effects (discord_id, source_discord_id, effect_type, amount)
-                                   VALUES (%s, %s, 'bless', %s)''',
-                                (target_partner_id, interaction.user.id, bonus)
-                            )
-                            await conn.commit()
+                    await state.bonus_manager.add_effect(target_partner_id, interaction.user.id, 'bless', bonus)
                     try:
-                        partner_user = await bot.fetch_user(target_partner_id)
+                        partner_user = await bot.user_resolver.resolve(target_partner_id, interaction.guild)
                         await partner_user.send(embed=discord.Embed(
                             title="✨ Pacte de Sang — Bénédiction",
                             description=f"**{interaction.user.display_name}** a béni ton partenaire de pacte **{target.display_name}** !\nGrâce au pacte, tu reçois également **+{bonus}%** pour ton prochain levelup !",
@@ -799,7 +777,7 @@ class AbilityCommands:
                         pass
 
                 # Get target's character
-                target_character = await bot.get_or_create_character(target.id)
+                target_character = await state.get_or_create_character(target.id)
                 
                 # Try to notify the target
                 try:
@@ -816,7 +794,7 @@ class AbilityCommands:
                     pass  # If we can't DM them, that's okay
                 
                 # Send success message
-                character = await bot.get_or_create_character(interaction.user.id)
+                character = await state.get_or_create_character(interaction.user.id)
                 clan_info = bot.get_clan_info_for_user(character.get_level())
                 embed = discord.Embed(
                     title="✨ Bénédiction Accordée !",
@@ -826,24 +804,25 @@ class AbilityCommands:
                 embed.set_footer(text="Les bénédictions sont cumulatives")
                 
                 await interaction.response.send_message(embed=embed, ephemeral=True)
-                await bot.log(interaction.user.id, datetime.now(), f'bless {target.id} (+{bonus}%)')
+                await bot.log(interaction.guild_id, interaction.user.id, datetime.now(), LogAction.BLESS, target_id=target.id, amount=bonus)
                 
             except Exception as e:
-                print(f"Error in bless command: {e}", file=sys.stderr)
+                logger.error(f"Error in bless command: {e}")
                 await bot._send_error_embed(interaction, "Une erreur est survenue.")
 
         @app_commands.guild_only()
         @bot.tree.command(name="oppress", description="[LEADER ONLY] Infliger un malus à tous les autres joueurs pour la journée")
         async def oppress(interaction: discord.Interaction):
+            state = bot.guild_state(interaction.guild_id)
             if not await bot._has_player_role(interaction.user):
                 await bot._send_error_embed(interaction, "Tu dois avoir le rôle **Joueur**.")
                 return
             
             try:
-                character = await bot.get_or_create_character(interaction.user.id)
+                character = await state.get_or_create_character(interaction.user.id)
                 
                 # Get the top player (leader)
-                top_characters = await bot.character_repo.get_top_characters(limit=1)
+                top_characters = await state.get_top_characters(limit=1)
                 
                 if not top_characters:
                     await bot._send_error_embed(interaction, "Aucun leader trouvé.")
@@ -861,7 +840,7 @@ class AbilityCommands:
                     return
                 
                 # Check cooldown (once per week) - GLOBAL cooldown
-                can_use, msg = await bot.ability_manager.can_use_ability(
+                can_use, msg = await state.ability_manager.can_use_ability(
                     -1,  # Global key, not per-user
                     'oppress', 
                     cooldown_days=7
@@ -879,22 +858,10 @@ class AbilityCommands:
                 end_of_day = datetime.combine(now.date(), datetime.max.time())
                 
                 # Apply malus to all players except the leader
-                async with bot.mdb_con.acquire() as conn:
-                    async with conn.cursor() as cursor:
-                        # Apply to all existing players
-                        await cursor.execute(
-                            '''INSERT INTO egb_character_bonuses (discord_id, oppression_malus, oppression_until)
-                            SELECT discord_id, %s, %s FROM egb_characters WHERE discord_id != %s
-                            ON DUPLICATE KEY UPDATE 
-                                oppression_malus = VALUES(oppression_malus),
-                                oppression_until = VALUES(oppression_until)''',
-                            (malus_percent, end_of_day, leader_id)
-                        )
-                        affected_count = cursor.rowcount
-                        await conn.commit()
+                affected_count = await state.bonus_manager.apply_oppression(leader_id, malus_percent, end_of_day)
                 
                 # Mark ability as used
-                await bot.ability_manager.use_ability(leader_id, 'oppress')
+                await state.ability_manager.use_ability(leader_id, 'oppress')
                 
                 # Send success message
                 clan_info = bot.get_clan_info_for_user(character.get_level())
@@ -915,11 +882,10 @@ class AbilityCommands:
                 )
                 
                 await interaction.response.send_message(embed=embed, ephemeral=True)
-                await bot.log(interaction.user.id, datetime.now(), f'oppress {malus_percent}% until {end_of_day}')
+                await bot.log(interaction.guild_id, interaction.user.id, datetime.now(), LogAction.OPPRESS, amount=malus_percent, details={'until': end_of_day})
                 
             except Exception as e:
-                import sys
-                print(f"Error in oppress command: {e}", file=sys.stderr)
+                logger.error(f"Error in oppress command: {e}")
                 await bot._send_error_embed(interaction, "Une erreur est survenue.")
 
         # ===== STEAL (Level 40+) =====
@@ -927,12 +893,13 @@ class AbilityCommands:
         @bot.tree.command(name="steal", description="Siphonner 5-10% de chance du prochain levelup d'un joueur")
         @app_commands.describe(target="Le joueur dont tu veux siphonner la chance")
         async def steal(interaction: discord.Interaction, target: discord.Member):
+            state = bot.guild_state(interaction.guild_id)
             if not await bot._has_player_role(interaction.user):
                 await bot._send_error_embed(interaction, "Tu dois avoir le rôle **Joueur**.")
                 return
 
             try:
-                character = await bot.get_or_create_character(interaction.user.id)
+                character = await state.get_or_create_character(interaction.user.id)
 
                 if character.get_level() < 40:
                     await bot._send_error_embed(
@@ -950,7 +917,7 @@ class AbilityCommands:
                     return
 
                 # Check cooldown (rolling 24h)
-                can_use, msg = await bot.ability_manager.can_use_ability(
+                can_use, msg = await state.ability_manager.can_use_ability(
                     interaction.user.id,
                     'steal',
                     cooldown_days=1
@@ -962,10 +929,10 @@ class AbilityCommands:
 
                 amount = random.randint(5, 10)
 
-                await bot.ability_manager.use_ability(interaction.user.id, 'steal')
+                await state.ability_manager.use_ability(interaction.user.id, 'steal')
 
                 # Check target's shield — blocks the entire steal
-                if await bot._check_and_consume_shield(target.id):
+                if await bot._check_and_consume_shield(interaction.guild_id, target.id):
                     await interaction.response.send_message(
                         embed=discord.Embed(
                             title="🛡️ Bouclier !",
@@ -984,33 +951,17 @@ class AbilityCommands:
                         pass
                     return
 
-                async with bot.mdb_con.acquire() as conn:
-                    async with conn.cursor() as cursor:
-                        await cursor.execute(
-                            '''INSERT INTO egb_character_effects (discord_id, source_discord_id, effect_type, amount)
-                               VALUES (%s, %s, 'steal_bonus', %s)''',
-                            (interaction.user.id, target.id, amount)
-                        )
-                        await cursor.execute(
-                            '''INSERT INTO egb_character_effects (discord_id, source_discord_id, effect_type, amount)
-                               VALUES (%s, %s, 'steal_malus', %s)''',
-                            (target.id, interaction.user.id, amount)
-                        )
-                        await conn.commit()
+                await state.bonus_manager.add_effects([
+                    (interaction.user.id, target.id, 'steal_bonus', amount),
+                    (target.id, interaction.user.id, 'steal_malus', amount),
+                ])
 
                 # Mirror steal_bonus to thief's pact partner
-                thief_partner_id = await bot.pact_manager.get_active_pact_partner(interaction.user.id)
+                thief_partner_id = await state.pact_manager.get_active_pact_partner(interaction.user.id)
                 if thief_partner_id:
-                    async with bot.mdb_con.acquire() as conn:
-                        async with conn.cursor() as cursor:
-                            await cursor.execute(
-                                '''INSERT INTO egb_character_effects (discord_id, source_discord_id, effect_type, amount)
-                                   VALUES (%s, %s, 'steal_bonus', %s)''',
-                                (thief_partner_id, target.id, amount)
-                            )
-                            await conn.commit()
+                    await state.bonus_manager.add_effect(thief_partner_id, target.id, 'steal_bonus', amount)
                     try:
-                        partner_user = await bot.fetch_user(thief_partner_id)
+                        partner_user = await bot.user_resolver.resolve(thief_partner_id, interaction.guild)
                         await partner_user.send(embed=discord.Embed(
                             title="🩸 Pacte de Sang — Vol d'Essence",
                             description=f"Ton pacte avec **{interaction.user.display_name}** t'a transmis un vol sur **{target.display_name}** (**+{amount}%**) pour ton prochain levelup !",
@@ -1020,20 +971,13 @@ class AbilityCommands:
                         pass
 
                 # Mirror steal_malus to victim's pact partner
-                victim_partner_id = await bot.pact_manager.get_active_pact_partner(target.id)
+                victim_partner_id = await state.pact_manager.get_active_pact_partner(target.id)
                 if victim_partner_id:
-                    partner_blocked = await bot._check_and_consume_shield(victim_partner_id)
+                    partner_blocked = await bot._check_and_consume_shield(interaction.guild_id, victim_partner_id)
                     if not partner_blocked:
-                        async with bot.mdb_con.acquire() as conn:
-                            async with conn.cursor() as cursor:
-                                await cursor.execute(
-                                    '''INSERT INTO egb_character_effects (discord_id, source_discord_id, effect_type, amount)
-                                       VALUES (%s, %s, 'steal_malus', %s)''',
-                                    (victim_partner_id, interaction.user.id, amount)
-                                )
-                                await conn.commit()
+                        await state.bonus_manager.add_effect(victim_partner_id, interaction.user.id, 'steal_malus', amount)
                         try:
-                            partner_user = await bot.fetch_user(victim_partner_id)
+                            partner_user = await bot.user_resolver.resolve(victim_partner_id, interaction.guild)
                             await partner_user.send(embed=discord.Embed(
                                 title="🩸 Pacte de Sang — Siphonage",
                                 description=f"Ton partenaire de pacte **{target.display_name}** s'est fait siphonner par **{interaction.user.display_name}** !\nGrâce au pacte, tu subis également **-{amount}%** pour ton prochain levelup.",
@@ -1045,7 +989,7 @@ class AbilityCommands:
                         await bot._check_sacrifice_trigger(victim_partner_id, interaction.guild)
                     else:
                         try:
-                            partner_user = await bot.fetch_user(victim_partner_id)
+                            partner_user = await bot.user_resolver.resolve(victim_partner_id, interaction.guild)
                             await partner_user.send(embed=discord.Embed(
                                 title="🛡️ Bouclier Activé !",
                                 description=f"Ton bouclier a absorbé le siphonage de **{interaction.user.display_name}** (transmis via le pacte de **{target.display_name}**) !",
@@ -1072,13 +1016,13 @@ class AbilityCommands:
                 )
 
                 await interaction.response.send_message(embed=embed, ephemeral=True)
-                await bot.log(interaction.user.id, datetime.now(), f'steal {amount}% from {target.id}')
+                await bot.log(interaction.guild_id, interaction.user.id, datetime.now(), LogAction.STEAL, target_id=target.id, amount=amount)
 
                 # Check if steal_malus on target triggers a sacrifice (target is x in a sacrifice link)
                 await bot._check_sacrifice_trigger(target.id, interaction.guild)
 
             except Exception as e:
-                print(f"Error in steal command: {e}", file=sys.stderr)
+                logger.error(f"Error in steal command: {e}")
                 await bot._send_error_embed(interaction, "Une erreur est survenue.")
 
         # ===== SACRIFICE (Level 60+) =====
@@ -1086,12 +1030,13 @@ class AbilityCommands:
         @bot.tree.command(name="sacrifice", description="Sacrifier un joueur : si ta probabilité tombe à 0 en 15 min, il perd un niveau")
         @app_commands.describe(target="Le joueur que tu veux sacrifier")
         async def sacrifice(interaction: discord.Interaction, target: discord.Member):
+            state = bot.guild_state(interaction.guild_id)
             if not await bot._has_player_role(interaction.user):
                 await bot._send_error_embed(interaction, "Tu dois avoir le rôle **Joueur**.")
                 return
 
             try:
-                character = await bot.get_or_create_character(interaction.user.id)
+                character = await state.get_or_create_character(interaction.user.id)
 
                 if character.get_level() < 60:
                     await bot._send_error_embed(
@@ -1109,7 +1054,7 @@ class AbilityCommands:
                     return
 
                 # Check caster cooldown (7 days)
-                can_use, msg = await bot.ability_manager.can_use_ability(
+                can_use, msg = await state.ability_manager.can_use_ability(
                     interaction.user.id, 'sacrifice', cooldown_days=7
                 )
                 if not can_use:
@@ -1117,7 +1062,7 @@ class AbilityCommands:
                     return
 
                 # Check victim immunity (7 days after having lost a level via sacrifice)
-                victim_immune, immune_msg = await bot.ability_manager.can_use_ability(
+                victim_immune, immune_msg = await state.ability_manager.can_use_ability(
                     target.id, 'sacrifice_victim', cooldown_days=7
                 )
                 if not victim_immune:
@@ -1127,10 +1072,10 @@ class AbilityCommands:
                     )
                     return
 
-                await bot.ability_manager.use_ability(interaction.user.id, 'sacrifice')
+                await state.ability_manager.use_ability(interaction.user.id, 'sacrifice')
 
                 # Check target's shield
-                if await bot._check_and_consume_shield(target.id):
+                if await bot._check_and_consume_shield(interaction.guild_id, target.id):
                     await interaction.response.send_message(
                         embed=discord.Embed(
                             title="🛡️ Bouclier !",
@@ -1150,16 +1095,7 @@ class AbilityCommands:
                     return
 
                 # Check victim has no active sacrifice link already
-                async with bot.mdb_con.acquire() as conn:
-                    async with conn.cursor(aiomysql.DictCursor) as cursor:
-                        await cursor.execute(
-                            '''SELECT id FROM egb_sacrifice_links
-                               WHERE victim_id = %s AND active = TRUE AND expires_at > NOW()''',
-                            (target.id,)
-                        )
-                        existing = await cursor.fetchone()
-
-                if existing:
+                if await state.sacrifice_manager.has_active_link_on_victim(target.id):
                     await bot._send_error_embed(
                         interaction,
                         f"**{target.display_name}** est déjà la cible d'un sacrifice actif !"
@@ -1168,14 +1104,7 @@ class AbilityCommands:
 
                 # Create the sacrifice link (15 minutes)
                 expires_at = datetime.now() + timedelta(minutes=15)
-                async with bot.mdb_con.acquire() as conn:
-                    async with conn.cursor() as cursor:
-                        await cursor.execute(
-                            '''INSERT INTO egb_sacrifice_links (caster_id, victim_id, expires_at, active)
-                               VALUES (%s, %s, %s, TRUE)''',
-                            (interaction.user.id, target.id, expires_at)
-                        )
-                        await conn.commit()
+                await state.sacrifice_manager.create_link(interaction.user.id, target.id, expires_at)
 
                 # Notify victim via DM
                 try:
@@ -1204,10 +1133,10 @@ class AbilityCommands:
                     color=clan_info['color']
                 )
                 await interaction.response.send_message(embed=embed, ephemeral=True)
-                await bot.log(interaction.user.id, datetime.now(), f'sacrifice on {target.id}')
+                await bot.log(interaction.guild_id, interaction.user.id, datetime.now(), LogAction.SACRIFICE, target_id=target.id)
 
             except Exception as e:
-                print(f"Error in sacrifice command: {e}", file=sys.stderr)
+                logger.error(f"Error in sacrifice command: {e}")
                 await bot._send_error_embed(interaction, "Une erreur est survenue.")
 
         # ===== PACT (Level 20+) =====
@@ -1215,12 +1144,13 @@ class AbilityCommands:
         @bot.tree.command(name="pact", description="Sceller un Pacte de Sang avec un autre joueur pour 24h")
         @app_commands.describe(target="Le joueur avec qui sceller le pacte")
         async def pact(interaction: discord.Interaction, target: discord.Member):
+            state = bot.guild_state(interaction.guild_id)
             if not await bot._has_player_role(interaction.user):
                 await bot._send_error_embed(interaction, "Tu dois avoir le rôle **Joueur**.")
                 return
 
             try:
-                character = await bot.get_or_create_character(interaction.user.id)
+                character = await state.get_or_create_character(interaction.user.id)
 
                 if character.get_level() < 20:
                     await bot._send_error_embed(
@@ -1238,7 +1168,7 @@ class AbilityCommands:
                     return
 
                 # Check requester cooldown (7 days)
-                can_use, msg = await bot.ability_manager.can_use_ability(
+                can_use, msg = await state.ability_manager.can_use_ability(
                     interaction.user.id, 'pact', cooldown_days=7
                 )
                 if not can_use:
@@ -1246,7 +1176,7 @@ class AbilityCommands:
                     return
 
                 # Check target cooldown (7 days)
-                can_target, _ = await bot.ability_manager.can_use_ability(
+                can_target, _ = await state.ability_manager.can_use_ability(
                     target.id, 'pact', cooldown_days=7
                 )
                 if not can_target:
@@ -1257,11 +1187,11 @@ class AbilityCommands:
                     return
 
                 # Check requester has no pending or active pact
-                if interaction.user.id in bot.pending_pacts:
+                if interaction.user.id in state.pending_pacts:
                     await bot._send_error_embed(interaction, "Tu as déjà une proposition de pacte en attente !")
                     return
 
-                existing_partner_id = await bot.pact_manager.get_active_pact_partner(interaction.user.id)
+                existing_partner_id = await state.pact_manager.get_active_pact_partner(interaction.user.id)
                 if existing_partner_id:
                     existing = interaction.guild.get_member(existing_partner_id)
                     name = existing.display_name if existing else f"#{existing_partner_id}"
@@ -1272,14 +1202,14 @@ class AbilityCommands:
                     return
 
                 # Check target has no pending or active pact
-                if target.id in bot.pending_pacts:
+                if target.id in state.pending_pacts:
                     await bot._send_error_embed(
                         interaction,
                         f"**{target.display_name}** a déjà une proposition de pacte en attente !"
                     )
                     return
 
-                target_partner_id = await bot.pact_manager.get_active_pact_partner(target.id)
+                target_partner_id = await state.pact_manager.get_active_pact_partner(target.id)
                 if target_partner_id:
                     other = interaction.guild.get_member(target_partner_id)
                     name = other.display_name if other else f"#{target_partner_id}"
@@ -1311,8 +1241,7 @@ class AbilityCommands:
                 try:
                     pact_msg = await target.send(embed=prompt_embed, view=view)
                     view.message = pact_msg
-                    bot.pending_pacts.add(interaction.user.id)
-                    bot.pending_pacts.add(target.id)
+                    state.add_pending_pact(interaction.user.id, target.id)
                     await interaction.response.send_message(
                         f"Proposition de pacte envoyée à **{target.display_name}** en message privé !",
                         ephemeral=True
@@ -1324,7 +1253,7 @@ class AbilityCommands:
                     )
 
             except Exception as e:
-                print(f"Error in pact command: {e}", file=sys.stderr)
+                logger.error(f"Error in pact command: {e}")
                 await bot._send_error_embed(interaction, "Une erreur est survenue.")
 
 
@@ -1332,12 +1261,13 @@ class AbilityCommands:
         @app_commands.guild_only()
         @bot.tree.command(name="shield", description="Activer un bouclier mystique qui absorbe le prochain malus reçu (24h)")
         async def shield(interaction: discord.Interaction):
+            state = bot.guild_state(interaction.guild_id)
             if not await bot._has_player_role(interaction.user):
                 await bot._send_error_embed(interaction, "Tu dois avoir le rôle **Joueur**.")
                 return
 
             try:
-                character = await bot.get_or_create_character(interaction.user.id)
+                character = await state.get_or_create_character(interaction.user.id)
 
                 if character.get_level() < 50:
                     await bot._send_error_embed(
@@ -1347,7 +1277,7 @@ class AbilityCommands:
                     return
 
                 # Check cooldown (7 days)
-                can_use, msg = await bot.ability_manager.can_use_ability(
+                can_use, msg = await state.ability_manager.can_use_ability(
                     interaction.user.id, 'shield', cooldown_days=7
                 )
                 if not can_use:
@@ -1357,27 +1287,10 @@ class AbilityCommands:
                 shield_until = datetime.now() + timedelta(hours=24)
 
                 # Check if already has active shield
-                async with bot.mdb_con.acquire() as conn:
-                    async with conn.cursor(aiomysql.DictCursor) as cursor:
-                        await cursor.execute(
-                            'SELECT shield_until FROM egb_character_bonuses WHERE discord_id = %s',
-                            (interaction.user.id,)
-                        )
-                        existing = await cursor.fetchone()
-
-                already_shielded = existing and existing.get('shield_until') and existing['shield_until'] > datetime.now()
-
-                async with bot.mdb_con.acquire() as conn:
-                    async with conn.cursor() as cursor:
-                        await cursor.execute(
-                            '''INSERT INTO egb_character_bonuses (discord_id, shield_until)
-                               VALUES (%s, %s)
-                               ON DUPLICATE KEY UPDATE shield_until = %s''',
-                            (interaction.user.id, shield_until, shield_until)
-                        )
-                        await conn.commit()
+                already_shielded = await state.bonus_manager.has_active_shield(interaction.user.id)
+                await state.bonus_manager.set_shield(interaction.user.id, shield_until)
 
-                await bot.ability_manager.use_ability(interaction.user.id, 'shield')
+                await state.ability_manager.use_ability(interaction.user.id, 'shield')
 
                 clan_info = bot.get_clan_info_for_user(character.get_level())
                 if already_shielded:
@@ -1395,34 +1308,13 @@ class AbilityCommands:
                 )
 
                 # Mirror to pact partner
-                partner_id = await bot.pact_manager.get_active_pact_partner(interaction.user.id)
+                partner_id = await state.pact_manager.get_active_pact_partner(interaction.user.id)
                 if partner_id:
-                    async with bot.mdb_con.acquire() as conn:
-                        async with conn.cursor(aiomysql.DictCursor) as cursor:
-                            await cursor.execute(
-                                'SELECT shield_until FROM egb_character_bonuses WHERE discord_id = %s',
-                                (partner_id,)
-                            )
-                            partner_existing = await cursor.fetchone()
-
-                    partner_already_shielded = (
-                        partner_existing
-                        and partner_existing.get('shield_until')
-                        and partner_existing['shield_until'] > datetime.now()
-                    )
-
-                    async with bot.mdb_con.acquire() as conn:
-                        async with conn.cursor() as cursor:
-                            await cursor.execute(
-                                '''INSERT INTO egb_character_bonuses (discord_id, shield_until)
-                                   VALUES (%s, %s)
-                                   ON DUPLICATE KEY UPDATE shield_until = %s''',
-                                (partner_id, shield_until, shield_until)
-                            )
-                            await conn.commit()
+                    partner_already_shielded = await state.bonus_manager.has_active_shield(partner_id)
+                    await state.bonus_manager.set_shield(partner_id, shield_until)
 
                     try:
-                        partner_user = await bot.fetch_user(partner_id)
+                        partner_user = await bot.user_resolver.resolve(partner_id, interaction.guild)
                         if partner_already_shielded:
                             partner_dm = discord.Embed(
                                 title="🛡️ Bouclier Rafraîchi !",
@@ -1449,10 +1341,10 @@ class AbilityCommands:
                     )
 
                 await interaction.response.send_message(embed=embed, ephemeral=True)
-                await bot.log(interaction.user.id, datetime.now(), f'shield (until {shield_until})')
+                await bot.log(interaction.guild_id, interaction.user.id, datetime.now(), LogAction.SHIELD, details={'until': shield_until})
 
             except Exception as e:
-                print(f"Error in shield command: {e}", file=sys.stderr)
+                logger.error(f"Error in shield command: {e}")
                 await bot._send_error_embed(interaction, "Une erreur est survenue.")
 
         # ===== RULES (Accessible à tous) =====
@@ -1539,6 +1431,16 @@ class AbilityCommands:
             "• Niveau et clan visibles par tous\n"
             "• Sans les détails privés (effets actifs, cooldowns)"
         ))
+        RULES_PAGES[1].add_field(name="🏆 /leaderboard", inline=False, value=(
+            "Affiche le classement **public** de tous les joueurs du serveur.\n"
+            "• Trié par niveau, puis par ancienneté du dernier level up\n"
+            "• Boutons Précédent/Suivant (10 joueurs par page)"
+        ))
+        RULES_PAGES[1].add_field(name="📜 /history [@joueur] [jours]", inline=False, value=(
+            "Affiche la progression de niveau d'un joueur (ou la tienne).\n"
+            "• Level up, chaussette, pacte et sacrifice\n"
+            "• Regroupée par périodes sur les longues durées (jusqu'à 365 jours)"
+        ))
         RULES_PAGES[1].add_field(name="✨ /bless @joueur", inline=False, value=(
             "Bénit un joueur pour lui donner un bonus sur son prochain `/levelup`.\n"
             "• Bonus : **+3 à +8%** (aléatoire, cumulatif)\n"
@@ -1651,7 +1553,7 @@ class AbilityCommands:
             "• Attaquant notifié que l'attaque a été absorbée"
         ))
         RULES_PAGES[8].add_field(name="📌 Rappel général", inline=False, value=(
-            "• Toutes les réponses du bot sont **privées** sauf `/profile` et `/entomb`\n"
+            "• Toutes les réponses du bot sont **privées** sauf `/profile`, `/leaderboard` et `/entomb`\n"
             "• Les effets (bless, curse, devour, steal) sont **effacés après chaque `/levelup`**\n"
             "• `/stats` affiche tous tes effets actifs et leurs sources\n"
             "• En cas de problème, contacte <@340193200608116746>"
@@ -1682,7 +1584,7 @@ class AbilityCommands:
                 view = RulesView(pages=RULES_PAGES, author_id=interaction.user.id)
                 await interaction.response.send_message(embed=RULES_PAGES[0], view=view, ephemeral=True)
             except Exception as e:
-                print(f"Error in rules command: {e}", file=sys.stderr)
+                logger.error(f"Error in rules command: {e}")
                 await interaction.response.send_message("Une erreur est survenue.", ephemeral=True)
 
 
@@ -1719,12 +1621,96 @@ class RulesView(discord.ui.View):
             await interaction.message.edit(embed=self.pages[self.current], view=self)
 
 
+class LeaderboardView(discord.ui.View):
+    """
+    Previous/Next pagination buttons for /leaderboard.
+    Pages are fetched by keyset (position of the last row shown), never by offset:
+    the view remembers the cursor each page started from.
+    """
+
+    PAGE_SIZE = 10
+
+    def __init__(self, bot, guild: discord.Guild, author_id: int):
+        super().__init__(timeout=300)
+        self.bot = bot
+        self.guild = guild
+        self.author_id = author_id
+        self.cursors: list = [None]  # cursors[n]: last position shown before page n
+        self.current = 0
+        self.has_next = False
+
+    async def load_page(self, page: int) -> Optional[discord.Embed]:
+        """Fetch page `page` (its cursor must be known) and build its embed, None if empty"""
+        state = self.bot.guild_state(self.guild.id)
+        # One extra row tells whether a next page exists
+        characters = await state.get_ranking_page(self.cursors[page], self.PAGE_SIZE + 1)
+        self.has_next = len(characters) > self.PAGE_SIZE
+        characters = characters[:self.PAGE_SIZE]
+        if not characters:
+            return None
+
+        self.current = page
+        last = characters[-1]
+        cursor = (last.get_level(), last.get_last_successful_levelup(), last.get_discord_id())
+        del self.cursors[page + 1:]
+        self.cursors.append(cursor)
+
+        names = await self.bot.user_resolver.display_names([c.get_discord_id() for c in characters], self.guild)
+        first_rank = page * self.PAGE_SIZE + 1
+        lines = []
+        for rank, character in enumerate(characters, first_rank):
+            clan = self.bot.get_clan_info_for_user(character.get_level())
+            lines.append(f"**{rank}.** {names[character.get_discord_id()]} — Niveau {character.get_level()} ({clan['name']})")
+
+        embed = discord.Embed(
+            title="🏆 Classement",
+            description="\n".join(lines),
+            color=self.bot.get_clan_info_for_user(characters[0].get_level())['color']
+        )
+        total = state.count_characters()
+        if total:
+            embed.set_footer(text=f"Page {page + 1}/{(total + self.PAGE_SIZE - 1) // self.PAGE_SIZE}")
+        else:
+            embed.set_footer(text=f"Page {page + 1}")
+        self._update_buttons()
+        return embed
+
+    def _update_buttons(self):
+        self.prev_button.disabled = self.current == 0
+        self.next_button.disabled = not self.has_next
+
+    async def _show(self, interaction: discord.Interaction, page: int):
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message(
+                "Lance ton propre `/leaderboard` pour naviguer dans le classement.", ephemeral=True
+            )
+            return
+        await interaction.response.defer()
+        embed = await self.load_page(page)
+        if embed is None:
+            # The ranking shrank since the previous page was shown
+            self.has_next = False
+            self._update_buttons()
+            await interaction.edit_original_response(view=self)
+            return
+        await interaction.edit_original_response(embed=embed, view=self)
+
+    @discord.ui.button(label="◀ Précédent", style=discord.ButtonStyle.secondary, disabled=True)
+    async def prev_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.current - 1)
+
+    @discord.ui.button(label="Suivant ▶", style=discord.ButtonStyle.secondary, disabled=True)
+    async def next_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.current + 1)
+
+
 class PactView(discord.ui.View):
     """Ephemeral accept/decline buttons sent to the public channel."""
 
     def __init__(self, bot, requester: discord.Member, target: discord.Member, timeout: int):
         super().__init__(timeout=timeout)
         self.bot = bot
+        self.state = bot.guild_state(requester.guild.id)  # answered in DM: no interaction.guild
         self.requester = requester
         self.target = target
         self.message = None  # set after send so we can edit it on timeout
@@ -1741,12 +1727,12 @@ class PactView(discord.ui.View):
     async def accept(self, interaction: discord.Interaction, button: discord.ui.Button):
         self.stop()
         try:
-            expires_at = await self.bot.pact_manager.create_pact(self.requester.id, self.target.id)
-            await self.bot.ability_manager.use_ability(self.requester.id, 'pact')
-            await self.bot.ability_manager.use_ability(self.target.id, 'pact')
+            expires_at = await self.state.pact_manager.create_pact(self.requester.id, self.target.id)
+            await self.state.ability_manager.use_ability(self.requester.id, 'pact')
+            await self.state.ability_manager.use_ability(self.target.id, 'pact')
 
             req_clan = self.bot.get_clan_info_for_user(
-                (await self.bot.get_or_create_character(self.requester.id)).get_level()
+                (await self.state.get_or_create_character(self.requester.id)).get_level()
             )
             embed = discord.Embed(
                 title="🩸 Pacte de Sang Scellé !",
@@ -1757,23 +1743,21 @@ class PactView(discord.ui.View):
                 ),
                 color=req_clan['color']
             )
-            self.bot.pending_pacts.discard(self.requester.id)
-            self.bot.pending_pacts.discard(self.target.id)
+            self.state.discard_pending_pact(self.requester.id, self.target.id)
             await interaction.response.edit_message(embed=embed, view=None)
             try:
                 await self.requester.send(embed=embed)
             except Exception:
                 pass
-            await self.bot.log(self.target.id, datetime.now(), f'pact accepted with {self.requester.id}')
+            await self.bot.log(self.state.guild_id, self.target.id, datetime.now(), LogAction.PACT_ACCEPTED, target_id=self.requester.id)
         except Exception as e:
-            print(f"Error accepting pact: {e}", file=sys.stderr)
+            logger.error(f"Error accepting pact: {e}")
             await interaction.response.edit_message(content="Une erreur est survenue.", embed=None, view=None)
 
     @discord.ui.button(label="Refuser", style=discord.ButtonStyle.danger, emoji="💀")
     async def decline(self, interaction: discord.Interaction, button: discord.ui.Button):
         self.stop()
-        self.bot.pending_pacts.discard(self.requester.id)
-        self.bot.pending_pacts.discard(self.target.id)
+        self.state.discard_pending_pact(self.requester.id, self.target.id)
         embed = discord.Embed(
             title="💀 Pacte Refusé",
             description=f"**{self.target.display_name}** a refusé ton Pacte de Sang.",
@@ -1791,11 +1775,10 @@ class PactView(discord.ui.View):
             await self.requester.send(embed=embed)
         except Exception:
             pass
-        await self.bot.log(self.target.id, datetime.now(), f'pact declined from {self.requester.id}')
+        await self.bot.log(self.state.guild_id, self.target.id, datetime.now(), LogAction.PACT_DECLINED, target_id=self.requester.id)
 
     async def on_timeout(self):
-        self.bot.pending_pacts.discard(self.requester.id)
-        self.bot.pending_pacts.discard(self.target.id)
+        self.state.discard_pending_pact(self.requester.id, self.target.id)
         if self.message:
             try:
                 await self.message.edit(
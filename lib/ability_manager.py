@@ -1,14 +1,124 @@
 import aiomysql
 from datetime import datetime, timedelta
 from typing import Optional
-import sys
+import logging
+
+logger = logging.getLogger(__name__)
 
 class AbilityManager:
     """
-    Manages ability cooldowns and usage tracking
+    Manages ability cooldowns and usage tracking of one guild
     """
-    def __init__(self, mdb_pool: aiomysql.Pool):
+    def __init__(self, mdb_pool: aiomysql.Pool, guild_id: int, change_feed=None):
         self.mdb_pool = mdb_pool
+        self.guild_id = guild_id
+        self.change_feed = change_feed
+        self._last_used: dict[tuple[int, str], datetime] = {}
+        self._global_last_used: dict[str, datetime] = {}  # Latest use per ability, for global cooldowns
+        self._warm = False
+
+    async def load_all(self) -> int:
+        """
+        Stream every egb_ability_usage row of the guild into the cache.
+        Returns the number of rows loaded.
+        """
+        last_used = {}
+        async with self.mdb_pool.acquire() as conn:
+            async with conn.cursor(aiomysql.SSCursor) as cursor:
+                await cursor.execute(
+                    'SELECT discord_id, ability_name, last_used FROM egb_ability_usage WHERE guild_id = %s',
+                    (self.guild_id,)
+                )
+                while rows := await cursor.fetchmany(1000):
+                    for discord_id, ability_name, used_at in rows:
+                        last_used[(discord_id, ability_name)] = used_at
+
+        # Uses recorded while streaming are fresher than the streamed rows
+        last_used.update(self._last_used)
+        self._last_used = last_used
+        self._global_last_used = {}
+        for (_, ability_name), used_at in last_used.items():
+            self._remember_global(ability_name, used_at)
+        self._warm = True
+        return len(last_used)
+
+    # ===== SNAPSHOT =====
+    def export_state(self) -> Optional[dict[tuple[int, str], datetime]]:
+        """Cached last uses {(discord_id, ability_name): last_used} for a state snapshot, None while cold"""
+        return self._last_used if self._warm else None
+
+    async def restore(self, last_used: dict[tuple[int, str], datetime], since: datetime) -> int:
+        """
+        Fill the cache from a state snapshot, then re-read the uses recorded at or after `since`.
+        Returns the number of rows re-read.
+        """
+        async with self.mdb_pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    '''SELECT discord_id, ability_name, last_used FROM egb_ability_usage
+                       WHERE guild_id = %s AND last_used >= %s''',
+                    (self.guild_id, since)
+                )
+                rows = await cursor.fetchall()
+        for discord_id, ability_name, used_at in rows:
+            last_used[(discord_id, ability_name)] = used_at
+
+        # Uses recorded while restoring are fresher than the snapshot
+        last_used.update(self._last_used)
+        self._last_used = last_used
+        self._global_last_used = {}
+        for (_, ability_name), used_at in last_used.items():
+            self._remember_global(ability_name, used_at)
+        self._warm = True
+        return len(rows)
+
+    async def refresh(self, discord_id: int):
+        """Read again the cooldowns of a player changed by another instance"""
+        async with self.mdb_pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    'SELECT ability_name, last_used FROM egb_ability_usage WHERE guild_id = %s AND discord_id = %s',
+                    (self.guild_id, discord_id)
+                )
+                rows = await cursor.fetchall()
+        for ability_name, used_at in rows:
+            self._last_used[(discord_id, ability_name)] = used_at
+            self._remember_global(ability_name, used_at)
+
+    async def _get_last_used(self, discord_id: int, ability_name: str) -> Optional[datetime]:
+        """Last use of an ability by a player (discord_id -1: by anyone in the guild)"""
+        if discord_id == -1:
+            if self._warm:
+                return self._global_last_used.get(ability_name)
+        elif (discord_id, ability_name) in self._last_used:
+            return self._last_used[(discord_id, ability_name)]
+        elif self._warm:
+            return None
+
+        async with self.mdb_pool.acquire() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                if discord_id == -1:
+                    await cursor.execute(
+                    'SELECT max(last_used) as last_used FROM egb_ability_usage WHERE guild_id = %s AND ability_name = %s',
+                    (self.guild_id, ability_name)
+                    )
+                else:
+                    await cursor.execute(
+                        '''SELECT last_used FROM egb_ability_usage
+                           WHERE guild_id = %s AND discord_id = %s AND ability_name = %s''',
+                        (self.guild_id, discord_id, ability_name)
+                    )
+                result = await cursor.fetchone()
+
+        last_used = result['last_used'] if result else None
+        if discord_id != -1 and last_used:
+            self._last_used[(discord_id, ability_name)] = last_used
+        return last_used
+
+    def _remember_global(self, ability_name: str, used_at: datetime):
+        current = self._global_last_used.get(ability_name)
+        if current is None or used_at > current:
+            self._global_last_used[ability_name] = used_at
 
     async def can_use_ability(self, discord_id: int, ability_name: str, cooldown_days: int = 7, short_version: bool = False) -> tuple[bool, Optional[str]]:
         """
@@ -16,24 +126,11 @@ class AbilityManager:
         Returns: (can_use: bool, message: Optional[str])
         """
         try:
-            async with self.mdb_pool.acquire() as conn:
-                async with conn.cursor(aiomysql.DictCursor) as cursor:
-                    if discord_id == -1:
-                        await cursor.execute(
-                        'SELECT max(last_used) as last_used FROM egb_ability_usage WHERE ability_name = %s',
-                        (ability_name,)
-                        )
-                    else:
-                        await cursor.execute(
-                            'SELECT last_used FROM egb_ability_usage WHERE discord_id = %s AND ability_name = %s',
-                            (discord_id, ability_name)
-                        )
-                    result = await cursor.fetchone()
+            last_used = await self._get_last_used(discord_id, ability_name)
 
-            if not result:
+            if not last_used:
                 return True, "Disponible"
 
-            last_used = result['last_used']
             cooldown = timedelta(days=cooldown_days)
             time_since_use = datetime.now() - last_used
 
@@ -68,7 +165,7 @@ class AbilityManager:
             return True, "Disponible"
 
         except Exception as e:
-            print(f"Error checking ability cooldown: {e}", file=sys.stderr)
+            logger.error(f"Error checking ability cooldown: {e}")
             return True, None
 
     async def use_ability(self, discord_id: int, ability_name: str) -> bool:
@@ -76,16 +173,21 @@ class AbilityManager:
         Mark an ability as used (update last_used timestamp)
         """
         try:
+            now = datetime.now()
             async with self.mdb_pool.acquire() as conn:
                 async with conn.cursor() as cursor:
                     await cursor.execute(
-                        '''INSERT INTO egb_ability_usage (discord_id, ability_name, last_used)
-                           VALUES (%s, %s, %s)
+                        '''INSERT INTO egb_ability_usage (guild_id, discord_id, ability_name, last_used)
+                           VALUES (%s, %s, %s, %s)
                            ON DUPLICATE KEY UPDATE last_used = %s''',
-                        (discord_id, ability_name, datetime.now(), datetime.now())
+                        (self.guild_id, discord_id, ability_name, now, now)
                     )
+            self._last_used[(discord_id, ability_name)] = now
+            self._remember_global(ability_name, now)
+            if self.change_feed:
+                self.change_feed.publish(self.guild_id, 'cooldown', discord_id)
             return True
         except Exception as e:
-            print(f"Error marking ability as used: {e}", file=sys.stderr)
+            logger.error(f"Error marking ability as used: {e}")
             return False
 
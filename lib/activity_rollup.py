@@ -0,0 +1,224 @@
+import asyncio
+import logging
+from collections import Counter
+from datetime import date, timedelta
+from typing import Iterable, Mapping, Optional
+import aiomysql
+from .log_actions import OFFENSIVE_ACTIONS
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityRollup:
+    """
+    Incremental daily analytics on top of egb_log.
+
+    Each run folds only the log rows added since the previous run (tracked by
+    egb_log.id in egb_rollup_state) into per-guild, per-day aggregates, and stores
+    today's level distribution of each guild from the in-memory characters.
+    The dashboard then reads a few rows per day instead of scanning egb_log or egb_characters.
+
+    In multi-instance mode the log fold runs on the background-lease holder (start), while
+    every instance stores the level distribution of the guilds of its own shards (start_levels).
+    """
+
+    STATE_NAME = 'activity'
+    BATCH_IDS = 10000  # log ids folded per transaction
+
+    def __init__(self, pool: aiomysql.Pool):
+        self.pool = pool
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._levels_task: Optional[asyncio.Task] = None
+
+    async def run(self, levels_by_guild: Mapping[int, Iterable[int]] = None) -> int:
+        """
+        Fold new log rows into the rollups and snapshot today's level distribution
+        of every guild ({guild_id: levels}).
+        Returns the number of log rows folded.
+        """
+        async with self._lock:
+            folded = await self._fold_new_logs()
+        await self.store_levels(levels_by_guild or {})
+        return folded
+
+    async def store_levels(self, levels_by_guild: Mapping[int, Iterable[int]]):
+        """Snapshot today's level distribution of every given guild ({guild_id: levels})"""
+        for guild_id, levels in levels_by_guild.items():
+            histogram = Counter(levels)
+            if histogram:
+                await self._store_levels(guild_id, date.today(), histogram)
+
+    async def _fold_new_logs(self) -> int:
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                # The state row must exist for the FOR UPDATE below to lock it
+                await cursor.execute(
+                    'INSERT IGNORE INTO egb_rollup_state (name, last_log_id) VALUES (%s, 0)',
+                    (self.STATE_NAME,)
+                )
+                await conn.commit()
+
+                # Leave the last minute alone: rows still being inserted may commit out of id order
+                await cursor.execute(
+                    '''SELECT id FROM egb_log WHERE LogTime < NOW() - INTERVAL 1 MINUTE
+                       ORDER BY LogTime DESC LIMIT 1'''
+                )
+                row = await cursor.fetchone()
+                max_id = row[0] if row else 0
+
+            folded = 0
+            offensive = ', '.join(str(int(action)) for action in sorted(OFFENSIVE_ACTIONS))
+            while max_id:
+                await conn.begin()
+                try:
+                    async with conn.cursor() as cursor:
+                        # Locked until commit: another instance (or /admin activity) folding at the
+                        # same time waits here, then starts after the range committed by this one
+                        await cursor.execute(
+                            'SELECT last_log_id FROM egb_rollup_state WHERE name = %s FOR UPDATE',
+                            (self.STATE_NAME,)
+                        )
+                        (last_id,) = await cursor.fetchone()
+                        if last_id >= max_id:
+                            await conn.commit()
+                            break
+                        upper_id = min(last_id + self.BATCH_IDS, max_id)
+
+                        await cursor.execute(
+                            '''INSERT INTO egb_rollup_daily_actions
+                                   (guild_id, day, action_code, count, successes, amount_sum)
+                               SELECT GuildId, DATE(LogTime), ActionCode, COUNT(*),
+                                      SUM(COALESCE(Outcome, 0) = 1), COALESCE(SUM(Amount), 0)
+                               FROM egb_log WHERE id > %s AND id <= %s
+                               GROUP BY GuildId, DATE(LogTime), ActionCode
+                               ON DUPLICATE KEY UPDATE
+                                   count = count + VALUES(count),
+                                   successes = successes + VALUES(successes),
+                                   amount_sum = amount_sum + VALUES(amount_sum)''',
+                            (last_id, upper_id)
+                        )
+                        await cursor.execute(
+                            f'''INSERT INTO egb_rollup_daily_attackers (guild_id, day, discord_id, count)
+                                SELECT GuildId, DATE(LogTime), DiscordId, COUNT(*)
+                                FROM egb_log WHERE id > %s AND id <= %s AND ActionCode IN ({offensive})
+                                GROUP BY GuildId, DATE(LogTime), DiscordId
+                                ON DUPLICATE KEY UPDATE count = count + VALUES(count)''',
+                            (last_id, upper_id)
+                        )
+                        await cursor.execute(
+                            'SELECT COUNT(*) FROM egb_log WHERE id > %s AND id <= %s',
+                            (last_id, upper_id)
+                        )
+                        (batch_rows,) = await cursor.fetchone()
+                        await cursor.execute(
+                            'UPDATE egb_rollup_state SET last_log_id = %s WHERE name = %s',
+                            (upper_id, self.STATE_NAME)
+                        )
+                    await conn.commit()
+                except Exception:
+                    await conn.rollback()
+                    raise
+                folded += batch_rows
+        return folded
+
+    async def _store_levels(self, guild_id: int, day: date, histogram: Counter):
+        """Replace the level distribution of a guild for a day"""
+        async with self.pool.acquire() as conn:
+            await conn.begin()
+            try:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(
+                        'DELETE FROM egb_rollup_daily_levels WHERE guild_id = %s AND day = %s',
+                        (guild_id, day)
+                    )
+                    await cursor.executemany(
+                        'INSERT INTO egb_rollup_daily_levels (guild_id, day, level, players) VALUES (%s, %s, %s, %s)',
+                        [(guild_id, day, level, players) for level, players in sorted(histogram.items())]
+                    )
+                await conn.commit()
+            except Exception:
+                await conn.rollback()
+                raise
+
+    # ===== DASHBOARD READS =====
+    async def get_dashboard(self, guild_id: int, days: int = 7, top: int = 5) -> dict:
+        """
+        Rollup rows of a guild for the last `days` days:
+        {'daily': {day: {action_code: (count, successes)}}, 'attackers': [(discord_id, count)],
+         'levels': {level: players} (latest snapshot), 'levels_day': day or None}
+        """
+        since = date.today() - timedelta(days=days - 1)
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    '''SELECT day, action_code, count, successes FROM egb_rollup_daily_actions
+                       WHERE guild_id = %s AND day >= %s ORDER BY day''',
+                    (guild_id, since)
+                )
+                daily = {}
+                for day, action_code, count, successes in await cursor.fetchall():
+                    daily.setdefault(day, {})[action_code] = (count, successes)
+
+                await cursor.execute(
+                    '''SELECT discord_id, SUM(count) AS total FROM egb_rollup_daily_attackers
+                       WHERE guild_id = %s AND day >= %s GROUP BY discord_id ORDER BY total DESC LIMIT %s''',
+                    (guild_id, since, top)
+                )
+                attackers = [(discord_id, int(total)) for discord_id, total in await cursor.fetchall()]
+
+                await cursor.execute('SELECT MAX(day) FROM egb_rollup_daily_levels WHERE guild_id = %s', (guild_id,))
+                (levels_day,) = await cursor.fetchone()
+                levels = {}
+                if levels_day:
+                    await cursor.execute(
+                        'SELECT level, players FROM egb_rollup_daily_levels WHERE guild_id = %s AND day = %s',
+                        (guild_id, levels_day)
+                    )
+                    levels = dict(await cursor.fetchall())
+
+        return {'daily': daily, 'attackers': attackers, 'levels': levels, 'levels_day': levels_day}
+
+    # ===== BACKGROUND =====
+    def start(self, interval_minutes: float = 15):
+        """Fold the new log rows every interval_minutes (background-lease holder only)"""
+        if self._task:
+            return
+        self._task = asyncio.create_task(self._run_forever(interval_minutes * 60))
+
+    async def stop(self):
+        """Stop the log fold"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def start_levels(self, get_levels, interval_minutes: float = 15):
+        """Store the level distributions every interval_minutes; get_levels() returns the levels per guild"""
+        if self._levels_task:
+            return
+        self._levels_task = asyncio.create_task(self._store_levels_forever(get_levels, interval_minutes * 60))
+
+    async def stop_levels(self):
+        """Stop storing the level distributions"""
+        if self._levels_task:
+            self._levels_task.cancel()
+            await asyncio.gather(self._levels_task, return_exceptions=True)
+            self._levels_task = None
+
+    async def _run_forever(self, interval_seconds: float):
+        while True:
+            try:
+                async with self._lock:
+                    await self._fold_new_logs()
+            except Exception as e:
+                logger.error(f"Error in activity rollup: {e}")
+            await asyncio.sleep(interval_seconds)
+
+    async def _store_levels_forever(self, get_levels, interval_seconds: float):
+        while True:
+            try:
+                await self.store_levels(get_levels())
+            except Exception as e:
+                logger.error(f"Error storing level distributions: {e}")
+            await asyncio.sleep(interval_seconds)
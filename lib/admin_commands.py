@@ -0,0 +1,224 @@
+import discord
+from discord import app_commands
+import logging
+from typing import Optional
+from .clan_system import ClanSystem
+from .log_actions import LogAction, ABILITY_ACTIONS
+
+logger = logging.getLogger(__name__)
+
+
+class AdminCommands:
+    """
+    Contains the owner-only maintenance commands, grouped under /admin
+    """
+
+    @staticmethod
+    def register_commands(bot):
+        """Register the /admin command group to the bot"""
+
+        admin = app_commands.Group(
+            name="admin",
+            description="Commandes de maintenance du bot",
+            guild_only=True,
+            default_permissions=discord.Permissions(administrator=True)
+        )
+
+        async def is_owner(interaction: discord.Interaction) -> bool:
+            """Only the bot owner may run admin commands"""
+            if await bot.is_owner(interaction.user):
+                return True
+            await bot._send_error_embed(interaction, "Seul le propriétaire du bot peut utiliser cette commande.")
+            return False
+
+        # ===== SYNC =====
+        @admin.command(name="sync", description="Forcer la synchronisation des commandes avec Discord")
+        async def sync(interaction: discord.Interaction):
+            if not await is_owner(interaction):
+                return
+
+            await interaction.response.defer(ephemeral=True)
+            try:
+                count = await bot.command_sync.sync(force=True)
+                await interaction.followup.send(f"✅ {count} commande(s) synchronisée(s).", ephemeral=True)
+                logger.info(f"Forced sync of {count} commands")
+            except Exception as e:
+                logger.error(f"Error in admin sync command: {e}")
+                await interaction.followup.send("❌ La synchronisation a échoué.", ephemeral=True)
+
+        # ===== RELOAD =====
+        @admin.command(name="reload", description="Recharger la configuration (.env) sans redémarrer")
+        async def reload(interaction: discord.Interaction):
+            if not await is_owner(interaction):
+                return
+
+            try:
+                config = bot.reload_config()
+            except ValueError as e:
+                logger.warning(f"Invalid configuration, keeping the current one: {e}")
+                await bot._send_error_embed(interaction, f"Configuration invalide, l'ancienne est conservée : {e}")
+                return
+
+            await interaction.response.send_message(
+                f"✅ Configuration rechargée (chance de base {config.base_levelup_chance}%, "
+                f"+{config.bonus_per_hour}%/h, max {config.max_levelup_chance}%, "
+                f"cooldown {config.levelup_cooldown_hours}h).",
+                ephemeral=True
+            )
+
+        # ===== COMPACT =====
+        @admin.command(name="compact", description="Purger les lignes mortes des tables de jeu")
+        @app_commands.describe(dry_run="Compter seulement, sans rien supprimer (par défaut : oui)")
+        async def compact(interaction: discord.Interaction, dry_run: bool = True):
+            if not await is_owner(interaction):
+                return
+
+            await interaction.response.defer(ephemeral=True)
+            try:
+                report = await bot.compactor.run(dry_run=dry_run)
+                lines = [f"• {name} : **{count}**" for name, count in report.items()]
+                title = "🧹 Lignes à supprimer (simulation)" if dry_run else "🧹 Lignes supprimées"
+                await interaction.followup.send(f"{title}\n" + "\n".join(lines), ephemeral=True)
+            except Exception as e:
+                logger.error(f"Error in admin compact command: {e}")
+                await interaction.followup.send("❌ La purge a échoué.", ephemeral=True)
+
+        # ===== ARCHIVE LOGS =====
+        @admin.command(name="archive_logs", description="Archiver et supprimer les mois de logs hors rétention")
+        @app_commands.describe(dry_run="Lister seulement les partitions concernées (par défaut : oui)")
+        async def archive_logs(interaction: discord.Interaction, dry_run: bool = True):
+            if not await is_owner(interaction):
+                return
+
+            await interaction.response.defer(ephemeral=True)
+            try:
+                created = [] if dry_run else await bot.log_archiver.ensure_partitions()
+                archived = await bot.log_archiver.archive(dry_run=dry_run)
+                lines = [f"• {name} : **{rows}** ligne(s)" for name, rows in archived] or ["• aucune partition"]
+                title = "📦 Partitions à archiver (simulation)" if dry_run else "📦 Partitions archivées"
+                message = f"{title}\n" + "\n".join(lines)
+                if created:
+                    message += f"\nPartitions créées : {', '.join(created)}"
+                await interaction.followup.send(message, ephemeral=True)
+            except Exception as e:
+                logger.error(f"Error in admin archive_logs command: {e}")
+                await interaction.followup.send("❌ L'archivage a échoué.", ephemeral=True)
+
+        # ===== ACTIVITY =====
+        @admin.command(name="activity", description="Tableau de bord d'activité (agrégats journaliers)")
+        @app_commands.describe(days="Nombre de jours affichés (1 à 30, par défaut : 7)")
+        async def activity(interaction: discord.Interaction, days: app_commands.Range[int, 1, 30] = 7):
+            if not await is_owner(interaction):
+                return
+
+            await interaction.response.defer(ephemeral=True)
+            try:
+                await bot.activity_rollup.run(bot.get_all_levels())
+                dashboard = await bot.activity_rollup.get_dashboard(interaction.guild_id, days)
+
+                embed = discord.Embed(
+                    title=f"📈 Activité — {days} dernier(s) jour(s)",
+                    color=discord.Color.dark_purple()
+                )
+
+                lines = []
+                for day, actions in sorted(dashboard['daily'].items(), reverse=True):
+                    attempts, successes = actions.get(int(LogAction.LEVELUP), (0, 0))
+                    abilities = sum(count for code, (count, _) in actions.items() if code in ABILITY_ACTIONS)
+                    lines.append(
+                        f"`{day.strftime('%d/%m')}` 🎲 {attempts} tentative(s), {successes} succès · "
+                        f"🗡️ {abilities} capacité(s)"
+                    )
+                embed.add_field(name="Par jour", value="\n".join(lines) or "Aucune activité", inline=False)
+
+                if dashboard['attackers']:
+                    names = await bot.user_resolver.display_names(
+                        [discord_id for discord_id, _ in dashboard['attackers']], interaction.guild
+                    )
+                    embed.add_field(
+                        name="⚔️ Top attaquants",
+                        value="\n".join(
+                            f"{idx}. {names[discord_id]} — {count}"
+                            for idx, (discord_id, count) in enumerate(dashboard['attackers'], 1)
+                        ),
+                        inline=False
+                    )
+
+                if dashboard['levels']:
+                    clans = {}
+                    for level, players in sorted(dashboard['levels'].items()):
+                        clan_name = ClanSystem.get_clan_by_level(level)['name']
+                        clans[clan_name] = clans.get(clan_name, 0) + players
+                    embed.add_field(
+                        name=f"🦇 Répartition par clan ({dashboard['levels_day'].strftime('%d/%m')})",
+                        value="\n".join(f"{name} : {players}" for name, players in clans.items()),
+                        inline=False
+                    )
+
+                await interaction.followup.send(embed=embed, ephemeral=True)
+            except Exception as e:
+                logger.error(f"Error in admin activity command: {e}")
+                await interaction.followup.send("❌ Impossible de charger l'activité.", ephemeral=True)
+
+        # ===== ROLES =====
+        @admin.command(name="roles", description="Réparer les rôles de clan qui ne correspondent plus aux niveaux")
+        @app_commands.describe(
+            dry_run="Compter seulement, sans rien modifier (par défaut : oui)",
+            budget="Nombre maximal de requêtes Discord pour ce passage (par défaut : ROLE_RECONCILE_BUDGET)"
+        )
+        async def roles(interaction: discord.Interaction, dry_run: bool = True,
+                        budget: Optional[app_commands.Range[int, 1, 10000]] = None):
+            if not await is_owner(interaction):
+                return
+
+            await interaction.response.defer(ephemeral=True)
+
+            def summary(report: dict) -> str:
+                return (f"{report['checked']} membre(s) vérifié(s) · {report['fixed']} "
+                        f"{'à corriger' if dry_run else 'corrigé(s)'} · {report['skipped']} ignoré(s) · "
+                        f"{report['errors']} erreur(s) · {report['requests']} requête(s)")
+
+            async def progress(report: dict):
+                try:
+                    await interaction.edit_original_response(content=f"⏳ {summary(report)}")
+                except discord.HTTPException:
+                    pass
+
+            try:
+                await interaction.edit_original_response(content="⏳ Réconciliation des rôles en cours...")
+                report = await bot.role_reconciler.run(
+                    interaction.guild, dry_run=dry_run, budget=budget, progress=progress
+                )
+                title = "🦇 Rôles à corriger (simulation)" if dry_run else "🦇 Rôles réconciliés"
+                if not report['done'] and not dry_run:
+                    title += " — budget atteint, le prochain passage reprendra ici"
+                await interaction.edit_original_response(content=f"{title}\n{summary(report)}")
+            except Exception as e:
+                logger.error(f"Error in admin roles command: {e}")
+                await interaction.followup.send("❌ La réconciliation des rôles a échoué.", ephemeral=True)
+
+        # ===== EVENT LOOP =====
+        @admin.command(name="loop", description="Latence de la boucle d'événements (histogramme)")
+        async def loop(interaction: discord.Interaction):
+            if not await is_owner(interaction):
+                return
+
+            stats = bot.loop_monitor.stats()
+            embed = discord.Embed(
+                title="⏱️ Boucle d'événements",
+                description=(
+                    f"{stats['samples']} mesure(s) · p50 ≤ {stats['p50_ms'] or 0} ms · "
+                    f"p99 ≤ {stats['p99_ms'] or 0} ms · max {stats['max_ms']:.0f} ms\n"
+                    f"Blocages ≥ {bot.loop_monitor.alert_ms} ms : {stats['stalls']}"
+                ),
+                color=discord.Color.dark_purple()
+            )
+            overflow = f"> {bot.loop_monitor.BUCKETS_MS[-1]}"
+            lines = [
+                f"`{overflow if bound is None else f'≤ {bound}'} ms` {count}"
+                for bound, count in stats['histogram'] if count
+            ]
+            embed.add_field(name="Retard au réveil", value="\n".join(lines) or "Aucune mesure", inline=False)
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+
+        bot.tree.add_command(admin)
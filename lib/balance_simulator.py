@@ -0,0 +1,365 @@
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+try:
+    import numpy as np
+except ImportError:  # the simulator needs NumPy, the bot does not
+    np = None
+
+from .clan_system import ClanSystem
+from .probability import ProbabilityEngine
+
+
+@dataclass(frozen=True)
+class SimulationParams:
+    """
+    Settings of one balance simulation: the levelup rules (same meaning as the
+    BASE_LEVELUP_CHANCE / BONUS_PER_HOUR / MAX_LEVELUP_CHANCE / LEVELUP_COOLDOWN_HOURS
+    settings), ability amounts and the behavior of the simulated players.
+    """
+
+    # Population
+    players: int = 1000
+    days: int = 90
+    runs: int = 1  # independent guilds simulated side by side
+    step_hours: int = 1  # time resolution, must divide 24
+    seed: Optional[int] = None
+
+    # Levelup rules
+    base_chance: int = 20
+    bonus_per_hour: int = 5
+    max_chance: int = 80
+    cooldown_hours: int = 1
+
+    # Player behavior
+    active_share: float = 0.8  # share of players who play at all
+    attempts_per_day: float = 3.0  # mean /levelup attempts of an active player
+    min_chance: float = 0  # players only attempt once their chance reaches this (0: whenever they show up)
+    ability_use: float = 0.5  # daily probability of using an ability that is off cooldown
+
+    # Ability amounts (inclusive ranges, in %)
+    bless_range: tuple[int, int] = (3, 8)
+    devour_range: tuple[int, int] = (3, 8)
+    curse_amount: int = 5
+    steal_range: tuple[int, int] = (5, 10)
+    oppress_range: tuple[int, int] = (20, 50)
+    entomb_days: tuple[int, int] = (1, 2)
+
+    def __post_init__(self):
+        if self.players < 2 or self.days <= 0 or self.runs <= 0:
+            raise ValueError("players must be at least 2, days and runs positive")
+        if self.step_hours <= 0 or 24 % self.step_hours:
+            raise ValueError("step_hours must divide 24")
+        if not 0 <= self.active_share <= 1 or not 0 <= self.ability_use <= 1:
+            raise ValueError("active_share and ability_use must be between 0 and 1")
+        if self.attempts_per_day < 0:
+            raise ValueError("attempts_per_day must not be negative")
+        for name in ('bless_range', 'devour_range', 'steal_range', 'oppress_range', 'entomb_days'):
+            low, high = getattr(self, name)
+            if low > high:
+                raise ValueError(f"{name} must be (low, high)")
+
+    @classmethod
+    def from_config(cls, config, **overrides) -> 'SimulationParams':
+        """Simulation with the levelup rules of a Config"""
+        rules = dict(
+            base_chance=config.base_levelup_chance,
+            bonus_per_hour=config.bonus_per_hour,
+            max_chance=config.max_levelup_chance,
+            cooldown_hours=config.levelup_cooldown_hours,
+        )
+        rules.update(overrides)
+        return cls(**rules)
+
+
+class BalanceSimulator:
+    """
+    Offline Monte-Carlo model of the levelup economy.
+
+    Every player of every run is a cell of (runs, players) NumPy arrays, advanced
+    step_hours at a time with the rules of Character.attempt_to_levelup:
+    attempt cooldown and one success per day (both bypassed by swim), chance from
+    ProbabilityEngine plus the flat bonuses, bonuses consumed by each attempt,
+    no attempt under a leader curse.
+
+    At the start of each day, players may use the abilities their level unlocks
+    (ClanSystem levels and cooldowns): bless, devour, chaussette, curse, entomb,
+    swim, steal and oppress. Pacts, shields and sacrifices are not modeled.
+    """
+
+    MODELED_ABILITIES = ('bless', 'devour', 'chaussette', 'curse', 'entomb', 'swim', 'steal', 'oppress')
+
+    def __init__(self, params: SimulationParams):
+        if np is None:
+            raise RuntimeError("The balance simulator requires NumPy (pip install numpy)")
+        self.params = params
+        self.engine = ProbabilityEngine(params.base_chance, params.bonus_per_hour, params.max_chance)
+        self.rng = np.random.default_rng(params.seed)
+
+        # Unlock level and cooldown of each ability, from the highest clan (it lists them all)
+        abilities = list(ClanSystem.CLANS.values())[-1]['abilities']
+        self.abilities = {
+            a['command'].lstrip('/'): (a['level'], a['cooldown_days'], a['is_cooldown_global'])
+            for a in abilities if a['command'].lstrip('/') in self.MODELED_ABILITIES
+        }
+        self.clans = [(key, data['level_range'][0]) for key, data in ClanSystem.CLANS.items()]
+
+    def run(self) -> dict:
+        """
+        Simulate params.days days. Returns a report dict:
+        levels (final level histogram and percentiles), clans (final share per clan),
+        time_to_clan (days to reach each clan: share reached and p10/p50/p90),
+        leader (changes and tenure), totals (attempts, successes, ability uses) and timing.
+        """
+        p = self.params
+        rng = self.rng
+        shape = (p.runs, p.players)
+        runs = np.arange(p.runs)
+
+        self.level = np.ones(shape, dtype=np.int32)
+        self.last_attempt = np.full(shape, np.nan)  # hour of the last attempt
+        self.last_success_day = np.full(shape, -1, dtype=np.int32)
+        self.flat = np.zeros(shape)  # devour + bless/curse/steal, consumed by the next attempt
+        self.oppression = np.zeros(shape)
+        self.oppression_until = np.zeros(shape)
+        self.curse_until = np.zeros(shape)  # leader curse (entomb)
+        self.swim = np.zeros(shape, dtype=bool)
+        self.next_use = {  # first day each ability is usable again (per player, or per run if global)
+            name: np.zeros(p.runs if is_global else shape, dtype=np.int32)
+            for name, (_, _, is_global) in self.abilities.items()
+        }
+        self.uses = dict.fromkeys(self.abilities, 0)
+        active = rng.random(shape) < p.active_share
+        reached_day = np.full((len(self.clans),) + shape, -1, dtype=np.int32)
+        reached_day[0] = 0
+
+        attempt_rate = min(p.attempts_per_day * p.step_hours / 24, 1.0)
+        attempts = successes = 0
+        leader_changes = np.zeros(p.runs, dtype=np.int64)
+        leader = None
+
+        start = time.perf_counter()
+        for step in range(p.days * 24 // p.step_hours):
+            hour = step * p.step_hours
+            day = hour // 24
+
+            if hour % 24 == 0:
+                new_leader = self._leaders()
+                if leader is not None:
+                    leader_changes += new_leader != leader
+                leader = new_leader
+                self._use_abilities(day, hour, active, leader, runs)
+
+            hours_since = hour - self.last_attempt
+            can_attempt = self.swim | (
+                (np.isnan(hours_since) | (hours_since >= p.cooldown_hours))
+                & (self.last_success_day < day)
+            )
+            attempt = active & can_attempt & (self.curse_until <= hour) & (rng.random(shape) < attempt_rate)
+
+            flat = self.flat + np.where(self.oppression_until > hour, self.oppression, 0.0)
+            chance = self.engine.chances_from_hours(hours_since, flat)
+            if p.min_chance:
+                attempt &= self.swim | (chance >= p.min_chance)
+            success = attempt & (rng.random(shape) * 100 <= chance)
+
+            self.last_attempt[attempt] = hour
+            self.flat[attempt] = 0
+            self.swim[attempt] = False
+            self.level += success
+            self.last_success_day[success] = day
+            attempts += int(attempt.sum())
+            successes += int(success.sum())
+            if hour % 24 == 24 - p.step_hours:
+                self._track_clans(reached_day, day)
+        elapsed = time.perf_counter() - start
+
+        final_leader = self._leaders()
+        leader_changes += final_leader != leader
+        return {
+            'params': p,
+            'levels': self._level_report(active),
+            'clans': self._clan_report(active),
+            'time_to_clan': self._time_to_clan_report(reached_day, active),
+            'leader': {
+                'changes_per_run': float(leader_changes.mean()),
+                'mean_tenure_days': float(p.days / (leader_changes.mean() + 1)),
+                'final_level': float(self.level[runs, final_leader].mean()),
+            },
+            'totals': {
+                'attempts': attempts,
+                'successes': successes,
+                'success_rate': successes / attempts if attempts else 0.0,
+                'ability_uses': dict(self.uses),
+            },
+            'player_days': p.runs * p.players * p.days,
+            'elapsed_seconds': elapsed,
+        }
+
+    # ===== DAILY EVENTS =====
+    def _leaders(self):
+        """Leader of each run: highest level, then oldest last success (same order as get_top_characters)"""
+        key = self.level.astype(np.int64) * (self.params.days + 2) - (self.last_success_day + 1)
+        return key.argmax(axis=1)
+
+    def _track_clans(self, reached_day, day: int):
+        for index, (_, min_level) in enumerate(self.clans):
+            newly = (reached_day[index] < 0) & (self.level >= min_level)
+            reached_day[index][newly] = day
+
+    def _wants(self, name: str, day: int, active):
+        """Players who use an ability today: unlocked, off cooldown and willing"""
+        unlock_level = self.abilities[name][0]
+        next_use = self.next_use[name]
+        if next_use.ndim == 1:  # global cooldown: one value per run
+            next_use = next_use[:, None]
+        return (
+            active & (self.level >= unlock_level) & (next_use <= day)
+            & (self.rng.random(active.shape) < self.params.ability_use)
+        )
+
+    def _used(self, name: str, users, day: int):
+        self.next_use[name][users] = day + self.abilities[name][1]
+        self.uses[name] += int(users.sum())
+
+    def _targets(self, users):
+        """(run, target) indices of a random other player for each user"""
+        run_idx, user_idx = np.nonzero(users)
+        offset = self.rng.integers(1, self.params.players, size=user_idx.size)
+        return run_idx, user_idx, (user_idx + offset) % self.params.players
+
+    def _amounts(self, bounds: tuple[int, int], size: int):
+        return self.rng.integers(bounds[0], bounds[1] + 1, size=size)
+
+    def _use_abilities(self, day: int, hour: int, active, leader, runs):
+        p = self.params
+
+        users = self._wants('bless', day, active)
+        run_idx, _, target_idx = self._targets(users)
+        np.add.at(self.flat, (run_idx, target_idx), self._amounts(p.bless_range, run_idx.size))
+        self._used('bless', users, day)
+
+        users = self._wants('devour', day, active)
+        self.flat[users] += self._amounts(p.devour_range, int(users.sum()))
+        self._used('devour', users, day)
+
+        # Free level: counts as today's success and consumes the bonuses
+        users = self._wants('chaussette', day, active)
+        self.level += users
+        self.last_success_day[users] = day
+        self.flat[users] = 0
+        self.swim[users] = False
+        self._used('chaussette', users, day)
+
+        users = self._wants('curse', day, active)
+        run_idx, _, target_idx = self._targets(users)
+        np.subtract.at(self.flat, (run_idx, target_idx), p.curse_amount)
+        self._used('curse', users, day)
+
+        users = self._wants('steal', day, active)
+        run_idx, user_idx, target_idx = self._targets(users)
+        amounts = self._amounts(p.steal_range, run_idx.size)
+        np.subtract.at(self.flat, (run_idx, target_idx), amounts)
+        np.add.at(self.flat, (run_idx, user_idx), amounts)
+        self._used('steal', users, day)
+
+        users = self._wants('swim', day, active)
+        self.swim |= users
+        self._used('swim', users, day)
+
+        # Global cooldowns: one use per run
+        is_leader = np.zeros(active.shape, dtype=bool)
+        is_leader[runs, leader] = True
+
+        wants = self._wants('entomb', day, active & ~is_leader).any(axis=1)
+        entombed = wants & (self.curse_until[runs, leader] <= hour)
+        if entombed.any():
+            curse_days = self._amounts(p.entomb_days, int(entombed.sum()))
+            self.curse_until[runs[entombed], leader[entombed]] = hour + 24 * curse_days
+            self.next_use['entomb'][entombed] = day + self.abilities['entomb'][1]
+            self.uses['entomb'] += int(entombed.sum())
+
+        oppressed = self._wants('oppress', day, active & is_leader).any(axis=1)
+        if oppressed.any():
+            # Every player but the leader, until midnight
+            victims = oppressed[:, None] & ~is_leader
+            malus = -self._amounts(p.oppress_range, p.runs)[:, None]
+            self.oppression = np.where(victims, malus, self.oppression)
+            self.oppression_until[victims] = (day + 1) * 24
+            self.next_use['oppress'][oppressed] = day + self.abilities['oppress'][1]
+            self.uses['oppress'] += int(oppressed.sum())
+
+    # ===== REPORT =====
+    def _level_report(self, active) -> dict:
+        levels = self.level[active]
+        if not levels.size:
+            return {'histogram': {}, 'mean': 0.0, 'p10': 0, 'p50': 0, 'p90': 0, 'max': 0}
+        p10, p50, p90 = np.percentile(levels, [10, 50, 90])
+        counts = np.bincount(levels)
+        return {
+            'histogram': {level: int(count) for level, count in enumerate(counts) if count},
+            'mean': float(levels.mean()),
+            'p10': float(p10), 'p50': float(p50), 'p90': float(p90),
+            'max': int(levels.max()),
+        }
+
+    def _clan_report(self, active) -> dict:
+        levels = self.level[active]
+        bounds = [min_level for _, min_level in self.clans] + [np.iinfo(np.int32).max]
+        total = max(levels.size, 1)
+        return {
+            key: float(((levels >= bounds[i]) & (levels < bounds[i + 1])).sum() / total)
+            for i, (key, _) in enumerate(self.clans)
+        }
+
+    def _time_to_clan_report(self, reached_day, active) -> dict:
+        report = {}
+        total = max(int(active.sum()), 1)
+        for index, (key, _) in enumerate(self.clans[1:], start=1):
+            days = reached_day[index][active]
+            days = days[days >= 0]
+            entry = {'reached': days.size / total}
+            if days.size:
+                p10, p50, p90 = np.percentile(days, [10, 50, 90])
+                entry.update(p10=float(p10), p50=float(p50), p90=float(p90))
+            report[key] = entry
+        return report
+
+
+def format_report(report: dict) -> str:
+    """Plain-text summary of a BalanceSimulator.run() report"""
+    p = report['params']
+    levels = report['levels']
+    lines = [
+        f"{p.runs} run(s) x {p.players} players x {p.days} days "
+        f"({report['player_days']:,} player-days in {report['elapsed_seconds']:.2f}s)",
+        f"Rules: base {p.base_chance}%, +{p.bonus_per_hour}%/h, max {p.max_chance}%, cooldown {p.cooldown_hours}h",
+        "",
+        f"Levels: mean {levels['mean']:.1f}, p10 {levels['p10']:.0f}, p50 {levels['p50']:.0f}, "
+        f"p90 {levels['p90']:.0f}, max {levels['max']}",
+        "",
+        "Clan            share   reached   days p10 / p50 / p90",
+    ]
+    for key, share in report['clans'].items():
+        ttc = report['time_to_clan'].get(key)
+        if ttc is None:
+            lines.append(f"{key:<14} {share:6.1%}")
+        elif 'p50' in ttc:
+            lines.append(
+                f"{key:<14} {share:6.1%}   {ttc['reached']:6.1%}   "
+                f"{ttc['p10']:5.0f} / {ttc['p50']:5.0f} / {ttc['p90']:5.0f}"
+            )
+        else:
+            lines.append(f"{key:<14} {share:6.1%}   {ttc['reached']:6.1%}")
+
+    leader = report['leader']
+    totals = report['totals']
+    lines += [
+        "",
+        f"Leader: {leader['changes_per_run']:.1f} change(s) per run, "
+        f"mean tenure {leader['mean_tenure_days']:.1f} days, final level {leader['final_level']:.1f}",
+        f"Attempts: {totals['attempts']:,}, successes: {totals['successes']:,} ({totals['success_rate']:.1%})",
+        "Ability uses: " + ", ".join(f"{name} {count:,}" for name, count in totals['ability_uses'].items()),
+    ]
+    return "\n".join(lines)
@@ -0,0 +1,632 @@
+import aiomysql
+from datetime import datetime
+from typing import Optional
+
+# egb_character_effects.effect_type -> running total column on egb_character_bonuses
+EFFECT_TOTAL_COLUMNS = {
+    'bless': 'bless_total',
+    'curse': 'curse_total',
+    'steal_bonus': 'steal_bonus_total',
+    'steal_malus': 'steal_malus_total',
+}
+
+
+class BonusManager:
+    """
+    Manages per-player bonuses (egb_character_bonuses) and multi-source effects
+    (egb_character_effects) of one guild.
+    Effect rows are kept for attribution (/stats), while their per-type sums are
+    maintained on the bonus row in the same transaction, so the levelup path
+    reads a single row instead of aggregating effects.
+
+    Bonus rows and effect rows are cached in memory. Once load_all() has run,
+    a cache miss means the player has no row at all.
+    """
+
+    BONUS_COLUMNS = (
+        'devour_bonus', 'swim_active', 'leader_curse_until', 'oppression_malus',
+        'oppression_until', 'shield_until', 'bless_total', 'curse_total',
+        'steal_bonus_total', 'steal_malus_total'
+    )
+
+    # Expiry scheduler kind -> timed column
+    TIMED_COLUMNS = {
+        'shield': 'shield_until',
+        'leader_curse': 'leader_curse_until',
+        'oppression': 'oppression_until',
+    }
+
+    def __init__(self, pool: aiomysql.Pool, guild_id: int, expiry_scheduler=None, change_feed=None):
+        self.pool = pool
+        self.guild_id = guild_id
+        self.expiry_scheduler = expiry_scheduler
+        self.change_feed = change_feed
+        self._bonuses: dict[int, dict] = {}
+        self._effects: dict[int, list[dict]] = {}
+        self._warm = False
+        # One set per reload in progress: ids written on this instance meanwhile (None = everybody)
+        self._tracking: list[set] = []
+
+    # ===== BULK LOADING =====
+    async def load_all(self) -> tuple[int, int]:
+        """
+        Stream every non-empty bonus row and every effect row of the guild into the cache.
+        Returns (bonus_rows, effect_rows).
+        """
+        # Reads while reloading fall back to the database
+        self._warm = False
+        touched = set()
+        self._tracking.append(touched)
+        try:
+            bonuses, effects = await self._read_all()
+            bonuses, effects = await self._reread_touched(touched, bonuses, effects)
+        finally:
+            self._tracking.remove(touched)
+
+        # Entries cached while streaming are fresher than the streamed rows
+        bonuses.update(self._bonuses)
+        effects.update(self._effects)
+        self._bonuses = bonuses
+        self._effects = effects
+        self._warm = True
+        return len(bonuses), sum(len(rows) for rows in effects.values())
+
+    async def _read_all(self) -> tuple[dict[int, dict], dict[int, list[dict]]]:
+        """Every non-empty bonus row and every effect row of the guild, streamed"""
+        bonuses = {}
+        effects = {}
+        async with self.pool.acquire() as conn:
+            async with conn.cursor(aiomysql.SSDictCursor) as cursor:
+                await cursor.execute(
+                    f'''SELECT discord_id, {', '.join(self.BONUS_COLUMNS)}
+                        FROM egb_character_bonuses
+                        WHERE guild_id = %s
+                          AND (devour_bonus <> 0 OR swim_active
+                           OR leader_curse_until > NOW() OR oppression_until > NOW() OR shield_until > NOW()
+                           OR bless_total <> 0 OR curse_total <> 0
+                           OR steal_bonus_total <> 0 OR steal_malus_total <> 0)''',
+                    (self.guild_id,)
+                )
+                while rows := await cursor.fetchmany(1000):
+                    for row in rows:
+                        bonuses[row.pop('discord_id')] = row
+
+            async with conn.cursor(aiomysql.SSDictCursor) as cursor:
+                await cursor.execute(
+                    '''SELECT discord_id, effect_type, amount, source_discord_id
+                       FROM egb_character_effects
+                       WHERE guild_id = %s
+                       ORDER BY discord_id, effect_type, created_at''',
+                    (self.guild_id,)
+                )
+                while rows := await cursor.fetchmany(1000):
+                    for row in rows:
+                        effects.setdefault(row.pop('discord_id'), []).append(row)
+        return bonuses, effects
+
+    async def _reread_touched(self, touched: set, bonuses: dict[int, dict],
+                              effects: dict[int, list[dict]]) -> tuple[dict[int, dict], dict[int, list[dict]]]:
+        """
+        Re-read the players written on this instance while a load was reading (the load's
+        snapshot may predate the write, and a cold cache does not keep rows it does not hold),
+        until no write comes in during the re-read. None in touched reads everything again.
+        """
+        while touched:
+            discord_ids = set(touched)
+            touched.clear()
+            if None in discord_ids:
+                bonuses, effects = await self._read_all()
+                continue
+            fresh_bonuses, fresh_effects = await self._read_players(list(discord_ids))
+            for discord_id in discord_ids:
+                if discord_id in fresh_bonuses:
+                    bonuses[discord_id] = fresh_bonuses[discord_id]
+                else:
+                    bonuses.pop(discord_id, None)
+                effects[discord_id] = fresh_effects.get(discord_id, [])
+        return bonuses, effects
+
+    # ===== SNAPSHOT =====
+    def export_state(self) -> Optional[tuple[dict[int, dict], dict[int, list[dict]]]]:
+        """Cached (bonus rows, effect rows) by discord_id for a state snapshot, None while cold"""
+        return (self._bonuses, self._effects) if self._warm else None
+
+    async def restore(self, bonuses: dict[int, dict], effects: dict[int, list[dict]], since: datetime) -> int:
+        """
+        Fill the cache from a state snapshot, then re-read the players whose bonus row changed
+        at or after `since` (every effect insert or purge also updates the bonus row totals).
+        Returns the number of players re-read.
+        """
+        # Reads while restoring fall back to the database
+        self._warm = False
+        touched = set()
+        self._tracking.append(touched)
+        try:
+            changed = await self._read_changed(bonuses, effects, since)
+            bonuses, effects = await self._reread_touched(touched, bonuses, effects)
+        finally:
+            self._tracking.remove(touched)
+
+        # Entries cached while restoring are fresher than the snapshot
+        bonuses.update(self._bonuses)
+        effects.update(self._effects)
+        self._bonuses = bonuses
+        self._effects = effects
+        self._warm = True
+        return changed
+
+    async def _read_changed(self, bonuses: dict[int, dict], effects: dict[int, list[dict]], since: datetime) -> int:
+        """Update the snapshot rows with the players whose bonus row changed at or after `since`"""
+        async with self.pool.acquire() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                await cursor.execute(
+                    f'''SELECT discord_id, {', '.join(self.BONUS_COLUMNS)}
+                        FROM egb_character_bonuses
+                        WHERE guild_id = %s AND updated_at >= %s''',
+                    (self.guild_id, since)
+                )
+                changed = {row.pop('discord_id'): row for row in await cursor.fetchall()}
+
+                await cursor.execute(
+                    '''SELECT e.discord_id, e.effect_type, e.amount, e.source_discord_id
+                       FROM egb_character_effects e
+                       INNER JOIN egb_character_bonuses b
+                           ON b.guild_id = e.guild_id AND b.discord_id = e.discord_id
+                       WHERE b.guild_id = %s AND b.updated_at >= %s
+                       ORDER BY e.discord_id, e.effect_type, e.created_at''',
+                    (self.guild_id, since)
+                )
+                changed_effects = {discord_id: [] for discord_id in changed}
+                for row in await cursor.fetchall():
+                    changed_effects.setdefault(row.pop('discord_id'), []).append(row)
+
+        bonuses.update(changed)
+        effects.update(changed_effects)
+        return len(changed)
+
+    async def refresh(self, discord_id: Optional[int] = None):
+        """
+        Drop the cached bonus row and effects of a player changed by another instance
+        (None: every player) and read them again from the database if the cache is warm.
+        """
+        if discord_id is None:
+            self._bonuses, self._effects = {}, {}
+            if self._warm:
+                await self.load_all()
+            return
+
+        if not self._warm:
+            self._bonuses.pop(discord_id, None)
+            self._effects.pop(discord_id, None)
+            # A load in progress may have read the row before the change
+            for touched in self._tracking:
+                touched.add(discord_id)
+            return
+
+        # The cached entry stays readable until the new one replaces it; a write made here
+        # meanwhile may be missing from the read, which is then done again
+        touched = set()
+        self._tracking.append(touched)
+        try:
+            while True:
+                touched.clear()
+                bonuses, effects = await self._read_players([discord_id])
+                if discord_id not in touched and None not in touched:
+                    break
+        finally:
+            self._tracking.remove(touched)
+        if discord_id in bonuses:
+            self._bonuses[discord_id] = bonuses[discord_id]
+        else:
+            self._bonuses.pop(discord_id, None)
+        self._effects[discord_id] = effects.get(discord_id, [])
+
+    async def _read_players(self, discord_ids: list[int]) -> tuple[dict[int, dict], dict[int, list[dict]]]:
+        """Bonus rows and effect rows of some players, straight from the database"""
+        placeholders = ', '.join(['%s'] * len(discord_ids))
+        async with self.pool.acquire() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                await cursor.execute(
+                    f'''SELECT discord_id, {', '.join(self.BONUS_COLUMNS)}
+                        FROM egb_character_bonuses
+                        WHERE guild_id = %s AND discord_id IN ({placeholders})''',
+                    (self.guild_id, *discord_ids)
+                )
+                bonuses = {row.pop('discord_id'): row for row in await cursor.fetchall()}
+
+                await cursor.execute(
+                    f'''SELECT discord_id, effect_type, amount, source_discord_id
+                        FROM egb_character_effects
+                        WHERE guild_id = %s AND discord_id IN ({placeholders})
+                        ORDER BY discord_id, effect_type, created_at''',
+                    (self.guild_id, *discord_ids)
+                )
+                effects = {}
+                for row in await cursor.fetchall():
+                    effects.setdefault(row.pop('discord_id'), []).append(row)
+        return bonuses, effects
+
+    # ===== READS =====
+    async def get_bonuses(self, discord_id: int) -> Optional[dict]:
+        """
+        Load the bonus row of a player (including effect totals).
+        Returns None if the player has no bonus row.
+        """
+        if discord_id in self._bonuses:
+            return self._bonuses[discord_id]
+        if self._warm:
+            return None
+
+        async with self.pool.acquire() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                await cursor.execute(
+                    f'''SELECT {', '.join(self.BONUS_COLUMNS)}
+                        FROM egb_character_bonuses
+                        WHERE guild_id = %s AND discord_id = %s''',
+                    (self.guild_id, discord_id)
+                )
+                row = await cursor.fetchone()
+        if row:
+            self._bonuses[discord_id] = row
+        return row
+
+    async def get_bonuses_many(self, discord_ids: list[int]) -> dict[int, dict]:
+        """
+        Load the bonus rows of several players with a single IN query for the cache misses.
+        Returns {discord_id: row}; players without a bonus row are absent.
+        """
+        found = {i: self._bonuses[i] for i in discord_ids if i in self._bonuses}
+        missing = [i for i in dict.fromkeys(discord_ids) if i not in found]
+        if not missing or self._warm:
+            return found
+
+        placeholders = ', '.join(['%s'] * len(missing))
+        async with self.pool.acquire() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                await cursor.execute(
+                    f'''SELECT discord_id, {', '.join(self.BONUS_COLUMNS)}
+                        FROM egb_character_bonuses
+                        WHERE guild_id = %s AND discord_id IN ({placeholders})''',
+                    (self.guild_id, *missing)
+                )
+                rows = await cursor.fetchall()
+        for row in rows:
+            discord_id = row.pop('discord_id')
+            self._bonuses[discord_id] = row
+            found[discord_id] = row
+        return found
+
+    def get_cached_swim_flag(self, discord_id: int) -> Optional[bool]:
+        """
+        Swim flag from the cache only (no database access).
+        Returns None if the player's bonus row is not known yet.
+        """
+        if discord_id in self._bonuses:
+            return bool(self._bonuses[discord_id].get('swim_active'))
+        return False if self._warm else None
+
+    def get_cached_leader_curse(self, discord_id: int) -> Optional[datetime]:
+        """
+        End of the leader curse from the cache only (no database access).
+        Returns None if there is none or the player's bonus row is not known yet.
+        """
+        row = self._bonuses.get(discord_id)
+        return row.get('leader_curse_until') if row else None
+
+    async def get_effects(self, discord_id: int) -> list[dict]:
+        """
+        Effect rows of a player (effect_type, amount, source_discord_id),
+        ordered by type then creation date.
+        """
+        if discord_id in self._effects:
+            return self._effects[discord_id]
+        if self._warm:
+            return []
+
+        async with self.pool.acquire() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                await cursor.execute(
+                    '''SELECT effect_type, amount, source_discord_id
+                       FROM egb_character_effects
+                       WHERE guild_id = %s AND discord_id = %s
+                       ORDER BY effect_type, created_at''',
+                    (self.guild_id, discord_id)
+                )
+                rows = list(await cursor.fetchall())
+        self._effects[discord_id] = rows
+        return rows
+
+    # ===== EFFECTS (bless, curse, steal) =====
+    async def add_effect(self, discord_id: int, source_id: int, effect_type: str, amount: int):
+        """Record a single bless/curse/steal effect on a player"""
+        await self.add_effects([(discord_id, source_id, effect_type, amount)])
+
+    async def add_effects(self, effects: list[tuple[int, int, str, int]]):
+        """
+        Record several effects at once: (discord_id, source_discord_id, effect_type, amount).
+        Detail rows and running totals are written in a single transaction.
+        """
+        async with self.pool.acquire() as conn:
+            await conn.begin()
+            try:
+                async with conn.cursor() as cursor:
+                    for discord_id, source_id, effect_type, amount in effects:
+                        column = EFFECT_TOTAL_COLUMNS[effect_type]
+                        await cursor.execute(
+                            '''INSERT INTO egb_character_effects (guild_id, discord_id, source_discord_id, effect_type, amount)
+                               VALUES (%s, %s, %s, %s, %s)''',
+                            (self.guild_id, discord_id, source_id, effect_type, amount)
+                        )
+                        await cursor.execute(
+                            f'''INSERT INTO egb_character_bonuses (guild_id, discord_id, {column})
+                                VALUES (%s, %s, %s)
+                                ON DUPLICATE KEY UPDATE {column} = {column} + VALUES({column})''',
+                            (self.guild_id, discord_id, amount)
+                        )
+                await conn.commit()
+            except Exception:
+                await conn.rollback()
+                raise
+
+        for discord_id, source_id, effect_type, amount in effects:
+            row = self._cached_row(discord_id)
+            if row is not None:
+                column = EFFECT_TOTAL_COLUMNS[effect_type]
+                row[column] = (row.get(column) or 0) + amount
+            if discord_id in self._effects or self._warm:
+                self._effects.setdefault(discord_id, []).append(
+                    {'effect_type': effect_type, 'amount': amount, 'source_discord_id': source_id}
+                )
+        for discord_id in dict.fromkeys(effect[0] for effect in effects):
+            self._publish(discord_id)
+
+    async def consume_levelup_bonuses(self, discord_id: int):
+        """
+        Clear every one-shot bonus after a levelup (devour, swim, bless, curse, steal).
+        Timed states (leader curse, oppression, shield) are left untouched.
+        """
+        async with self.pool.acquire() as conn:
+            await conn.begin()
+            try:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(
+                        '''UPDATE egb_character_bonuses
+                           SET devour_bonus = 0, swim_active = FALSE,
+                               bless_total = 0, curse_total = 0,
+                               steal_bonus_total = 0, steal_malus_total = 0
+                           WHERE guild_id = %s AND discord_id = %s''',
+                        (self.guild_id, discord_id)
+                    )
+                    await cursor.execute(
+                        'DELETE FROM egb_character_effects WHERE guild_id = %s AND discord_id = %s',
+                        (self.guild_id, discord_id)
+                    )
+                await conn.commit()
+            except Exception:
+                await conn.rollback()
+                raise
+
+        row = self._bonuses.get(discord_id)
+        if row is not None:
+            row.update(devour_bonus=0, swim_active=False, bless_total=0, curse_total=0,
+                       steal_bonus_total=0, steal_malus_total=0)
+        if discord_id in self._effects or self._warm:
+            self._effects[discord_id] = []
+        self._publish(discord_id)
+
+    # ===== SINGLE-SOURCE BONUSES =====
+    async def add_devour_bonus(self, discord_id: int, amount: int):
+        """Add a devour bonus for the next levelup (cumulative)"""
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    '''INSERT INTO egb_character_bonuses (guild_id, discord_id, devour_bonus)
+                       VALUES (%s, %s, %s)
+                       ON DUPLICATE KEY UPDATE devour_bonus = devour_bonus + %s''',
+                    (self.guild_id, discord_id, amount, amount)
+                )
+        row = self._cached_row(discord_id)
+        if row is not None:
+            row['devour_bonus'] = (row.get('devour_bonus') or 0) + amount
+        self._publish(discord_id)
+
+    async def activate_swim(self, discord_id: int):
+        """Grant the swim bonus (next levelup bypasses cooldowns)"""
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    '''INSERT INTO egb_character_bonuses (guild_id, discord_id, swim_active)
+                       VALUES (%s, %s, TRUE)
+                       ON DUPLICATE KEY UPDATE swim_active = TRUE''',
+                    (self.guild_id, discord_id)
+                )
+        row = self._cached_row(discord_id)
+        if row is not None:
+            row['swim_active'] = True
+        self._publish(discord_id)
+
+    async def set_leader_curse(self, discord_id: int, until: datetime):
+        """Entomb a player until the given date"""
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    '''INSERT INTO egb_character_bonuses (guild_id, discord_id, leader_curse_until)
+                       VALUES (%s, %s, %s)
+                       ON DUPLICATE KEY UPDATE leader_curse_until = %s''',
+                    (self.guild_id, discord_id, until, until)
+                )
+        row = self._cached_row(discord_id)
+        if row is not None:
+            row['leader_curse_until'] = until
+        self._publish(discord_id)
+        if self.expiry_scheduler:
+            self.expiry_scheduler.schedule(self.guild_id, 'leader_curse', discord_id, until)
+
+    async def set_shield(self, discord_id: int, until: datetime):
+        """Activate (or refresh) a shield until the given date"""
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    '''INSERT INTO egb_character_bonuses (guild_id, discord_id, shield_until)
+                       VALUES (%s, %s, %s)
+                       ON DUPLICATE KEY UPDATE shield_until = %s''',
+                    (self.guild_id, discord_id, until, until)
+                )
+        row = self._cached_row(discord_id)
+        if row is not None:
+            row['shield_until'] = until
+        self._publish(discord_id)
+        if self.expiry_scheduler:
+            self.expiry_scheduler.schedule(self.guild_id, 'shield', discord_id, until)
+
+    async def has_active_shield(self, discord_id: int) -> bool:
+        """Check if a player currently has an active shield"""
+        bonuses = await self.get_bonuses(discord_id)
+        return bool(bonuses and bonuses.get('shield_until') and bonuses['shield_until'] > datetime.now())
+
+    async def consume_shield(self, discord_id: int) -> bool:
+        """Consume an active shield. Returns True if there was one."""
+        if not await self.has_active_shield(discord_id):
+            return False
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    'UPDATE egb_character_bonuses SET shield_until = NULL WHERE guild_id = %s AND discord_id = %s',
+                    (self.guild_id, discord_id)
+                )
+        row = self._bonuses.get(discord_id)
+        if row is not None:
+            row['shield_until'] = None
+        self._publish(discord_id)
+        return True
+
+    async def apply_oppression(self, leader_id: int, malus: int, until: datetime) -> int:
+        """
+        Apply an oppression malus to every player of the guild except the leader.
+        Returns the number of affected rows.
+        """
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    '''INSERT INTO egb_character_bonuses (guild_id, discord_id, oppression_malus, oppression_until)
+                    SELECT guild_id, discord_id, %s, %s FROM egb_characters WHERE guild_id = %s AND discord_id != %s
+                    ON DUPLICATE KEY UPDATE
+                        oppression_malus = VALUES(oppression_malus),
+                        oppression_until = VALUES(oppression_until)''',
+                    (malus, until, self.guild_id, leader_id)
+                )
+                affected_count = cursor.rowcount
+
+        if self.expiry_scheduler:
+            # One entry for everybody: the malus ends at the same time for all players of the guild
+            self.expiry_scheduler.schedule(self.guild_id, 'oppression', None, until)
+
+        # Every player got a row: reload instead of patching the cache row by row
+        self._bonuses = {}
+        if self._warm:
+            await self.load_all()
+        self._publish(None)
+        return affected_count
+
+    # ===== EXPIRY =====
+    async def load_expiries(self) -> list[tuple[datetime, str, Optional[int]]]:
+        """
+        Every timed state of the guild still set in the database, expired or not, as (expires_at, kind, discord_id).
+        Oppression is returned once per distinct end date, with discord_id None (it applies to everybody).
+        """
+        expiries = []
+        oppression_ends = set()
+        async with self.pool.acquire() as conn:
+            async with conn.cursor(aiomysql.SSCursor) as cursor:
+                await cursor.execute(
+                    '''SELECT discord_id, shield_until, leader_curse_until, oppression_until
+                       FROM egb_character_bonuses
+                       WHERE guild_id = %s
+                         AND (shield_until IS NOT NULL OR leader_curse_until IS NOT NULL
+                          OR oppression_until IS NOT NULL)''',
+                    (self.guild_id,)
+                )
+                while rows := await cursor.fetchmany(1000):
+                    for discord_id, shield_until, leader_curse_until, oppression_until in rows:
+                        if shield_until:
+                            expiries.append((shield_until, 'shield', discord_id))
+                        if leader_curse_until:
+                            expiries.append((leader_curse_until, 'leader_curse', discord_id))
+                        if oppression_until:
+                            oppression_ends.add(oppression_until)
+        expiries.extend((until, 'oppression', None) for until in oppression_ends)
+        return expiries
+
+    async def expire_timed_states(self, kind: str, discord_ids: Optional[list[int]], now: datetime) -> list[int]:
+        """
+        Clear a timed state (shield, leader_curse, oppression) that ended before `now`,
+        for the given players (None = every player of the guild) in one batched UPDATE.
+        Returns the ids whose state was actually cleared (refreshed states are left alone).
+        """
+        column = self.TIMED_COLUMNS[kind]
+        where = f'guild_id = %s AND {column} <= %s'
+        params = [self.guild_id, now]
+        if discord_ids is not None:
+            if not discord_ids:
+                return []
+            where += f" AND discord_id IN ({', '.join(['%s'] * len(discord_ids))})"
+            params += discord_ids
+        assignments = f'{column} = NULL' + (', oppression_malus = 0' if kind == 'oppression' else '')
+
+        async with self.pool.acquire() as conn:
+            await conn.begin()
+            try:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(
+                        f'SELECT discord_id FROM egb_character_bonuses WHERE {where} FOR UPDATE',
+                        params
+                    )
+                    expired = [row[0] for row in await cursor.fetchall()]
+                    if expired:
+                        await cursor.execute(
+                            f'UPDATE egb_character_bonuses SET {assignments} WHERE {where}',
+                            params
+                        )
+                await conn.commit()
+            except Exception:
+                await conn.rollback()
+                raise
+
+        for discord_id in expired:
+            row = self._bonuses.get(discord_id)
+            if row is not None:
+                row[column] = None
+                if kind == 'oppression':
+                    row['oppression_malus'] = 0
+        if expired:
+            self._publish(None if discord_ids is None else expired)
+        return expired
+
+    def _publish(self, discord_ids):
+        """
+        Called after every write: record it for the reloads in progress, and tell the other
+        instances that bonus rows changed (an id, a list of ids, or None for everybody)
+        """
+        discord_ids = discord_ids if isinstance(discord_ids, list) else [discord_ids]
+        for touched in self._tracking:
+            touched.update(discord_ids)
+        if not self.change_feed:
+            return
+        for discord_id in discord_ids:
+            self.change_feed.publish(self.guild_id, 'bonus', discord_id)
+
+    def _cached_row(self, discord_id: int) -> Optional[dict]:
+        """
+        Mutable cached bonus row to patch after a write.
+        Once warm, a missing row is created with default values; otherwise
+        a missing row is left to be loaded from the database on next read.
+        """
+        row = self._bonuses.get(discord_id)
+        if row is None and self._warm:
+            row = {
+                'devour_bonus': 0, 'swim_active': False, 'leader_curse_until': None,
+                'oppression_malus': 0, 'oppression_until': None, 'shield_until': None,
+                'bless_total': 0, 'curse_total': 0, 'steal_bonus_total': 0, 'steal_malus_total': 0
+            }
+            self._bonuses[discord_id] = row
+        return row
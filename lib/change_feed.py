@@ -0,0 +1,129 @@
+import asyncio
+import json
+import logging
+from typing import Awaitable, Callable, Optional
+import aiomysql
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeFeed:
+    """
+    Cache invalidation between bot instances sharing one database.
+
+    Writers publish (guild_id, kind, discord_id, payload) changes; they are buffered
+    and flushed as one multi-row INSERT into egb_change_feed. Every instance polls
+    the table by id and hands the changes written by other instances to on_change,
+    which drops or refreshes the matching cache entries.
+
+    Ids are allocated before commit, so a row can become visible after a higher id:
+    rows younger than SETTLE_SECONDS are read again on the next polls (already applied
+    ids are skipped) and the cursor only moves past settled rows.
+    """
+
+    KINDS = ('character', 'bonus', 'cooldown', 'pact', 'sacrifice', 'pending_pact')
+    SETTLE_SECONDS = 5
+    BATCH_SIZE = 1000
+
+    def __init__(self, pool: aiomysql.Pool, instance_id: str,
+                 on_change: Callable[[int, str, Optional[int], Optional[dict]], Awaitable[None]],
+                 poll_interval: float = 1.0):
+        self.pool = pool
+        self.instance_id = instance_id
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self._pending: list[tuple] = []
+        self._cursor = 0
+        self._applied: set[int] = set()  # ids above the cursor already handled
+        self._task: Optional[asyncio.Task] = None
+
+    def publish(self, guild_id: int, kind: str, discord_id: Optional[int] = None, payload: Optional[dict] = None):
+        """
+        Queue a change (discord_id None: every player of the guild).
+        Never blocks: the queue is flushed by the poll loop.
+        """
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown change kind: {kind}")
+        self._pending.append((self.instance_id, guild_id, kind, discord_id, json.dumps(payload) if payload else None))
+
+    async def prime(self):
+        """Start reading after the current last change (older ones are covered by the warm-up)"""
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute('SELECT COALESCE(MAX(id), 0) FROM egb_change_feed')
+                (self._cursor,) = await cursor.fetchone()
+
+    async def flush(self) -> int:
+        """Write the queued changes. Returns the number of rows written."""
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, []
+        try:
+            async with self.pool.acquire() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.executemany(
+                        '''INSERT INTO egb_change_feed (instance_id, guild_id, kind, discord_id, payload)
+                           VALUES (%s, %s, %s, %s, %s)''',
+                        pending
+                    )
+        except Exception:
+            self._pending[:0] = pending  # keep them for the next flush
+            raise
+        return len(pending)
+
+    async def poll(self) -> int:
+        """Apply the changes of other instances written since the last poll. Returns the number applied."""
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    '''SELECT id, instance_id, guild_id, kind, discord_id, payload,
+                              created_at < NOW(3) - INTERVAL %s SECOND AS settled
+                       FROM egb_change_feed WHERE id > %s ORDER BY id LIMIT %s''',
+                    (self.SETTLE_SECONDS, self._cursor, self.BATCH_SIZE)
+                )
+                rows = await cursor.fetchall()
+
+        applied = 0
+        unsettled_seen = False
+        for change_id, instance_id, guild_id, kind, discord_id, payload, settled in rows:
+            if change_id not in self._applied:
+                self._applied.add(change_id)
+                if instance_id != self.instance_id:
+                    try:
+                        await self.on_change(guild_id, kind, discord_id, json.loads(payload) if payload else None)
+                        applied += 1
+                    except Exception as e:
+                        logger.error(f"Error applying change {change_id} ({kind}): {e}")
+            unsettled_seen = unsettled_seen or not settled
+            if not unsettled_seen:
+                self._cursor = change_id
+
+        self._applied = {change_id for change_id in self._applied if change_id > self._cursor}
+        return applied
+
+    # ===== BACKGROUND =====
+    def start(self):
+        """Flush and poll every poll_interval seconds in the background"""
+        if self._task:
+            return
+        self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self):
+        """Stop the background task and write the last queued changes"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Error flushing change feed: {e}")
+
+    async def _run_forever(self):
+        while True:
+            try:
+                await self.flush()
+                await self.poll()
+            except Exception as e:
+                logger.error(f"Error in change feed: {e}")
+            await asyncio.sleep(self.poll_interval)
@@ -1,17 +1,64 @@
-from datetime import datetime, date, timedelta
+from datetime import datetime, date
 import random
+import time
+from typing import Iterable
+from .probability import ProbabilityEngine
 
 class Character:
     """
     Character domain model - contains only business logic, no database code
+
+    Slotted and compact, since the whole player base is cached in memory:
+    last attempt is kept as epoch seconds and last successful levelup as a
+    date ordinal; the getters still return datetime / date.
     """
+    __slots__ = ('_discordId', '_level', '_lastAttempt', '_lastSuccessfulLevelup')
+
     def __init__(self, discord_id: int, level: int = 1, last_attempt: datetime = None, 
                  last_successful_levelup: date = None):
         self._discordId = discord_id
         self._level = level
-        self._lastAttempt = last_attempt
-        self._lastSuccessfulLevelup = last_successful_levelup  # Date only, not datetime
-   
+        self._lastAttempt = int(last_attempt.timestamp()) if last_attempt else None  # Epoch seconds
+        self._lastSuccessfulLevelup = last_successful_levelup.toordinal() if last_successful_levelup else None  # Date only
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple]) -> list['Character']:
+        """
+        Build many characters from (discord_id, level, last_attempt, last_successful_levelup)
+        tuples, as returned by a plain cursor (no dict per row)
+        """
+        characters = []
+        new = cls.__new__
+        for discord_id, level, last_attempt, last_successful_levelup in rows:
+            character = new(cls)
+            character._discordId = discord_id
+            character._level = level
+            character._lastAttempt = int(last_attempt.timestamp()) if last_attempt else None
+            character._lastSuccessfulLevelup = last_successful_levelup.toordinal() if last_successful_levelup else None
+            characters.append(character)
+        return characters
+
+    @classmethod
+    def from_epochs(cls, rows: Iterable[tuple]) -> list['Character']:
+        """
+        Build many characters from (discord_id, level, last_attempt epoch, last_successful_levelup ordinal)
+        tuples, the internal representation returned by epochs() (None for unset timestamps)
+        """
+        characters = []
+        new = cls.__new__
+        for discord_id, level, last_attempt, last_successful_levelup in rows:
+            character = new(cls)
+            character._discordId = discord_id
+            character._level = level
+            character._lastAttempt = last_attempt
+            character._lastSuccessfulLevelup = last_successful_levelup
+            characters.append(character)
+        return characters
+
+    def epochs(self) -> tuple:
+        """Internal representation: (discord_id, level, last_attempt epoch, last_successful_levelup ordinal)"""
+        return self._discordId, self._level, self._lastAttempt, self._lastSuccessfulLevelup
+
     # Getters
     def get_discord_id(self) -> int:
         return self._discordId
@@ -20,10 +67,10 @@ class Character:
         return self._level
     
     def get_last_attempt(self) -> datetime:
-        return self._lastAttempt
+        return datetime.fromtimestamp(self._lastAttempt) if self._lastAttempt is not None else None
    
     def get_last_successful_levelup(self) -> date:
-        return self._lastSuccessfulLevelup
+        return date.fromordinal(self._lastSuccessfulLevelup) if self._lastSuccessfulLevelup is not None else None
     
     # Business Logic
     def can_attempt_levelup(self, cooldown_hours: int = 1, has_swim_bonus: bool = False) -> tuple[bool, str]:
@@ -36,17 +83,17 @@ class Character:
         if has_swim_bonus:
             return True, "Bonus Nage actif !"
 
-        today = date.today()
+        today = date.today().toordinal()
         
         # Check attempt cooldown first (1 hour between ANY attempts)
-        if self._lastAttempt:
-            now = datetime.now()
-            time_since_last = now - self._lastAttempt
-            cooldown = timedelta(hours=cooldown_hours)
+        if self._lastAttempt is not None:
+            time_since_last = time.time() - self._lastAttempt
+            cooldown = cooldown_hours * 3600
             
             if time_since_last < cooldown:
-                remaining_minutes = (cooldown - time_since_last).seconds // 60
-                remaining_seconds = (cooldown - time_since_last).seconds % 60
+                remaining = int(cooldown - time_since_last)
+                remaining_minutes = remaining // 60
+                remaining_seconds = remaining % 60
                 
                 if remaining_minutes > 0:
                     return False, f"Attends encore {remaining_minutes} minute(s) et {remaining_seconds} seconde(s) avant de réessayer."
@@ -54,7 +101,7 @@ class Character:
                     return False, f"Attends encore {remaining_seconds} seconde(s) avant de réessayer."
         
         # Then check if already leveled up successfully today (prevents multiple successes per day)
-        if self._lastSuccessfulLevelup and self._lastSuccessfulLevelup >= today:
+        if self._lastSuccessfulLevelup is not None and self._lastSuccessfulLevelup >= today:
             return False, "Tu as déjà réussi un level up aujourd'hui ! Reviens demain."
         
         return True, "Prêt !"
@@ -64,15 +111,7 @@ class Character:
         """
         Calculate success chance based on time since last attempt
         """
-        if not self._lastAttempt:
-            return base_chance
-        
-        now = datetime.now()
-        hours_since_last = (now - self._lastAttempt).total_seconds() / 3600
-        
-        # Add bonus per hour waited, cap at max_chance
-        bonus = min(hours_since_last * bonus_per_hour, max_chance - base_chance)
-        return min(base_chance + bonus, max_chance)
+        return ProbabilityEngine(base_chance, bonus_per_hour, max_chance).time_chance(self.get_last_attempt())
 
     def attempt_to_levelup(self, base_chance: int = 20, bonus_per_hour: int = 5,
                           max_chance: int = 80, flat_chance: int = 0, cooldown_hours: int = 1, has_swim_bonus: bool = False) -> tuple[bool, str, float]:
@@ -85,12 +124,10 @@ class Character:
         if not can_attempt:
             return False, msg, 0
                
-        probability = self.calculate_success_chance(base_chance, bonus_per_hour, max_chance)
-        probability += flat_chance
-        probability = max(min(probability, 100.0), 0.0)
+        engine = ProbabilityEngine(base_chance, bonus_per_hour, max_chance)
+        probability = engine.success_chance(self.get_last_attempt(), flat_chance)
 
-        now = datetime.now()
-        self._lastAttempt = now
+        self._lastAttempt = int(time.time())
 
         success = random.random() <= (probability / 100.0)
         
@@ -103,7 +140,7 @@ class Character:
     def _level_up(self):
         """Internal method to increase level"""
         self._level += 1
-        self._lastSuccessfulLevelup = date.today()
+        self._lastSuccessfulLevelup = date.today().toordinal()
 
     def _level_down(self):
         """Internal method to decrease level (minimum 1)"""
@@ -115,6 +152,6 @@ class Character:
         return {
             'discord_id': self._discordId,
             'level': self._level,
-            'last_attempt': self._lastAttempt,
-            'last_successful_levelup': self._lastSuccessfulLevelup
+            'last_attempt': self.get_last_attempt(),
+            'last_successful_levelup': self.get_last_successful_levelup()
         }
\ No newline at end of file
@@ -1,15 +1,19 @@
 import aiomysql
-import sys
+import logging
+from datetime import datetime
 from typing import Optional
 from .character import Character
 
+logger = logging.getLogger(__name__)
+
 class CharacterRepository:
     """
     Repository pattern for Character database operations
-    Handles all SQL queries related to characters
+    Handles all SQL queries related to characters of one guild
     """
-    def __init__(self, mdb_pool: aiomysql.Pool):
+    def __init__(self, mdb_pool: aiomysql.Pool, guild_id: int):
         self.mdb_pool = mdb_pool
+        self.guild_id = guild_id
 
     async def get_character(self, discord_id: int) -> Optional[Character]:
         """
@@ -18,27 +22,40 @@ class CharacterRepository:
         """
         try:
             async with self.mdb_pool.acquire() as conn:
-                async with conn.cursor(aiomysql.DictCursor) as cursor:
+                async with conn.cursor() as cursor:
                     await cursor.execute(
                         '''SELECT discord_id, level, last_attempt, last_successful_levelup
                            FROM egb_characters
-                           WHERE discord_id = %s''',
-                        (discord_id,)
+                           WHERE guild_id = %s AND discord_id = %s''',
+                        (self.guild_id, discord_id)
                     )
-                    data = await cursor.fetchone()
+                    row = await cursor.fetchone()
 
-            if data:
-                return Character(
-                    discord_id=data['discord_id'],
-                    level=data['level'],
-                    last_attempt=data['last_attempt'],
-                    last_successful_levelup=data['last_successful_levelup']
-                )
-            return None
+            return Character.from_rows([row])[0] if row else None
         except Exception as e:
-            print(f"Error loading character {discord_id}: {e}", file=sys.stderr)
+            logger.error(f"Error loading character {discord_id}: {e}")
             return None
 
+    async def get_characters(self, discord_ids: list[int]) -> dict[int, Character]:
+        """Load the existing characters among discord_ids in one query: {discord_id: Character}"""
+        if not discord_ids:
+            return {}
+        placeholders = ', '.join(['%s'] * len(discord_ids))
+        try:
+            async with self.mdb_pool.acquire() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(
+                        f'''SELECT discord_id, level, last_attempt, last_successful_levelup
+                            FROM egb_characters
+                            WHERE guild_id = %s AND discord_id IN ({placeholders})''',
+                        (self.guild_id, *discord_ids)
+                    )
+                    rows = await cursor.fetchall()
+            return {character.get_discord_id(): character for character in Character.from_rows(rows)}
+        except Exception as e:
+            logger.error(f"Error loading {len(discord_ids)} characters: {e}")
+            return {}
+
     async def create_character(self, discord_id: int) -> Character:
         """
         Create a new character in the database
@@ -47,13 +64,13 @@ class CharacterRepository:
             async with self.mdb_pool.acquire() as conn:
                 async with conn.cursor() as cursor:
                     await cursor.execute(
-                        '''INSERT INTO egb_characters (discord_id, level, last_attempt, last_successful_levelup)
-                           VALUES (%s, 1, NULL, NULL)''',
-                        (discord_id,)
+                        '''INSERT INTO egb_characters (guild_id, discord_id, level, last_attempt, last_successful_levelup)
+                           VALUES (%s, %s, 1, NULL, NULL)''',
+                        (self.guild_id, discord_id)
                     )
             return Character(discord_id=discord_id)
         except Exception as e:
-            print(f"Error creating character {discord_id}: {e}", file=sys.stderr)
+            logger.error(f"Error creating character {discord_id}: {e}")
             raise
 
     async def save_character(self, character: Character) -> bool:
@@ -65,13 +82,14 @@ class CharacterRepository:
             async with self.mdb_pool.acquire() as conn:
                 async with conn.cursor() as cursor:
                     await cursor.execute(
-                        '''INSERT INTO egb_characters (discord_id, level, last_attempt, last_successful_levelup)
-                           VALUES (%s, %s, %s, %s)
+                        '''INSERT INTO egb_characters (guild_id, discord_id, level, last_attempt, last_successful_levelup)
+                           VALUES (%s, %s, %s, %s, %s)
                            ON DUPLICATE KEY UPDATE
                                level = %s,
                                last_attempt = %s,
                                last_successful_levelup = %s''',
-                        (character.get_discord_id(),
+                        (self.guild_id,
+                         character.get_discord_id(),
                          character.get_level(),
                          character.get_last_attempt(),
                          character.get_last_successful_levelup(),
@@ -81,35 +99,128 @@ class CharacterRepository:
                     )
             return True
         except Exception as e:
-            print(f"Error saving character {character.get_discord_id()}: {e}", file=sys.stderr)
+            logger.error(f"Error saving character {character.get_discord_id()}: {e}")
             return False
 
     async def get_top_characters(self, limit: int = 10) -> list[Character]:
         """
-        Get top characters by level for leaderboard
+        Get top characters of the guild by level for leaderboard
         """
         try:
             async with self.mdb_pool.acquire() as conn:
-                async with conn.cursor(aiomysql.DictCursor) as cursor:
+                async with conn.cursor() as cursor:
                     await cursor.execute(
                         '''SELECT discord_id, level, last_attempt, last_successful_levelup
                            FROM egb_characters
+                           WHERE guild_id = %s
                            ORDER BY level DESC, last_successful_levelup ASC
                            LIMIT %s''',
-                        (limit,)
+                        (self.guild_id, limit)
                     )
                     rows = await cursor.fetchall()
 
-            return [
-                Character(
-                    discord_id=row['discord_id'],
-                    level=row['level'],
-                    last_attempt=row['last_attempt'],
-                    last_successful_levelup=row['last_successful_levelup']
-                )
-                for row in rows
-            ]
+            return Character.from_rows(rows)
+        except Exception as e:
+            logger.error(f"Error getting top characters: {e}")
+            return []
+
+    async def get_rank(self, character: Character) -> Optional[tuple[int, int]]:
+        """
+        (1-based ranking position, number of ranked characters) of a character,
+        on the same order as get_ranking_page. Counts over idx_characters_level.
+        """
+        last_success = character.get_last_successful_levelup()
+        # NULL last_successful_levelup sorts first in ascending order
+        if last_success is None:
+            same_level = '(last_successful_levelup IS NULL AND discord_id < %s)'
+            params = [character.get_discord_id()]
+        else:
+            same_level = ('(last_successful_levelup IS NULL OR last_successful_levelup < %s '
+                          'OR (last_successful_levelup = %s AND discord_id < %s))')
+            params = [last_success, last_success, character.get_discord_id()]
+        level = character.get_level()
+
+        try:
+            async with self.mdb_pool.acquire() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(
+                        f'''SELECT COUNT(*), COALESCE(SUM(level > %s OR (level = %s AND {same_level})), 0)
+                            FROM egb_characters
+                            WHERE guild_id = %s''',
+                        [level, level, *params, self.guild_id]
+                    )
+                    total, before = await cursor.fetchone()
+            return int(before) + 1, max(int(total), int(before) + 1)
         except Exception as e:
-            print(f"Error getting top characters: {e}", file=sys.stderr)
+            logger.error(f"Error getting rank of {character.get_discord_id()}: {e}")
+            return None
+
+    async def get_ranking_page(self, after: Optional[tuple] = None, limit: int = 10) -> list[Character]:
+        """
+        Characters of the guild ranked by level DESC, last_successful_levelup ASC, discord_id ASC,
+        starting after `after` ((level, last_successful_levelup, discord_id) of the last row shown).
+        Keyset pagination on idx_characters_level: every page costs the same as the first.
+        """
+        conditions = ['guild_id = %s']
+        params = [self.guild_id]
+        if after:
+            level, last_success, discord_id = after
+            # NULL last_successful_levelup sorts first in ascending order
+            if last_success is None:
+                same_level = '(last_successful_levelup IS NOT NULL OR discord_id > %s)'
+                params += [level, level, discord_id]
+            else:
+                same_level = ('(last_successful_levelup > %s '
+                              'OR (last_successful_levelup = %s AND discord_id > %s))')
+                params += [level, level, last_success, last_success, discord_id]
+            conditions.append(f'(level < %s OR (level = %s AND {same_level}))')
+        params.append(limit)
+
+        try:
+            async with self.mdb_pool.acquire() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(
+                        f'''SELECT discord_id, level, last_attempt, last_successful_levelup
+                            FROM egb_characters
+                            WHERE {' AND '.join(conditions)}
+                            ORDER BY level DESC, last_successful_levelup ASC, discord_id ASC
+                            LIMIT %s''',
+                        params
+                    )
+                    rows = await cursor.fetchall()
+            return Character.from_rows(rows)
+        except Exception as e:
+            logger.error(f"Error getting ranking page: {e}")
             return []
 
+    async def load_all_characters(self) -> list[Character]:
+        """
+        Stream every character of the guild from the database (used to warm the in-memory cache)
+        """
+        characters = []
+        async with self.mdb_pool.acquire() as conn:
+            async with conn.cursor(aiomysql.SSCursor) as cursor:
+                await cursor.execute(
+                    '''SELECT discord_id, level, last_attempt, last_successful_levelup
+                       FROM egb_characters
+                       WHERE guild_id = %s''',
+                    (self.guild_id,)
+                )
+                while rows := await cursor.fetchmany(1000):
+                    characters.extend(Character.from_rows(rows))
+        return characters
+
+    async def load_changed_since(self, since: datetime) -> list[Character]:
+        """Characters of the guild updated at or after `since` (reconciles a state snapshot)"""
+        characters = []
+        async with self.mdb_pool.acquire() as conn:
+            async with conn.cursor(aiomysql.SSCursor) as cursor:
+                await cursor.execute(
+                    '''SELECT discord_id, level, last_attempt, last_successful_levelup
+                       FROM egb_characters
+                       WHERE guild_id = %s AND updated_at >= %s''',
+                    (self.guild_id, since)
+                )
+                while rows := await cursor.fetchmany(1000):
+                    characters.extend(Character.from_rows(rows))
+        return characters
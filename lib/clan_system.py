@@ -1,5 +1,5 @@
-import os
 import discord
+from .config import Config
 
 class ClanSystem:
     """
@@ -134,30 +134,46 @@ class ClanSystem:
         }
     }
     
+    # Clan info resolved from the configuration (role names, colors), in CLANS order
+    _clan_infos: list[dict] = []
+    _config = None
+
+    @classmethod
+    def configure(cls, config: Config):
+        """Resolve clan role names and colors once from the configuration (swapped atomically on reload)"""
+        clan_infos = []
+        for clan_key, clan_data in cls.CLANS.items():
+            clan_infos.append({
+                'key': clan_key,
+                'name': config.clan_role_names.get(clan_data['name_key'], clan_key.capitalize()),
+                'title': clan_data['title'],
+                'color': discord.Color(config.clan_colors.get(clan_data['color_key'], 0x808080)),
+                'description': clan_data['description'],
+                'abilities': clan_data['abilities'],
+                'has_wings': clan_data.get('has_wings', False),
+                'level_range': clan_data['level_range']
+            })
+        cls._clan_infos = clan_infos
+        cls._config = config
+
+    @classmethod
+    def _get_clan_infos(cls) -> list[dict]:
+        if not cls._clan_infos:
+            cls.configure(Config.from_env())
+        return cls._clan_infos
+
     @staticmethod
     def get_clan_by_level(level: int) -> dict:
         """Get clan information based on character level"""
-        for clan_key, clan_data in ClanSystem.CLANS.items():
-            min_level, max_level = clan_data['level_range']
+        clan_infos = ClanSystem._get_clan_infos()
+        for clan_info in clan_infos:
+            min_level, max_level = clan_info['level_range']
             if min_level <= level <= max_level:
-                # Get role name from env
-                role_name = os.getenv(clan_data['name_key'], clan_key.capitalize())
-                color_hex = os.getenv(clan_data['color_key'], '#808080')
-                
-                return {
-                    'key': clan_key,
-                    'name': role_name,
-                    'title': clan_data['title'],
-                    'color': discord.Color(int(color_hex.replace('#', ''), 16)),
-                    'description': clan_data['description'],
-                    'abilities': clan_data['abilities'],
-                    'has_wings': clan_data.get('has_wings', False),
-                    'level_range': clan_data['level_range']
-                }
-        
+                return clan_info
+
         # Fallback (should never happen)
-        return ClanSystem.get_clan_by_level(1)
-    
+        return clan_infos[0]
+
     @staticmethod
     def get_unlocked_abilities(level: int) -> list:
         """Get all abilities unlocked up to this level"""
@@ -190,9 +206,14 @@ class ClanSystem:
     
     @staticmethod
     def get_all_clan_role_names() -> list[str]:
-        """Get all clan role names from environment"""
-        role_names = []
-        for clan_data in ClanSystem.CLANS.values():
-            role_name = os.getenv(clan_data['name_key'], clan_data['name_key'])
-            role_names.append(role_name)
-        return role_names
\ No newline at end of file
+        """Get all clan role names from configuration"""
+        return [clan_info['name'] for clan_info in ClanSystem._get_clan_infos()]
+
+    @staticmethod
+    def get_longest_cooldown_days() -> int:
+        """Longest ability cooldown across all clans (usage older than this is no longer relevant)"""
+        return max(
+            ability['cooldown_days']
+            for clan_data in ClanSystem.CLANS.values()
+            for ability in clan_data['abilities']
+        )
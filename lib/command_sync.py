@@ -0,0 +1,90 @@
+import discord
+import hashlib
+import json
+import os
+import logging
+from discord import app_commands
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CommandSync:
+    """
+    Syncs the application command tree with Discord only when it changed.
+    A fingerprint of the registered commands (names, options, descriptions) is
+    persisted locally, so restarts and gateway reconnects skip the REST round trip.
+    Switching between global and guild-only sync clears the commands of the previous
+    scope, which would otherwise be listed twice in the guild.
+    """
+
+    def __init__(self, tree: app_commands.CommandTree, state_path: str, guild_id: Optional[int] = None):
+        self.tree = tree
+        self.state_path = state_path
+        self.guild_id = guild_id  # Sync to this guild only (instant propagation) instead of globally
+
+    def fingerprint(self) -> str:
+        """SHA-256 of the serialized global command tree"""
+        payload = sorted(
+            (command.to_dict(self.tree) for command in self.tree.get_commands()),
+            key=lambda command: (command.get('type', 1), command['name'])
+        )
+        serialized = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+    def _scope(self) -> str:
+        return f"guild:{self.guild_id}" if self.guild_id else "global"
+
+    def _load_state(self) -> dict:
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.error(f"Error reading command sync state: {e}")
+            return {}
+
+    def _save_state(self, state: dict):
+        try:
+            os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+            tmp_path = f"{self.state_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, indent=2)
+            os.replace(tmp_path, self.state_path)
+        except Exception as e:
+            logger.error(f"Error writing command sync state: {e}")
+
+    async def sync(self, force: bool = False) -> Optional[int]:
+        """
+        Sync the tree if its fingerprint changed since the last successful sync (or if forced).
+        Returns the number of synced commands, or None if the sync was skipped.
+        """
+        fingerprint = self.fingerprint()
+        state = self._load_state()
+        scope = self._scope()
+
+        if not force and state.get(scope) == fingerprint:
+            return None
+
+        if self.guild_id:
+            guild = discord.Object(id=self.guild_id)
+            self.tree.copy_global_to(guild=guild)
+            synced = await self.tree.sync(guild=guild)
+            # Commands still registered globally would show twice in the guild
+            if force or state.pop('global', None) is not None:
+                await self.tree.client.http.bulk_upsert_global_commands(self.tree.client.application_id, payload=[])
+                logger.info("Cleared the global commands (guild-only sync)")
+        else:
+            synced = await self.tree.sync()
+            # Same for the copies left in a guild by a previous guild-only sync
+            for previous_scope in [key for key in state if key.startswith('guild:')]:
+                guild = discord.Object(id=int(previous_scope.split(':', 1)[1]))
+                self.tree.clear_commands(guild=guild)
+                await self.tree.sync(guild=guild)
+                del state[previous_scope]
+                logger.info(f"Cleared the commands of guild {guild.id} (global sync)")
+
+        state[scope] = fingerprint
+        self._save_state(state)
+        return len(synced)
@@ -0,0 +1,189 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+import aiomysql
+from .clan_system import ClanSystem
+
+logger = logging.getLogger(__name__)
+
+
+class Compactor:
+    """
+    Background garbage collection of dead rows in the egb_* state tables:
+    finished pacts, inactive or expired sacrifice links, empty bonus rows
+    and ability usage older than the longest cooldown (plus, in multi-instance
+    mode, change feed rows every instance has long read).
+
+    Rows are deleted in small keyset-paginated batches (select a page of keys,
+    delete them with the condition re-checked), with a pause between batches,
+    so no statement holds locks for long. A dry run only counts the rows.
+    """
+
+    # Retention margin on top of the longest ability cooldown
+    USAGE_MARGIN_DAYS = 1
+    # Change feed rows are polled within seconds: an hour covers a stalled instance
+    CHANGE_FEED_RETENTION_HOURS = 1
+
+    def __init__(self, pool: aiomysql.Pool, batch_size: int = 500, pause_seconds: float = 0.2,
+                 change_feed: bool = False):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.pause_seconds = pause_seconds
+        self.change_feed = change_feed  # egb_change_feed only exists in multi-instance setups
+        self._task: Optional[asyncio.Task] = None
+
+    def _targets(self) -> list[dict]:
+        """Tables to compact: key columns and the condition that marks a row as dead"""
+        usage_days = ClanSystem.get_longest_cooldown_days() + self.USAGE_MARGIN_DAYS
+        targets = [
+            {
+                'name': 'pacts',
+                'table': 'egb_pacts',
+                'keys': ('id',),
+                'where': "status <> 'active' OR expires_at < NOW()",
+                'params': (),
+            },
+            {
+                'name': 'sacrifice links',
+                'table': 'egb_sacrifice_links',
+                'keys': ('id',),
+                'where': 'active = FALSE OR expires_at < NOW()',
+                'params': (),
+            },
+            {
+                'name': 'empty bonuses',
+                'table': 'egb_character_bonuses',
+                'keys': ('guild_id', 'discord_id'),
+                'where': '''COALESCE(devour_bonus, 0) = 0 AND NOT COALESCE(swim_active, FALSE)
+                    AND (leader_curse_until IS NULL OR leader_curse_until <= NOW())
+                    AND (oppression_until IS NULL OR oppression_until <= NOW())
+                    AND (shield_until IS NULL OR shield_until <= NOW())
+                    AND bless_total = 0 AND curse_total = 0
+                    AND steal_bonus_total = 0 AND steal_malus_total = 0
+                    AND NOT EXISTS (SELECT 1 FROM egb_character_effects e
+                                    WHERE e.guild_id = egb_character_bonuses.guild_id
+                                      AND e.discord_id = egb_character_bonuses.discord_id)''',
+                'params': (),
+            },
+            {
+                'name': 'ability usage',
+                'table': 'egb_ability_usage',
+                'keys': ('guild_id', 'discord_id', 'ability_name'),
+                'where': 'last_used < NOW() - INTERVAL %s DAY',
+                'params': (usage_days,),
+            },
+        ]
+        if self.change_feed:
+            targets.append({
+                'name': 'change feed',
+                'table': 'egb_change_feed',
+                'keys': ('id',),
+                'where': 'created_at < NOW() - INTERVAL %s HOUR',
+                'params': (self.CHANGE_FEED_RETENTION_HOURS,),
+            })
+        return targets
+
+    async def run(self, dry_run: bool = False) -> dict[str, int]:
+        """
+        Compact every target table once.
+        Returns {target name: rows deleted (or rows that would be deleted in dry-run mode)}.
+        """
+        report = {}
+        for target in self._targets():
+            start = time.perf_counter()
+            try:
+                if dry_run:
+                    count = await self._count(target)
+                else:
+                    count = await self._compact(target)
+            except Exception as e:
+                logger.error(f"Error compacting {target['name']}: {e}")
+                continue
+            report[target['name']] = count
+            logger.info(
+                f"Compactor{' (dry run)' if dry_run else ''}: {target['name']} "
+                f"{count} row(s) in {time.perf_counter() - start:.2f}s"
+            )
+        return report
+
+    async def _count(self, target: dict) -> int:
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    f"SELECT COUNT(*) FROM {target['table']} WHERE {target['where']}",
+                    target['params']
+                )
+                (count,) = await cursor.fetchone()
+        return count
+
+    async def _compact(self, target: dict) -> int:
+        """Delete dead rows page by page, walking the primary key upwards"""
+        table, keys, where, params = target['table'], target['keys'], target['where'], target['params']
+        key_list = ', '.join(keys)
+        # (k1, k2, ...) > last key, expanded so the primary key index is used:
+        # k1 > %s OR (k1 = %s AND k2 > %s) OR ...
+        after = ' OR '.join(
+            '(' + ' AND '.join([f'{key} = %s' for key in keys[:i]] + [f'{keys[i]} > %s']) + ')'
+            for i in range(len(keys))
+        )
+
+        deleted = 0
+        last_key = None
+        while True:
+            async with self.pool.acquire() as conn:
+                async with conn.cursor() as cursor:
+                    if last_key is None:
+                        await cursor.execute(
+                            f'''SELECT {key_list} FROM {table} WHERE ({where})
+                                ORDER BY {key_list} LIMIT %s''',
+                            (*params, self.batch_size)
+                        )
+                    else:
+                        after_params = [value for i in range(len(keys)) for value in last_key[:i + 1]]
+                        await cursor.execute(
+                            f'''SELECT {key_list} FROM {table} WHERE ({after}) AND ({where})
+                                ORDER BY {key_list} LIMIT %s''',
+                            (*after_params, *params, self.batch_size)
+                        )
+                    page = await cursor.fetchall()
+                    if not page:
+                        return deleted
+
+                    # The condition is checked again: a row may have come back to life since the select
+                    row_placeholder = '%s' if len(keys) == 1 else f"({', '.join(['%s'] * len(keys))})"
+                    key_expr = keys[0] if len(keys) == 1 else f'({key_list})'
+                    await cursor.execute(
+                        f'''DELETE FROM {table}
+                            WHERE {key_expr} IN ({', '.join([row_placeholder] * len(page))}) AND ({where})''',
+                        (*[value for row in page for value in row], *params)
+                    )
+                    deleted += cursor.rowcount
+                    await conn.commit()
+
+            last_key = page[-1]
+            if len(page) < self.batch_size:
+                return deleted
+            await asyncio.sleep(self.pause_seconds)
+
+    # ===== BACKGROUND =====
+    def start(self, interval_hours: float):
+        """Run the compactor every interval_hours in the background (0 disables it)"""
+        if self._task or interval_hours <= 0:
+            return
+        self._task = asyncio.create_task(self._run_forever(interval_hours * 3600))
+
+    async def stop(self):
+        """Stop the background task"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run_forever(self, interval_seconds: float):
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await self.run()
+            except Exception as e:
+                logger.error(f"Error in compactor run: {e}")
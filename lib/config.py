@@ -0,0 +1,231 @@
+import os
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+
+def _env_int(name: str, default: Optional[int] = None) -> Optional[int]:
+    """Parse an integer environment variable (empty or missing -> default)"""
+    value = os.getenv(name, '').strip()
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer (got {value!r})")
+
+
+def _env_bool(name: str, default: bool = False) -> bool:
+    """Parse a boolean environment variable (1/true/yes/on)"""
+    value = os.getenv(name, '').strip().lower()
+    if not value:
+        return default
+    return value in ('1', 'true', 'yes', 'on')
+
+
+def _env_int_tuple(name: str) -> tuple[int, ...]:
+    """Parse a comma-separated list of integers (empty or missing -> empty tuple)"""
+    value = os.getenv(name, '').strip()
+    if not value:
+        return ()
+    try:
+        return tuple(int(part) for part in value.split(',') if part.strip())
+    except ValueError:
+        raise ValueError(f"{name} must be a comma-separated list of integers (got {value!r})")
+
+
+def _env_levels(name: str) -> dict[str, str]:
+    """Parse 'logger=LEVEL,logger=LEVEL' (empty or missing -> empty dict)"""
+    levels = {}
+    for part in os.getenv(name, '').split(','):
+        if not part.strip():
+            continue
+        logger, sep, level = part.partition('=')
+        if not sep or not logger.strip() or not level.strip():
+            raise ValueError(f"{name} must look like logger=LEVEL,logger=LEVEL (got {part.strip()!r})")
+        levels[logger.strip()] = level.strip().upper()
+    return levels
+
+
+def _parse_color(name: str, value: str) -> int:
+    """Parse a '#RRGGBB' color into an int"""
+    try:
+        color = int(value.strip().replace('#', ''), 16)
+    except ValueError:
+        raise ValueError(f"{name} must be a hex color like #808080 (got {value!r})")
+    if not 0 <= color <= 0xFFFFFF:
+        raise ValueError(f"{name} is out of range (got {value!r})")
+    return color
+
+
+@dataclass(frozen=True)
+class Config:
+    """
+    Typed, validated bot configuration built once from the environment.
+    Instances are immutable: a reload builds a new Config and swaps the reference.
+    """
+
+    # Discord
+    guild_id: Optional[int] = None  # main guild: COMMAND_SYNC_GUILD_ONLY target (game state is per guild)
+    clavardeur_id: Optional[int] = None
+    commands_channel_id: Optional[int] = None
+    command_sync_guild_only: bool = False
+    default_language: str = 'fr'
+    shard_count: Optional[int] = None  # None: recommended by Discord (AutoShardedBot)
+    shard_ids: tuple[int, ...] = ()  # shards run by this process (empty: all), requires shard_count
+
+    # Multi-instance mode (several processes on one database)
+    multi_instance: bool = False
+    instance_id: Optional[str] = None  # None: hostname:pid
+    change_feed_poll_ms: int = 1000
+
+    # Database
+    db_host: str = 'localhost'
+    db_port: int = 3306
+    db_user: Optional[str] = None
+    db_password: Optional[str] = None
+    db_name: Optional[str] = None
+
+    # Levelup system
+    base_levelup_chance: int = 20
+    bonus_per_hour: int = 5
+    max_levelup_chance: int = 80
+    levelup_cooldown_hours: int = 1
+
+    # Compactor (dead rows in the egb_* state tables)
+    compactor_interval_hours: int = 24  # 0 disables the background run
+    compactor_batch_size: int = 500
+    compactor_pause_ms: int = 200
+
+    # Warm restart: snapshot of the in-memory game state in out/ (0 disables the periodic write)
+    snapshot_interval_minutes: int = 10
+
+    # Clan role reconciliation (roles drifted from egb_characters.level)
+    role_reconcile_interval_hours: int = 24  # 0 disables the background run (/admin roles still works)
+    role_reconcile_requests_per_minute: int = 30
+    role_reconcile_budget: int = 500  # requests per run, the next run resumes from the checkpoint
+
+    # Logging: JSON lines in out/egb.log (rotated daily and by size), plain text on stderr
+    log_level: str = 'INFO'
+    log_levels: Mapping[str, str] = field(default_factory=lambda: MappingProxyType({}))  # logger -> level
+    log_console_level: str = 'WARNING'
+    log_max_mb: int = 20
+    log_backup_count: int = 14
+
+    # Event-loop lag monitor
+    loop_lag_alert_ms: int = 250  # 0 disables the alerts (the histogram is always kept)
+    loop_watchdog_ms: int = 0  # debug: stack of the loop thread when blocked this long (0 disables)
+
+    # egb_log retention (monthly partitions older than this are archived to out/ then dropped)
+    log_retention_months: int = 6  # 0 keeps everything
+
+    # Roles
+    role_player: str = 'Joueur'
+    role_wings: str = 'Ailes'
+    clan_role_names: Mapping[str, str] = field(default_factory=lambda: MappingProxyType({}))  # CLAN_* -> role name
+    clan_colors: Mapping[str, int] = field(default_factory=lambda: MappingProxyType({}))  # COLOR_* -> RGB int
+
+    ALLOWED_LANGUAGES = ('en', 'fr')
+    LOG_LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')
+
+    def __post_init__(self):
+        if self.default_language not in self.ALLOWED_LANGUAGES:
+            raise ValueError(f"DEFAULT_LANGUAGE must be one of {', '.join(self.ALLOWED_LANGUAGES)}")
+        if not 0 <= self.base_levelup_chance <= 100:
+            raise ValueError("BASE_LEVELUP_CHANCE must be between 0 and 100")
+        if not 0 <= self.max_levelup_chance <= 100:
+            raise ValueError("MAX_LEVELUP_CHANCE must be between 0 and 100")
+        if self.base_levelup_chance > self.max_levelup_chance:
+            raise ValueError("BASE_LEVELUP_CHANCE must not exceed MAX_LEVELUP_CHANCE")
+        if self.bonus_per_hour < 0:
+            raise ValueError("BONUS_PER_HOUR must not be negative")
+        if self.levelup_cooldown_hours < 0:
+            raise ValueError("LEVELUP_COOLDOWN_HOURS must not be negative")
+        if self.compactor_interval_hours < 0 or self.compactor_pause_ms < 0:
+            raise ValueError("COMPACTOR_INTERVAL_HOURS and COMPACTOR_PAUSE_MS must not be negative")
+        if self.snapshot_interval_minutes < 0:
+            raise ValueError("SNAPSHOT_INTERVAL_MINUTES must not be negative")
+        for name, level in (('LOG_LEVEL', self.log_level), ('LOG_CONSOLE_LEVEL', self.log_console_level),
+                            *((f"LOG_LEVELS {logger}", level) for logger, level in self.log_levels.items())):
+            if level not in self.LOG_LEVELS:
+                raise ValueError(f"{name} must be one of {', '.join(self.LOG_LEVELS)}")
+        if self.role_reconcile_interval_hours < 0:
+            raise ValueError("ROLE_RECONCILE_INTERVAL_HOURS must not be negative")
+        if self.role_reconcile_requests_per_minute <= 0 or self.role_reconcile_budget <= 0:
+            raise ValueError("ROLE_RECONCILE_REQUESTS_PER_MINUTE and ROLE_RECONCILE_BUDGET must be positive")
+        if self.log_max_mb <= 0 or self.log_backup_count < 0:
+            raise ValueError("LOG_MAX_MB must be positive and LOG_BACKUP_COUNT must not be negative")
+        if self.loop_lag_alert_ms < 0 or self.loop_watchdog_ms < 0:
+            raise ValueError("LOOP_LAG_ALERT_MS and LOOP_WATCHDOG_MS must not be negative")
+        if self.log_retention_months < 0:
+            raise ValueError("LOG_RETENTION_MONTHS must not be negative")
+        if self.shard_count is not None and self.shard_count <= 0:
+            raise ValueError("SHARD_COUNT must be positive")
+        if self.shard_ids and self.shard_count is None:
+            raise ValueError("SHARD_IDS requires SHARD_COUNT")
+        if any(not 0 <= shard_id < self.shard_count for shard_id in self.shard_ids):
+            raise ValueError("SHARD_IDS must be between 0 and SHARD_COUNT - 1")
+        if self.change_feed_poll_ms <= 0:
+            raise ValueError("CHANGE_FEED_POLL_MS must be positive")
+        if self.compactor_batch_size <= 0:
+            raise ValueError("COMPACTOR_BATCH_SIZE must be positive")
+
+    @classmethod
+    def from_env(cls) -> 'Config':
+        """
+        Build the configuration from environment variables.
+        Raises ValueError on invalid values.
+        """
+        from .clan_system import ClanSystem  # clan_system imports this module
+
+        # Only the keys the clans use: unrelated CLAN_*/COLOR_* host variables are ignored
+        clan_role_names = {}
+        clan_colors = {}
+        for clan in ClanSystem.CLANS.values():
+            name = os.getenv(clan['name_key'], '')
+            if name.strip():
+                clan_role_names[clan['name_key']] = name
+            color = os.getenv(clan['color_key'], '').strip()
+            if color:
+                clan_colors[clan['color_key']] = _parse_color(clan['color_key'], color)
+
+        return cls(
+            guild_id=_env_int('GUILD_ID'),
+            clavardeur_id=_env_int('CLAVARDEUR_ID'),
+            commands_channel_id=_env_int('COMMANDS_CHANNEL_ID'),
+            command_sync_guild_only=_env_bool('COMMAND_SYNC_GUILD_ONLY'),
+            default_language=os.getenv('DEFAULT_LANGUAGE', 'fr').strip().lower() or 'fr',
+            shard_count=_env_int('SHARD_COUNT'),
+            shard_ids=_env_int_tuple('SHARD_IDS'),
+            multi_instance=_env_bool('MULTI_INSTANCE'),
+            instance_id=os.getenv('INSTANCE_ID', '').strip() or None,
+            change_feed_poll_ms=_env_int('CHANGE_FEED_POLL_MS', 1000),
+            db_host=os.getenv('DB_MDB_HOST', 'localhost'),
+            db_port=_env_int('DB_MDB_PORT', 3306),
+            db_user=os.getenv('DB_MDB_USER'),
+            db_password=os.getenv('DB_MDB_USER_PWD'),
+            db_name=os.getenv('DB_MDB'),
+            base_levelup_chance=_env_int('BASE_LEVELUP_CHANCE', 20),
+            bonus_per_hour=_env_int('BONUS_PER_HOUR', 5),
+            max_levelup_chance=_env_int('MAX_LEVELUP_CHANCE', 80),
+            levelup_cooldown_hours=_env_int('LEVELUP_COOLDOWN_HOURS', 1),
+            compactor_interval_hours=_env_int('COMPACTOR_INTERVAL_HOURS', 24),
+            compactor_batch_size=_env_int('COMPACTOR_BATCH_SIZE', 500),
+            compactor_pause_ms=_env_int('COMPACTOR_PAUSE_MS', 200),
+            snapshot_interval_minutes=_env_int('SNAPSHOT_INTERVAL_MINUTES', 10),
+            role_reconcile_interval_hours=_env_int('ROLE_RECONCILE_INTERVAL_HOURS', 24),
+            role_reconcile_requests_per_minute=_env_int('ROLE_RECONCILE_REQUESTS_PER_MINUTE', 30),
+            role_reconcile_budget=_env_int('ROLE_RECONCILE_BUDGET', 500),
+            log_level=os.getenv('LOG_LEVEL', '').strip().upper() or 'INFO',
+            log_levels=MappingProxyType(_env_levels('LOG_LEVELS')),
+            log_console_level=os.getenv('LOG_CONSOLE_LEVEL', '').strip().upper() or 'WARNING',
+            log_max_mb=_env_int('LOG_MAX_MB', 20),
+            log_backup_count=_env_int('LOG_BACKUP_COUNT', 14),
+            loop_lag_alert_ms=_env_int('LOOP_LAG_ALERT_MS', 250),
+            loop_watchdog_ms=_env_int('LOOP_WATCHDOG_MS', 0),
+            log_retention_months=_env_int('LOG_RETENTION_MONTHS', 6),
+            role_player=os.getenv('ROLE_PLAYER', '').strip() or 'Joueur',
+            role_wings=os.getenv('ROLE_WINGS', '').strip() or 'Ailes',
+            clan_role_names=MappingProxyType(clan_role_names),
+            clan_colors=MappingProxyType(clan_colors),
+        )
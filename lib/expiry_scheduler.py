@@ -0,0 +1,178 @@
+import asyncio
+import heapq
+import itertools
+import logging
+from datetime import datetime, timedelta
+from typing import Hashable, Optional
+import discord
+
+logger = logging.getLogger(__name__)
+
+
+class ExpiryScheduler:
+    """
+    Single in-process scheduler for every timed game state:
+    shields, leader curses, oppression, blood pacts and sacrifice links.
+
+    Expiry dates of every guild are kept in one heap. The scheduler sleeps until
+    the earliest one, then applies every due transition with one batched UPDATE
+    per guild and kind (through the guild's manager) and queues the DM notifications,
+    which are sent by a separate consumer so a slow DM never delays an expiry.
+    """
+
+    KINDS = ('shield', 'leader_curse', 'oppression', 'pact', 'sacrifice')
+    RETRY_DELAY_SECONDS = 60
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._heap: list[tuple[datetime, int, int, str, Hashable]] = []  # (expires_at, seq, guild_id, kind, key)
+        self._scheduled: set[tuple[datetime, int, str, Hashable]] = set()
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._notifications: asyncio.Queue = asyncio.Queue()
+        self._tasks: list[asyncio.Task] = []
+
+    # ===== SCHEDULING =====
+    def schedule(self, guild_id: int, kind: str, key: Optional[Hashable], expires_at: datetime):
+        """
+        Register a state of a guild ending at expires_at.
+        key is the player id (bonuses), the pact id or the link id; None for oppression (everybody).
+        """
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown expiry kind: {kind}")
+        if (expires_at, guild_id, kind, key) in self._scheduled:
+            return
+        self._scheduled.add((expires_at, guild_id, kind, key))
+        seq = next(self._seq)
+        heapq.heappush(self._heap, (expires_at, seq, guild_id, kind, key))
+        if self._heap[0][1] == seq:
+            self._wakeup.set()  # new earliest entry: the loop has to sleep less
+
+    async def load_guild(self, state) -> int:
+        """
+        Schedule every timed state of a guild (GuildState) found in the database,
+        including the ones that already ended (they are expired on the first tick).
+        Returns the number of scheduled entries.
+        """
+        bonuses, pacts, links = await asyncio.gather(
+            state.bonus_manager.load_expiries(),
+            state.pact_manager.load_expiries(),
+            state.sacrifice_manager.load_expiries()
+        )
+        for expires_at, kind, discord_id in bonuses:
+            self.schedule(state.guild_id, kind, discord_id, expires_at)
+        for expires_at, pact_id in pacts:
+            self.schedule(state.guild_id, 'pact', pact_id, expires_at)
+        for expires_at, link_id in links:
+            self.schedule(state.guild_id, 'sacrifice', link_id, expires_at)
+        return len(bonuses) + len(pacts) + len(links)
+
+    @property
+    def pending(self) -> int:
+        """Number of scheduled expiries"""
+        return len(self._heap)
+
+    # ===== LIFECYCLE =====
+    def start(self):
+        """Start the expiry loop and the notification consumer"""
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._run()),
+            asyncio.create_task(self._send_notifications())
+        ]
+
+    async def stop(self):
+        """Stop both background tasks"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # ===== EXPIRY LOOP =====
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            timeout = None
+            if self._heap:
+                timeout = max((self._heap[0][0] - datetime.now()).total_seconds(), 0)
+            if timeout is None or timeout > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                    continue  # an earlier entry was scheduled
+                except asyncio.TimeoutError:
+                    pass
+
+            now = datetime.now()
+            due: dict[tuple[int, str], list[Hashable]] = {}
+            while self._heap and self._heap[0][0] <= now:
+                expires_at, _, guild_id, kind, key = heapq.heappop(self._heap)
+                self._scheduled.discard((expires_at, guild_id, kind, key))
+                due.setdefault((guild_id, kind), []).append(key)
+
+            for (guild_id, kind), keys in due.items():
+                try:
+                    await self._expire(guild_id, kind, keys, now)
+                except Exception as e:
+                    logger.error(
+                        f"Error expiring {kind} in guild {guild_id} ({len(keys)} entries), retrying later: {e}"
+                    )
+                    retry_at = now + timedelta(seconds=self.RETRY_DELAY_SECONDS)
+                    for key in keys:
+                        self.schedule(guild_id, kind, key, retry_at)
+
+    async def _expire(self, guild_id: int, kind: str, keys: list, now: datetime):
+        """Apply one batched transition for every due entry of a guild and kind"""
+        state = self.bot.guild_state(guild_id)
+        if kind in ('shield', 'leader_curse', 'oppression'):
+            discord_ids = None if None in keys else list(dict.fromkeys(keys))
+            expired = await state.bonus_manager.expire_timed_states(kind, discord_ids, now)
+            if kind == 'leader_curse':
+                for discord_id in expired:
+                    self._notify(guild_id, discord_id, discord.Embed(
+                        title="⚡ Fin de la Condamnation",
+                        description="Ta condamnation est levée : tu peux de nouveau monter de niveau !",
+                        color=discord.Color.gold()
+                    ))
+            elif kind == 'shield':
+                for discord_id in expired:
+                    self._notify(guild_id, discord_id, discord.Embed(
+                        title="🛡️ Bouclier Dissipé",
+                        description="Ton bouclier mystique s'est dissipé.",
+                        color=discord.Color.blue()
+                    ))
+            if expired:
+                logger.info(f"Expired {len(expired)} {kind} state(s) in guild {guild_id}")
+
+        elif kind == 'pact':
+            pairs = await state.pact_manager.expire_pacts(list(dict.fromkeys(keys)), now)
+            for requester_id, target_id in pairs:
+                for discord_id, partner_id in ((requester_id, target_id), (target_id, requester_id)):
+                    self._notify(guild_id, discord_id, discord.Embed(
+                        title="🩸 Fin du Pacte de Sang",
+                        description=f"Ton pacte avec <@{partner_id}> a pris fin.",
+                        color=discord.Color.dark_red()
+                    ))
+            if pairs:
+                logger.info(f"Expired {len(pairs)} pact(s) in guild {guild_id}")
+
+        elif kind == 'sacrifice':
+            count = await state.sacrifice_manager.expire_links(list(dict.fromkeys(keys)), now)
+            if count:
+                logger.info(f"Expired {count} sacrifice link(s) in guild {guild_id}")
+
+    # ===== NOTIFICATIONS =====
+    def _notify(self, guild_id: int, discord_id: int, embed: discord.Embed):
+        self._notifications.put_nowait((guild_id, discord_id, embed))
+
+    async def _send_notifications(self):
+        while True:
+            guild_id, discord_id, embed = await self._notifications.get()
+            try:
+                guild = self.bot.get_guild(guild_id)
+                user = await self.bot.user_resolver.resolve(discord_id, guild)
+                await user.send(embed=embed)
+            except Exception as e:
+                logger.error(f"Error sending expiry notification to {discord_id}: {e}")
+            finally:
+                self._notifications.task_done()
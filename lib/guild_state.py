@@ -0,0 +1,214 @@
+import asyncio
+from datetime import datetime
+from typing import Optional
+import aiomysql
+from .character import Character
+from .character_repository import CharacterRepository
+from .leaderboard_index import LeaderboardIndex
+from .level_history import LevelCause, LevelHistory
+from .ability_manager import AbilityManager
+from .pact_manager import PactManager
+from .bonus_manager import BonusManager
+from .sacrifice_manager import SacrificeManager
+
+
+class GuildState:
+    """
+    Game state of one guild: repositories and managers scoped to guild_id,
+    with their in-memory caches. Every guild has its own characters, bonuses,
+    cooldowns, pacts and sacrifice links, so nothing is shared across guilds.
+    """
+
+    def __init__(self, pool: aiomysql.Pool, guild_id: int, expiry_scheduler=None, change_feed=None):
+        self.guild_id = guild_id
+        self.change_feed = change_feed
+        self.character_repo = CharacterRepository(pool, guild_id)
+        self.level_history = LevelHistory(pool, guild_id)
+        self.ability_manager = AbilityManager(pool, guild_id, change_feed)
+        self.pact_manager = PactManager(pool, guild_id, expiry_scheduler, change_feed)
+        self.bonus_manager = BonusManager(pool, guild_id, expiry_scheduler, change_feed)
+        self.sacrifice_manager = SacrificeManager(pool, guild_id, expiry_scheduler, change_feed)
+        self.characters: dict[int, Character] = {}  # In-memory cache of Character objects
+        self.leaderboard: Optional[LeaderboardIndex] = None  # Only once every character is cached
+        self.pending_pacts: set[int] = set()
+        self.warmed_up = False
+
+    async def load_all(self) -> dict:
+        """
+        Bulk-load the guild's game state into the caches with concurrent streaming queries.
+        Returns {name: result or exception}.
+        """
+        results = await asyncio.gather(
+            self.character_repo.load_all_characters(),
+            self.bonus_manager.load_all(),
+            self.ability_manager.load_all(),
+            self.pact_manager.load_all(),
+            self.sacrifice_manager.load_all(),
+            return_exceptions=True
+        )
+        characters = results[0]
+        if not isinstance(characters, Exception):
+            for character in characters:
+                # Characters cached while streaming are fresher than the streamed rows
+                self.characters.setdefault(character.get_discord_id(), character)
+            results[0] = len(characters)
+            self._build_leaderboard()
+        self.warmed_up = True
+        names = ('characters', 'bonuses/effects', 'ability usage', 'pacts', 'sacrifice links')
+        return dict(zip(names, results))
+
+    async def restore(self, snapshot: dict, since: datetime) -> dict:
+        """
+        Fill the caches from a state snapshot of the guild (see StateSnapshot), then re-read
+        only the rows changed at or after `since`. Pacts and sacrifice links (active rows only)
+        are loaded again. Returns {name: result or exception}, like load_all().
+        """
+        results = await asyncio.gather(
+            self.character_repo.load_changed_since(since),
+            self.bonus_manager.restore(snapshot['bonuses'], snapshot['effects'], since),
+            self.ability_manager.restore(snapshot['cooldowns'], since),
+            self.pact_manager.load_all(),
+            self.sacrifice_manager.load_all(),
+            return_exceptions=True
+        )
+        changed = results[0]
+        if not isinstance(changed, Exception):
+            characters = {character.get_discord_id(): character for character in snapshot['characters']}
+            characters.update((character.get_discord_id(), character) for character in changed)
+            # Characters cached while restoring are fresher than the snapshot
+            characters.update(self.characters)
+            self.characters = characters
+            results[0] = (len(snapshot['characters']), len(changed))
+            self._build_leaderboard()
+        self.warmed_up = True
+        names = ('characters', 'bonuses/effects', 'ability usage', 'pacts', 'sacrifice links')
+        return dict(zip(names, results))
+
+    def _build_leaderboard(self):
+        leaderboard = LeaderboardIndex()
+        leaderboard.rebuild(self.characters.values())
+        self.leaderboard = leaderboard
+
+    def _cache_character(self, character: Character):
+        self.characters[character.get_discord_id()] = character
+        if self.leaderboard is not None:
+            self.leaderboard.update(character)
+
+    async def get_ranking_page(self, after: Optional[tuple] = None, limit: int = 10) -> list[Character]:
+        """
+        Ranked characters after `after` ((level, last_successful_levelup, discord_id) of the last
+        row shown, None: from the top), from the in-memory index when every character is cached,
+        else by keyset pagination in the database
+        """
+        if self.leaderboard is not None:
+            return [self.characters[discord_id] for discord_id in self.leaderboard.page(after, limit)]
+        return await self.character_repo.get_ranking_page(after, limit)
+
+    async def get_top_characters(self, limit: int = 10) -> list[Character]:
+        """Highest ranked characters (the first one is the leader)"""
+        return await self.get_ranking_page(None, limit)
+
+    async def get_rank(self, character: Character) -> Optional[tuple[int, int]]:
+        """
+        (1-based ranking position, number of ranked characters) of a character:
+        a bisect in the in-memory index when every character is cached, else a count query
+        """
+        if self.leaderboard is not None:
+            return self.leaderboard.rank(character), max(len(self.leaderboard), 1)
+        return await self.character_repo.get_rank(character)
+
+    def count_characters(self) -> Optional[int]:
+        """Number of ranked characters, None if not known without a table scan"""
+        return len(self.leaderboard) if self.leaderboard is not None else None
+
+    def get_all_levels(self) -> list[int]:
+        """Levels of every cached character (level distribution without a table scan)"""
+        return [character.get_level() for character in self.characters.values()]
+
+    async def get_character(self, discord_id: int) -> Optional[Character]:
+        """Get character from cache or database, None if it doesn't exist"""
+        if discord_id in self.characters:
+            return self.characters[discord_id]
+        character = await self.character_repo.get_character(discord_id)
+        if character:
+            self._cache_character(character)
+        return character
+
+    async def get_characters(self, discord_ids: list[int]) -> dict[int, Character]:
+        """Existing characters among discord_ids, read in one query for those not cached"""
+        found = {discord_id: self.characters[discord_id] for discord_id in discord_ids if discord_id in self.characters}
+        # Once every character is cached, a miss means no character
+        missing = [] if self.leaderboard is not None else [d for d in discord_ids if d not in found]
+        for discord_id, character in (await self.character_repo.get_characters(missing)).items():
+            # A character cached while reading is fresher than the row
+            if discord_id not in self.characters:
+                self._cache_character(character)
+            found[discord_id] = self.characters[discord_id]
+        return found
+
+    async def get_or_create_character(self, discord_id: int) -> Character:
+        """Get character from cache or database, create if doesn't exist"""
+        if discord_id in self.characters:
+            return self.characters[discord_id]
+        character = await self.character_repo.get_character(discord_id)
+        if not character:
+            character = await self.character_repo.create_character(discord_id)
+        self._cache_character(character)
+        return character
+
+    async def save_character(self, character: Character, cause: Optional[LevelCause] = None) -> bool:
+        """
+        Persist a character and keep the cache in sync.
+        cause: the level changed, append it to the level history
+        """
+        self._cache_character(character)
+        saved = await self.character_repo.save_character(character)
+        if saved and cause is not None:
+            await self.level_history.record(character.get_discord_id(), character.get_level(), cause)
+        if self.change_feed:
+            self.change_feed.publish(self.guild_id, 'character', character.get_discord_id())
+        return saved
+
+    # ===== PENDING PACTS =====
+    def add_pending_pact(self, *discord_ids: int):
+        """Mark players as involved in a pact request awaiting an answer"""
+        self.pending_pacts.update(discord_ids)
+        self._publish_pending(discord_ids, True)
+
+    def discard_pending_pact(self, *discord_ids: int):
+        """Clear the pending pact request of these players"""
+        self.pending_pacts.difference_update(discord_ids)
+        self._publish_pending(discord_ids, False)
+
+    def _publish_pending(self, discord_ids, pending: bool):
+        if self.change_feed:
+            for discord_id in discord_ids:
+                self.change_feed.publish(self.guild_id, 'pending_pact', discord_id, {'pending': pending})
+
+    # ===== CHANGES FROM OTHER INSTANCES =====
+    async def apply_change(self, kind: str, discord_id: Optional[int], payload: Optional[dict]):
+        """Drop or refresh the cache entries changed by another instance (see ChangeFeed)"""
+        if kind == 'character':
+            if self.leaderboard is None:
+                self.characters.pop(discord_id, None)
+                return
+            # Keep the ranking index complete: read the new state right away
+            character = await self.character_repo.get_character(discord_id)
+            if character:
+                self._cache_character(character)
+            else:
+                self.leaderboard.remove(discord_id)
+                self.characters.pop(discord_id, None)
+        elif kind == 'bonus':
+            await self.bonus_manager.refresh(discord_id)
+        elif kind == 'cooldown':
+            await self.ability_manager.refresh(discord_id)
+        elif kind == 'pact':
+            await self.pact_manager.refresh(discord_id)
+        elif kind == 'sacrifice':
+            await self.sacrifice_manager.refresh()
+        elif kind == 'pending_pact':
+            if payload and payload.get('pending'):
+                self.pending_pacts.add(discord_id)
+            else:
+                self.pending_pacts.discard(discord_id)
@@ -0,0 +1,90 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+import aiomysql
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderLease:
+    """
+    Time-bound lease in egb_leases: among the bot instances sharing one database,
+    only the holder runs the background jobs (compactor, log retention, rollups).
+
+    The holder renews the lease every ttl/3 seconds; if it dies, another instance
+    takes the lease over once it has expired. Acquisition and renewal are a single
+    upsert, so two instances can never both believe they hold it.
+    """
+
+    def __init__(self, pool: aiomysql.Pool, name: str, instance_id: str, ttl_seconds: int = 30):
+        self.pool = pool
+        self.name = name
+        self.instance_id = instance_id
+        self.ttl_seconds = ttl_seconds
+        self.is_leader = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def try_acquire(self) -> bool:
+        """Acquire the lease if it is free or expired, renew it if already held. Returns True if held."""
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                # holder is assigned first: the expires_at condition sees the new holder
+                await cursor.execute(
+                    '''INSERT INTO egb_leases (name, holder, expires_at)
+                       VALUES (%s, %s, NOW() + INTERVAL %s SECOND)
+                       ON DUPLICATE KEY UPDATE
+                           holder = IF(expires_at < NOW() OR holder = VALUES(holder), VALUES(holder), holder),
+                           expires_at = IF(holder = VALUES(holder), VALUES(expires_at), expires_at)''',
+                    (self.name, self.instance_id, self.ttl_seconds)
+                )
+                await cursor.execute('SELECT holder FROM egb_leases WHERE name = %s', (self.name,))
+                row = await cursor.fetchone()
+        return bool(row) and row[0] == self.instance_id
+
+    async def release(self):
+        """Give the lease up so another instance can take it over immediately"""
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    'UPDATE egb_leases SET expires_at = NOW() WHERE name = %s AND holder = %s',
+                    (self.name, self.instance_id)
+                )
+        self.is_leader = False
+
+    # ===== BACKGROUND =====
+    def start(self, on_acquired: Callable[[], Awaitable[None]], on_lost: Callable[[], Awaitable[None]]):
+        """Keep trying to acquire / renew the lease; call on_acquired / on_lost on each transition"""
+        if self._task:
+            return
+        self._task = asyncio.create_task(self._run_forever(on_acquired, on_lost))
+
+    async def stop(self):
+        """Stop renewing and release the lease"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.is_leader:
+            try:
+                await self.release()
+            except Exception as e:
+                logger.error(f"Error releasing lease {self.name}: {e}")
+
+    async def _run_forever(self, on_acquired, on_lost):
+        while True:
+            try:
+                held = await self.try_acquire()
+            except Exception as e:
+                # Without the database the lease cannot be renewed: assume it is lost
+                logger.error(f"Error renewing lease {self.name}: {e}")
+                held = False
+
+            if held and not self.is_leader:
+                self.is_leader = True
+                logger.info(f"Lease {self.name} acquired by {self.instance_id}")
+                await on_acquired()
+            elif not held and self.is_leader:
+                self.is_leader = False
+                logger.info(f"Lease {self.name} lost by {self.instance_id}")
+                await on_lost()
+            await asyncio.sleep(self.ttl_seconds / 3)
@@ -0,0 +1,64 @@
+from bisect import bisect_left, bisect_right, insort
+from datetime import date
+from typing import Iterable, Optional
+from .character import Character
+
+
+class LeaderboardIndex:
+    """
+    In-memory ranking of the characters of a guild, kept sorted on the same order as
+    idx_characters_level: level DESC, last_successful_levelup ASC (never first, as
+    MariaDB sorts NULL first), discord_id ASC.
+
+    A page after a given position is a bisect plus a slice, so page N costs the same
+    as page 1; a rank is a single bisect; an update is a bisect and a list move.
+    """
+
+    def __init__(self):
+        self._keys: list[tuple[int, int, int]] = []
+        self._by_id: dict[int, tuple[int, int, int]] = {}
+
+    @staticmethod
+    def key(level: int, last_successful_levelup: Optional[date], discord_id: int) -> tuple[int, int, int]:
+        """Sort key of a ranking position (level, last successful levelup, discord_id)"""
+        return -level, last_successful_levelup.toordinal() if last_successful_levelup else 0, discord_id
+
+    @classmethod
+    def character_key(cls, character: Character) -> tuple[int, int, int]:
+        return cls.key(character.get_level(), character.get_last_successful_levelup(), character.get_discord_id())
+
+    def rebuild(self, characters: Iterable[Character]):
+        """Index every character from scratch"""
+        self._by_id = {character.get_discord_id(): self.character_key(character) for character in characters}
+        self._keys = sorted(self._by_id.values())
+
+    def update(self, character: Character):
+        """Insert a character or move it to its new position"""
+        new_key = self.character_key(character)
+        old_key = self._by_id.get(character.get_discord_id())
+        if old_key == new_key:
+            return
+        if old_key is not None:
+            del self._keys[bisect_left(self._keys, old_key)]
+        insort(self._keys, new_key)
+        self._by_id[character.get_discord_id()] = new_key
+
+    def remove(self, discord_id: int):
+        old_key = self._by_id.pop(discord_id, None)
+        if old_key is not None:
+            del self._keys[bisect_left(self._keys, old_key)]
+
+    def page(self, after: Optional[tuple] = None, limit: int = 10) -> list[int]:
+        """
+        discord_ids of the next `limit` positions after `after`
+        ((level, last_successful_levelup, discord_id) of the last row shown, None: from the top)
+        """
+        start = bisect_right(self._keys, self.key(*after)) if after else 0
+        return [discord_id for _, _, discord_id in self._keys[start:start + limit]]
+
+    def rank(self, character: Character) -> int:
+        """1-based ranking position of a character (where it would be, if not indexed yet)"""
+        return bisect_left(self._keys, self.character_key(character)) + 1
+
+    def __len__(self) -> int:
+        return len(self._keys)
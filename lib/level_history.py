@@ -0,0 +1,73 @@
+import math
+import logging
+from datetime import date, timedelta
+from enum import IntEnum
+from typing import Optional
+import aiomysql
+
+logger = logging.getLogger(__name__)
+
+
+class LevelCause(IntEnum):
+    """
+    Cause codes stored in egb_level_history.cause.
+    Values are persisted: never renumber, only append.
+    """
+
+    LEVELUP = 1
+    CHAUSSETTE = 2
+    PACT = 3                 # free level from a pact partner's levelup
+    SACRIFICE_LEVELDOWN = 4
+
+
+class LevelHistory:
+    """
+    Append-only level history of the characters of a guild: one compact row
+    (day, new level, cause) per level change, read back by indexed range on
+    (guild_id, discord_id, day) instead of mining egb_log.
+    """
+
+    def __init__(self, pool: aiomysql.Pool, guild_id: int):
+        self.pool = pool
+        self.guild_id = guild_id
+
+    async def record(self, discord_id: int, level: int, cause: LevelCause, day: Optional[date] = None):
+        """Append a level change"""
+        try:
+            async with self.pool.acquire() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(
+                        '''INSERT INTO egb_level_history (guild_id, discord_id, day, level, cause)
+                           VALUES (%s, %s, %s, %s, %s)''',
+                        (self.guild_id, discord_id, day or date.today(), level, int(cause))
+                    )
+        except Exception as e:
+            logger.error(f"Error recording level history of {discord_id}: {e}")
+
+    async def get_history(self, discord_id: int, days: int, max_points: int = 15) -> list[dict]:
+        """
+        Level progression over the last `days` days, downsampled in the database to at most
+        max_points periods of equal length. Each period (oldest first):
+        {'start', 'end' (days of its first/last change), 'level' (level after its last change),
+         'min_level', 'max_level', 'changes'}
+        """
+        since = date.today() - timedelta(days=days - 1)
+        bucket_days = max(1, math.ceil(days / max_points))
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    '''SELECT MIN(day), MAX(day),
+                              SUBSTRING_INDEX(GROUP_CONCAT(level ORDER BY id DESC), ',', 1),
+                              MIN(level), MAX(level), COUNT(*)
+                       FROM egb_level_history
+                       WHERE guild_id = %s AND discord_id = %s AND day >= %s
+                       GROUP BY DATEDIFF(day, %s) DIV %s
+                       ORDER BY MIN(day)''',
+                    (self.guild_id, discord_id, since, since, bucket_days)
+                )
+                rows = await cursor.fetchall()
+        return [
+            {'start': start, 'end': end, 'level': int(level),
+             'min_level': min_level, 'max_level': max_level, 'changes': changes}
+            for start, end, level, min_level, max_level, changes in rows
+        ]
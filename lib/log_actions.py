@@ -0,0 +1,42 @@
+from enum import IntEnum
+
+
+class LogAction(IntEnum):
+    """
+    Action codes stored in egb_log.ActionCode.
+    Values are persisted: never renumber, only append.
+    The egb_log_text view rebuilds the legacy Action string from these codes
+    (see db_migrate_log_actions.sql), so its CASE must be kept in sync.
+    """
+
+    QUOTE = 1                # details: character
+    LEVELUP = 2              # outcome: 1 success / 0 fail
+    PACT_LEVELUP = 3         # target: pact partner who leveled up, amount: new level
+    SACRIFICE_LEVELDOWN = 4  # target: caster, amount: new level
+    CHAUSSETTE = 5
+    DEVOUR = 6               # amount: bonus %
+    SWIM = 7
+    CURSE = 8                # target, amount: malus %
+    EVOLVE = 9
+    SPECTRAL = 10
+    ENTOMB = 11              # target: leader
+    BLESS = 12               # target, amount: bonus %
+    OPPRESS = 13             # amount: malus %, details: until
+    STEAL = 14               # target, amount: stolen %
+    SACRIFICE = 15           # target: victim
+    SHIELD = 16              # details: until
+    PACT_ACCEPTED = 17       # target: requester
+    PACT_DECLINED = 18       # target: requester
+
+
+# Ability uses (one row per successful ability command)
+ABILITY_ACTIONS = frozenset({
+    LogAction.CHAUSSETTE, LogAction.DEVOUR, LogAction.SWIM, LogAction.CURSE, LogAction.EVOLVE,
+    LogAction.SPECTRAL, LogAction.ENTOMB, LogAction.BLESS, LogAction.OPPRESS, LogAction.STEAL,
+    LogAction.SACRIFICE, LogAction.SHIELD, LogAction.PACT_ACCEPTED,
+})
+
+# Abilities aimed at other players (top attackers)
+OFFENSIVE_ACTIONS = frozenset({
+    LogAction.CURSE, LogAction.ENTOMB, LogAction.OPPRESS, LogAction.STEAL, LogAction.SACRIFICE,
+})
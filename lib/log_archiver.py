@@ -0,0 +1,173 @@
+import asyncio
+import gzip
+import json
+import os
+import logging
+from datetime import date, datetime
+from typing import Optional
+import aiomysql
+
+logger = logging.getLogger(__name__)
+
+
+def _month_start(day: date, months_offset: int = 0) -> date:
+    """First day of the month of `day`, shifted by months_offset months"""
+    month_index = day.year * 12 + (day.month - 1) + months_offset
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+class LogArchiver:
+    """
+    Retention of egb_log, which is RANGE-partitioned by month on LogTime.
+    - ensure_partitions() splits pmax so the next months always have their own partition
+    - archive() streams every partition older than the retention window into
+      out/egb_log_<partition>.jsonl.gz (unbuffered cursor), then drops it,
+      which is instant whatever the partition size.
+    """
+
+    def __init__(self, pool: aiomysql.Pool, out_dir: str, retention_months: int = 6, months_ahead: int = 2):
+        self.pool = pool
+        self.out_dir = out_dir
+        self.retention_months = retention_months
+        self.months_ahead = months_ahead
+        self._task: Optional[asyncio.Task] = None
+
+    async def get_partitions(self) -> list[tuple[str, Optional[date], int]]:
+        """
+        Partitions of egb_log in order, as (name, upper bound or None for MAXVALUE, estimated rows).
+        Empty if the table is not partitioned.
+        """
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    '''SELECT PARTITION_NAME, PARTITION_DESCRIPTION, TABLE_ROWS
+                       FROM information_schema.PARTITIONS
+                       WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'egb_log'
+                         AND PARTITION_NAME IS NOT NULL
+                       ORDER BY PARTITION_ORDINAL_POSITION'''
+                )
+                rows = await cursor.fetchall()
+
+        partitions = []
+        for name, description, table_rows in rows:
+            bound = None
+            if description and description.upper() != 'MAXVALUE':
+                bound = datetime.strptime(description.strip("'")[:10], '%Y-%m-%d').date()
+            partitions.append((name, bound, table_rows or 0))
+        return partitions
+
+    async def ensure_partitions(self, today: Optional[date] = None) -> list[str]:
+        """
+        Create the partitions of the current month and the next months_ahead months
+        by reorganizing pmax (cheap while pmax is empty). Returns the created partition names.
+        """
+        partitions = await self.get_partitions()
+        if not partitions:
+            logger.warning("egb_log is not partitioned: run db_migrate_log_partitions.sql")
+            return []
+        if partitions[-1][1] is not None:
+            logger.warning("egb_log has no pmax partition, cannot add months")
+            return []
+
+        today = today or date.today()
+        bounds = [bound for _, bound, _ in partitions if bound]
+        last_bound = max(bounds) if bounds else _month_start(today)
+        target = _month_start(today, self.months_ahead + 1)
+
+        new_partitions = []
+        while last_bound < target:
+            next_bound = _month_start(last_bound, 1)
+            new_partitions.append((f"p{last_bound.strftime('%Y%m')}", next_bound))
+            last_bound = next_bound
+        if not new_partitions:
+            return []
+
+        definitions = ', '.join(
+            f"PARTITION {name} VALUES LESS THAN ('{bound.isoformat()}')" for name, bound in new_partitions
+        )
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    f'''ALTER TABLE egb_log REORGANIZE PARTITION pmax INTO
+                        ({definitions}, PARTITION pmax VALUES LESS THAN (MAXVALUE))'''
+                )
+        names = [name for name, _ in new_partitions]
+        logger.info(f"egb_log: created partitions {', '.join(names)}")
+        return names
+
+    async def archive(self, today: Optional[date] = None, dry_run: bool = False) -> list[tuple[str, int]]:
+        """
+        Export then drop every partition entirely older than the retention window.
+        Returns (partition name, rows exported) for each archived partition
+        (estimated rows in dry-run mode).
+        """
+        if self.retention_months <= 0:
+            return []
+        cutoff = _month_start(today or date.today(), -self.retention_months)
+        partitions = await self.get_partitions()
+        expired = [(name, rows) for name, bound, rows in partitions if bound and bound <= cutoff]
+        if dry_run:
+            return expired
+
+        archived = []
+        for name, _ in expired:
+            count = await self._export_partition(name)
+            async with self.pool.acquire() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(f'ALTER TABLE egb_log DROP PARTITION {name}')
+            logger.info(f"egb_log: archived and dropped partition {name} ({count} rows)")
+            archived.append((name, count))
+        return archived
+
+    async def _export_partition(self, name: str) -> int:
+        """Stream one partition into out/egb_log_<name>.jsonl.gz. Returns the number of rows written."""
+        os.makedirs(self.out_dir, exist_ok=True)
+        path = os.path.join(self.out_dir, f'egb_log_{name}.jsonl.gz')
+        tmp_path = path + '.tmp'
+        loop = asyncio.get_running_loop()
+        count = 0
+
+        archive = gzip.open(tmp_path, 'wt', encoding='utf-8')
+        try:
+            async with self.pool.acquire() as conn:
+                async with conn.cursor(aiomysql.SSDictCursor) as cursor:
+                    await cursor.execute(
+                        f'''SELECT id, GuildId, DiscordId, LogTime, ActionCode, TargetId, Amount, Outcome, Details, Action, created_at
+                            FROM egb_log PARTITION ({name}) ORDER BY id'''
+                    )
+                    while rows := await cursor.fetchmany(1000):
+                        lines = ''.join(json.dumps(row, default=str, ensure_ascii=False) + '\n' for row in rows)
+                        # Compression is CPU work: keep it off the event loop
+                        await loop.run_in_executor(None, archive.write, lines)
+                        count += len(rows)
+        except Exception:
+            archive.close()
+            os.remove(tmp_path)
+            raise
+        archive.close()
+
+        os.replace(tmp_path, path)
+        return count
+
+    # ===== BACKGROUND =====
+    def start(self, interval_hours: float = 24):
+        """Check partitions and retention every interval_hours in the background"""
+        if self._task:
+            return
+        self._task = asyncio.create_task(self._run_forever(interval_hours * 3600))
+
+    async def stop(self):
+        """Stop the background task"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run_forever(self, interval_seconds: float):
+        while True:
+            try:
+                await self.ensure_partitions()
+                await self.archive()
+            except Exception as e:
+                logger.error(f"Error in log retention: {e}")
+            await asyncio.sleep(interval_seconds)
@@ -0,0 +1,156 @@
+import copy
+import json
+import logging
+import os
+import queue
+import sys
+from contextvars import ContextVar
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+from typing import Mapping
+
+# Fields of the interaction being handled (command, user_id, guild_id), set by the command tree
+# and added to every record logged from the same task
+log_context: ContextVar[Mapping] = ContextVar('log_context', default={})
+
+# LogRecord attributes that are not structured fields
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, the extra fields, then exc"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SizedTimedRotatingFileHandler(TimedRotatingFileHandler):
+    """Rotates at the configured time (midnight by default) or when the file exceeds max_bytes"""
+
+    def __init__(self, filename: str, max_bytes: int, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.max_bytes = max_bytes
+
+    def shouldRollover(self, record: logging.LogRecord) -> int:
+        if super().shouldRollover(record):
+            return 1
+        # The file may exceed max_bytes by one line: no second formatting of every record
+        if self.max_bytes and self.stream and self.stream.tell() >= self.max_bytes:
+            return 1
+        return 0
+
+    def rotation_filename(self, default_name: str) -> str:
+        # Several rollovers in the same period (size) would reuse the same suffix
+        name, index = default_name, 1
+        while os.path.exists(name):
+            name = f"{default_name}.{index}"
+            index += 1
+        return name
+
+
+class ContextQueueHandler(QueueHandler):
+    """
+    QueueHandler run in the logging thread (often the event loop): adds the interaction
+    context, renders the message and the traceback, and drops the record when the queue
+    is full rather than block. The writing is done by the QueueListener thread.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._reported_dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        for key, value in log_context.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+        dropped = self.dropped
+        if dropped > self._reported_dropped:
+            try:
+                self.queue.put_nowait(logging.makeLogRecord({
+                    'name': __name__, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                    'msg': f"{dropped - self._reported_dropped} log record(s) dropped: the log queue was full",
+                }))
+                self._reported_dropped = dropped
+            except queue.Full:
+                pass
+
+
+class BlockingStopListener(QueueListener):
+    """QueueListener whose stop() waits for room in a full queue instead of raising queue.Full"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+def _level(name: str) -> int:
+    level = logging.getLevelName(name.upper())
+    if not isinstance(level, int):
+        raise ValueError(f"unknown log level {name!r}")
+    return level
+
+
+def apply_levels(config):
+    """Set the root level and the per-logger levels (LOG_LEVEL / LOG_LEVELS), also on reload"""
+    logging.getLogger().setLevel(_level(config.log_level))
+    for name, level in config.log_levels.items():
+        logging.getLogger(name).setLevel(_level(level))
+
+
+def setup_logging(config, log_dir: str, queue_size: int = 10000) -> QueueListener:
+    """
+    Route every logger (ours and discord.py's) through a bounded queue to a listener thread
+    that writes JSON lines to log_dir/egb.log (rotated by size and daily) and plain text
+    to stderr from LOG_CONSOLE_LEVEL. Returns the started listener (stop() flushes it).
+    """
+    os.makedirs(log_dir, exist_ok=True)
+    file_handler = SizedTimedRotatingFileHandler(
+        os.path.join(log_dir, 'egb.log'),
+        max_bytes=config.log_max_mb * 1024 * 1024,
+        when='midnight',
+        backupCount=config.log_backup_count,
+        encoding='utf-8'
+    )
+    file_handler.setFormatter(JsonFormatter())
+    console_handler = logging.StreamHandler(sys.stderr)
+    console_handler.setLevel(_level(config.log_console_level))
+    console_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+
+    log_queue = queue.Queue(queue_size)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(ContextQueueHandler(log_queue))
+    apply_levels(config)
+    logging.captureWarnings(True)
+
+    listener = BlockingStopListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    listener.start()
+    return listener
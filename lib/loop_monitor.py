@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from bisect import bisect_left
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LoopMonitor:
+    """
+    Event-loop lag sampler: a task sleeps `interval` seconds and measures how late it
+    wakes up, which is how long the loop was busy with something else (a blocking call,
+    a long synchronous callback). Lags go into a fixed-bucket histogram; a lag above
+    alert_ms logs a warning, at most once per ALERT_INTERVAL seconds.
+
+    With a heartbeat_path, the sampler also touches that file every HEARTBEAT_INTERVAL
+    seconds: it stops being updated when the loop is stuck (start_egb.py health probe).
+
+    Debug mode (watchdog_ms > 0): a watchdog thread notices when the sampler has not run
+    for watchdog_ms and logs the stack of the loop thread while it is still stuck, i.e.
+    the code blocking the loop (asyncio debug mode would slow every callback instead).
+    """
+
+    BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)  # upper bounds, then +inf
+    ALERT_INTERVAL = 60
+    HEARTBEAT_INTERVAL = 10
+
+    def __init__(self, interval: float = 0.25, alert_ms: int = 250, watchdog_ms: int = 0,
+                 heartbeat_path: Optional[str] = None):
+        self.interval = interval
+        self.alert_ms = alert_ms
+        self.watchdog_ms = watchdog_ms
+        self.heartbeat_path = heartbeat_path
+        self._histogram = [0] * (len(self.BUCKETS_MS) + 1)
+        self._max_ms = 0.0
+        self._stalls = 0  # lags above alert_ms
+        self._pending_alerts = 0
+        self._next_alert_at = 0.0
+        self._beat = time.monotonic()  # last sampler run, read by the watchdog thread
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._watchdog_stop = threading.Event()
+
+    # ===== BACKGROUND =====
+    def start(self):
+        """Start the sampler (and the watchdog thread in debug mode), from the running loop"""
+        if self._task:
+            return
+        self._beat = time.monotonic()
+        self._task = asyncio.create_task(self._run_forever())
+        if self.watchdog_ms > 0:
+            self._watchdog_stop.clear()
+            self._watchdog = threading.Thread(
+                target=self._watch, args=(threading.get_ident(),), name='loop-watchdog', daemon=True
+            )
+            self._watchdog.start()
+
+    async def stop(self):
+        """Stop the sampler and the watchdog thread"""
+        if self._watchdog:
+            self._watchdog_stop.set()
+            await asyncio.to_thread(self._watchdog.join)
+            self._watchdog = None
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run_forever(self):
+        loop = asyncio.get_running_loop()
+        next_heartbeat = 0.0
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self._beat = time.monotonic()
+            self.record((loop.time() - expected) * 1000)
+            if self.heartbeat_path and self._beat >= next_heartbeat:
+                next_heartbeat = self._beat + self.HEARTBEAT_INTERVAL
+                try:
+                    await asyncio.to_thread(self._touch_heartbeat)
+                except OSError as e:
+                    logger.warning(f"Cannot write heartbeat {self.heartbeat_path}: {e}")
+
+    def _touch_heartbeat(self):
+        os.makedirs(os.path.dirname(self.heartbeat_path) or '.', exist_ok=True)
+        with open(self.heartbeat_path, 'a'):
+            os.utime(self.heartbeat_path)
+
+    # ===== SAMPLES =====
+    def record(self, lag_ms: float):
+        """Add one lag sample"""
+        lag_ms = max(lag_ms, 0.0)
+        self._histogram[bisect_left(self.BUCKETS_MS, lag_ms)] += 1
+        self._max_ms = max(self._max_ms, lag_ms)
+        if self.alert_ms and lag_ms >= self.alert_ms:
+            self._stalls += 1
+            self._pending_alerts += 1
+            now = time.monotonic()
+            if now >= self._next_alert_at:
+                logger.warning(
+                    f"Event loop lag: {lag_ms:.0f} ms (threshold {self.alert_ms} ms, "
+                    f"{self._pending_alerts} stall(s) since the last alert)"
+                )
+                self._pending_alerts = 0
+                self._next_alert_at = now + self.ALERT_INTERVAL
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Upper bound (ms) of the bucket holding the given fraction of the samples, None without samples"""
+        total = sum(self._histogram)
+        if not total:
+            return None
+        seen = 0
+        for index, count in enumerate(self._histogram):
+            seen += count
+            if seen >= fraction * total:
+                return self.BUCKETS_MS[index] if index < len(self.BUCKETS_MS) else self._max_ms
+        return self._max_ms
+
+    def stats(self) -> dict:
+        """Samples, histogram [(upper bound ms or None for the overflow bucket, count)], p50/p99, max, stalls"""
+        bounds = list(self.BUCKETS_MS) + [None]
+        return {
+            'samples': sum(self._histogram),
+            'histogram': list(zip(bounds, self._histogram)),
+            'p50_ms': self.percentile(0.5),
+            'p99_ms': self.percentile(0.99),
+            'max_ms': self._max_ms,
+            'stalls': self._stalls,
+        }
+
+    # ===== WATCHDOG (debug mode) =====
+    def _watch(self, loop_thread_id: int):
+        """Watchdog thread: dump the loop thread's stack once per stall longer than watchdog_ms"""
+        limit = self.interval + self.watchdog_ms / 1000
+        reported_beat = None
+        while not self._watchdog_stop.wait(min(self.interval, self.watchdog_ms / 1000)):
+            beat = self._beat
+            stalled_for = time.monotonic() - beat
+            if stalled_for < limit or beat == reported_beat:
+                continue
+            frame = sys._current_frames().get(loop_thread_id)
+            if frame is None:
+                continue
+            reported_beat = beat
+            stack = ''.join(traceback.format_stack(frame))
+            logger.warning(f"Event loop blocked for {stalled_for * 1000:.0f} ms, loop thread stack:\n{stack}")
@@ -1,55 +1,177 @@
 import aiomysql
+from datetime import datetime, timedelta
 from typing import Optional
-import sys
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class PactManager:
     """
-    Manages blood pact state between players.
+    Manages blood pact state between players of one guild.
     A pact links two players for 24h: effects (bless, curse, steal, devour, swim)
     are mirrored to the partner at creation time, and any successful levelup
     propagates a free level to the partner.
+    Active pacts are cached in memory; once load_all() has run, a cache miss
+    means the player has no active pact.
     """
 
-    def __init__(self, pool: aiomysql.Pool):
+    def __init__(self, pool: aiomysql.Pool, guild_id: int, expiry_scheduler=None, change_feed=None):
         self.pool = pool
+        self.guild_id = guild_id
+        self.expiry_scheduler = expiry_scheduler
+        self.change_feed = change_feed
+        self._partners: dict[int, tuple[int, datetime]] = {}  # discord_id -> (partner_id, expires_at)
+        self._warm = False
+
+    async def load_all(self) -> int:
+        """
+        Stream every active pact of the guild into the cache.
+        Returns the number of pacts loaded.
+        """
+        partners = {}
+        count = 0
+        async with self.pool.acquire() as conn:
+            async with conn.cursor(aiomysql.SSCursor) as cursor:
+                await cursor.execute(
+                    '''SELECT requester_id, target_id, expires_at FROM egb_pacts
+                       WHERE guild_id = %s AND status = 'active' AND expires_at > NOW()''',
+                    (self.guild_id,)
+                )
+                while rows := await cursor.fetchmany(1000):
+                    for requester_id, target_id, expires_at in rows:
+                        partners[requester_id] = (target_id, expires_at)
+                        partners[target_id] = (requester_id, expires_at)
+                        count += 1
+
+        # Pacts created while streaming are fresher than the streamed rows
+        partners.update(self._partners)
+        self._partners = partners
+        self._warm = True
+        return count
+
+    async def refresh(self, discord_id: int):
+        """Read again the active pact of a player changed by another instance"""
+        self._partners.pop(discord_id, None)
+        if not self._warm:
+            return
+        self._warm = False  # a miss must hit the database while reading
+        try:
+            partner_id = await self.get_active_pact_partner(discord_id)
+        finally:
+            self._warm = True
+        if partner_id:
+            self._partners[partner_id] = (discord_id, self._partners[discord_id][1])
 
     async def get_active_pact_partner(self, discord_id: int) -> Optional[int]:
         """
         Returns the partner's discord_id if this player is in an active pact, else None.
         """
+        cached = self._partners.get(discord_id)
+        if cached:
+            partner_id, expires_at = cached
+            return partner_id if expires_at > datetime.now() else None
+        if self._warm:
+            return None
+
         try:
             async with self.pool.acquire() as conn:
                 async with conn.cursor(aiomysql.DictCursor) as cursor:
                     await cursor.execute(
-                        '''SELECT requester_id, target_id FROM egb_pacts
-                           WHERE status = 'active' AND expires_at > NOW()
+                        '''SELECT requester_id, target_id, expires_at FROM egb_pacts
+                           WHERE guild_id = %s AND status = 'active' AND expires_at > NOW()
                            AND (requester_id = %s OR target_id = %s)
                            LIMIT 1''',
-                        (discord_id, discord_id)
+                        (self.guild_id, discord_id, discord_id)
                     )
                     row = await cursor.fetchone()
 
             if not row:
                 return None
-            return row['target_id'] if row['requester_id'] == discord_id else row['requester_id']
+            partner_id = row['target_id'] if row['requester_id'] == discord_id else row['requester_id']
+            self._partners[discord_id] = (partner_id, row['expires_at'])
+            return partner_id
         except Exception as e:
-            print(f"Error getting pact partner for {discord_id}: {e}", file=sys.stderr)
+            logger.error(f"Error getting pact partner for {discord_id}: {e}")
             return None
 
-    async def create_pact(self, requester_id: int, target_id: int) -> 'datetime':
+    async def create_pact(self, requester_id: int, target_id: int) -> datetime:
         """
         Insert an active pact into egb_pacts. Returns the expiry datetime.
         Cooldown recording (egb_ability_usage) is handled by the caller via AbilityManager.
         """
-        from datetime import datetime, timedelta
         expires_at = datetime.now() + timedelta(hours=24)
         async with self.pool.acquire() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute(
-                    '''INSERT INTO egb_pacts (requester_id, target_id, status, accepted_at, expires_at)
-                       VALUES (%s, %s, 'active', NOW(), %s)''',
-                    (requester_id, target_id, expires_at)
+                    '''INSERT INTO egb_pacts (guild_id, requester_id, target_id, status, accepted_at, expires_at)
+                       VALUES (%s, %s, %s, 'active', NOW(), %s)''',
+                    (self.guild_id, requester_id, target_id, expires_at)
                 )
+                pact_id = cursor.lastrowid
                 await conn.commit()
+        self._partners[requester_id] = (target_id, expires_at)
+        self._partners[target_id] = (requester_id, expires_at)
+        self._publish(requester_id, target_id)
+        if self.expiry_scheduler:
+            self.expiry_scheduler.schedule(self.guild_id, 'pact', pact_id, expires_at)
         return expires_at
+
+    async def load_expiries(self) -> list[tuple[datetime, int]]:
+        """Every pact of the guild still marked active, expired or not, as (expires_at, pact_id)"""
+        expiries = []
+        async with self.pool.acquire() as conn:
+            async with conn.cursor(aiomysql.SSCursor) as cursor:
+                await cursor.execute(
+                    '''SELECT id, expires_at FROM egb_pacts
+                       WHERE guild_id = %s AND status = 'active' AND expires_at IS NOT NULL''',
+                    (self.guild_id,)
+                )
+                while rows := await cursor.fetchmany(1000):
+                    expiries.extend((expires_at, pact_id) for pact_id, expires_at in rows)
+        return expiries
+
+    async def expire_pacts(self, pact_ids: list[int], now: datetime) -> list[tuple[int, int]]:
+        """
+        Move the given pacts to status 'expired' if they ended before `now`, in one batched UPDATE.
+        Returns the (requester_id, target_id) pairs that were expired.
+        """
+        if not pact_ids:
+            return []
+        placeholders = ', '.join(['%s'] * len(pact_ids))
+        async with self.pool.acquire() as conn:
+            await conn.begin()
+            try:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(
+                        f'''SELECT id, requester_id, target_id FROM egb_pacts
+                            WHERE guild_id = %s AND id IN ({placeholders}) AND status = 'active' AND expires_at <= %s
+                            FOR UPDATE''',
+                        (self.guild_id, *pact_ids, now)
+                    )
+                    rows = await cursor.fetchall()
+                    if rows:
+                        await cursor.execute(
+                            f'''UPDATE egb_pacts SET status = 'expired'
+                                WHERE id IN ({', '.join(['%s'] * len(rows))})''',
+                            [row[0] for row in rows]
+                        )
+                await conn.commit()
+            except Exception:
+                await conn.rollback()
+                raise
+
+        pairs = [(requester_id, target_id) for _, requester_id, target_id in rows]
+        for requester_id, target_id in pairs:
+            for discord_id in (requester_id, target_id):
+                cached = self._partners.get(discord_id)
+                if cached and cached[1] <= now:
+                    del self._partners[discord_id]
+            self._publish(requester_id, target_id)
+        return pairs
+
+    def _publish(self, *discord_ids: int):
+        """Tell the other instances that the pacts of these players changed"""
+        if self.change_feed:
+            for discord_id in discord_ids:
+                self.change_feed.publish(self.guild_id, 'pact', discord_id)
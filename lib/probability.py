@@ -0,0 +1,159 @@
+from datetime import datetime
+from typing import Iterable, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # pure Python fallback, same results
+    np = None
+
+
+class ProbabilityEngine:
+    """
+    Levelup probability rules, free of any Discord or database code.
+
+    The chance of a player is:
+        time chance = base + bonus_per_hour * hours since last attempt, capped at max
+                      (base if the player never attempted)
+        total       = time chance + flat bonus (devour, oppression, bless/curse/steal), clamped to 0..100
+                      (0 while under a leader curse)
+
+    Single players go through the scalar methods; success_chances() scores
+    many players at once with NumPy when it is available.
+    """
+
+    def __init__(self, base_chance: int = 20, bonus_per_hour: int = 5, max_chance: int = 80):
+        self.base_chance = base_chance
+        self.bonus_per_hour = bonus_per_hour
+        self.max_chance = max_chance
+
+    @classmethod
+    def from_config(cls, config) -> 'ProbabilityEngine':
+        """Build the engine from the levelup settings of a Config"""
+        return cls(config.base_levelup_chance, config.bonus_per_hour, config.max_levelup_chance)
+
+    # ===== BONUSES =====
+    @staticmethod
+    def flat_bonus(bonuses: Optional[dict], now: Optional[datetime] = None) -> int:
+        """Flat modifier (in %) from a bonus row: devour, active oppression and effect totals"""
+        if not bonuses:
+            return 0
+        now = now or datetime.now()
+
+        total = bonuses.get('devour_bonus') or 0
+        oppression_until = bonuses.get('oppression_until')
+        if bonuses.get('oppression_malus') and oppression_until and oppression_until > now:
+            total += bonuses['oppression_malus']
+        total += ProbabilityEngine.effects_total(bonuses)
+        return total
+
+    @staticmethod
+    def effects_total(bonuses: Optional[dict]) -> int:
+        """Net bless/curse/steal modifier (in %) from a bonus row"""
+        if not bonuses:
+            return 0
+        return (
+            (bonuses.get('bless_total') or 0)
+            - (bonuses.get('curse_total') or 0)
+            + (bonuses.get('steal_bonus_total') or 0)
+            - (bonuses.get('steal_malus_total') or 0)
+        )
+
+    @staticmethod
+    def is_leader_cursed(bonuses: Optional[dict], now: Optional[datetime] = None) -> bool:
+        """True if the bonus row carries a leader curse that has not expired"""
+        curse_until = bonuses.get('leader_curse_until') if bonuses else None
+        return bool(curse_until and curse_until > (now or datetime.now()))
+
+    # ===== SCALAR =====
+    def time_chance(self, last_attempt: Optional[datetime], now: Optional[datetime] = None) -> float:
+        """Chance earned by waiting since the last attempt (no bonuses)"""
+        if not last_attempt:
+            return self.base_chance
+
+        hours_since_last = ((now or datetime.now()) - last_attempt).total_seconds() / 3600
+        bonus = min(hours_since_last * self.bonus_per_hour, self.max_chance - self.base_chance)
+        return min(self.base_chance + bonus, self.max_chance)
+
+    def success_chance(self, last_attempt: Optional[datetime], flat_bonus: float = 0,
+                       leader_cursed: bool = False, now: Optional[datetime] = None) -> float:
+        """Total success chance of one player, clamped to 0..100"""
+        if leader_cursed:
+            return 0.0
+        return float(max(min(self.time_chance(last_attempt, now) + flat_bonus, 100.0), 0.0))
+
+    # ===== BATCH =====
+    def time_chances(self, last_attempts: Sequence[Optional[datetime]],
+                     now: Optional[datetime] = None) -> list[float]:
+        """time_chance() for many players at once"""
+        return self.success_chances(last_attempts, clamp=False, now=now)
+
+    def success_chances(self, last_attempts: Sequence[Optional[datetime]],
+                        flat_bonuses: Optional[Iterable[float]] = None,
+                        leader_cursed: Optional[Iterable[bool]] = None,
+                        clamp: bool = True, now: Optional[datetime] = None) -> list[float]:
+        """
+        success_chance() for many players at once.
+        All sequences are aligned on last_attempts; missing ones default to no bonus / no curse.
+        """
+        count = len(last_attempts)
+        if count == 0:
+            return []
+        now = now or datetime.now()
+        flat_bonuses = list(flat_bonuses) if flat_bonuses is not None else [0] * count
+        leader_cursed = list(leader_cursed) if leader_cursed is not None else [False] * count
+
+        if np is None or count == 1:
+            chances = []
+            for last_attempt, flat, cursed in zip(last_attempts, flat_bonuses, leader_cursed):
+                if clamp:
+                    chances.append(self.success_chance(last_attempt, flat, cursed, now))
+                else:
+                    chances.append(float(self.time_chance(last_attempt, now)))
+            return chances
+
+        hours = np.array(
+            [(now - la).total_seconds() / 3600 if la else np.nan for la in last_attempts],
+            dtype=np.float64
+        )
+        if not clamp:
+            return self.chances_from_hours(hours, clamp=False).tolist()
+        return self.chances_from_hours(
+            hours,
+            np.asarray(flat_bonuses, dtype=np.float64),
+            np.asarray(leader_cursed, dtype=bool)
+        ).tolist()
+
+    def chances_from_hours(self, hours, flat_bonuses=0.0, leader_cursed=None, clamp: bool = True):
+        """
+        Vectorized core of success_chances() on NumPy arrays of any shape (requires NumPy).
+        hours: hours since the last attempt, NaN for players who never attempted.
+        """
+        waited = np.minimum(hours * self.bonus_per_hour, self.max_chance - self.base_chance)
+        chances = np.where(
+            np.isnan(hours),
+            float(self.base_chance),
+            np.minimum(self.base_chance + waited, self.max_chance)
+        )
+        if clamp:
+            chances = np.clip(chances + flat_bonuses, 0.0, 100.0)
+            if leader_cursed is not None:
+                chances = np.where(leader_cursed, 0.0, chances)
+        return chances
+
+    def score(self, characters: Sequence, bonuses_by_id: Optional[dict] = None,
+              now: Optional[datetime] = None) -> dict[int, float]:
+        """
+        Current total chance of many characters in one pass.
+        bonuses_by_id maps discord_id -> bonus row (players without a row have no bonus).
+        Returns {discord_id: chance}.
+        """
+        now = now or datetime.now()
+        bonuses_by_id = bonuses_by_id or {}
+        rows = [bonuses_by_id.get(c.get_discord_id()) for c in characters]
+        chances = self.success_chances(
+            [c.get_last_attempt() for c in characters],
+            [self.flat_bonus(row, now) for row in rows],
+            [self.is_leader_cursed(row, now) for row in rows],
+            now=now
+        )
+        return {c.get_discord_id(): chance for c, chance in zip(characters, chances)}
@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+import aiomysql
+import discord
+from .clan_system import ClanSystem
+
+logger = logging.getLogger(__name__)
+
+
+class RoleReconciler:
+    """
+    Repairs the clan and wings roles of the members of a guild from egb_characters.level,
+    for the cases the live path misses (role assignment failure, admin fallback to a DM,
+    leveldown of a member who left and rejoined).
+
+    Members are walked by id in chunks; the levels of a chunk are read at once from the
+    guild cache (or one query). A member whose roles differ gets a single member.edit with
+    the full role list. Requests (edits and role creations) are paced at
+    `requests_per_minute` and capped at `budget` per run: when the budget is spent, the
+    last member id is saved as a checkpoint in egb_role_reconcile_state and the next run
+    resumes from it, on whichever instance serves the guild by then.
+
+    Every instance reconciles the guilds of its own shards; runs on the same guild are
+    serialized by a per-guild lock.
+    Members without a character, the owner, members ranked at or above the bot and roles
+    above the bot's own role are left alone (no request spent on a certain Forbidden).
+    """
+
+    CHUNK_SIZE = 200
+
+    def __init__(self, bot, pool: aiomysql.Pool, requests_per_minute: int = 30, budget: int = 500):
+        self.bot = bot
+        self.pool = pool
+        self.requests_per_minute = requests_per_minute
+        self.budget = budget
+        self._locks: dict[int, asyncio.Lock] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._next_request_at = 0.0
+
+    # ===== CHECKPOINT =====
+    async def _load_checkpoint(self, guild_id: int) -> Optional[int]:
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    'SELECT last_member_id FROM egb_role_reconcile_state WHERE guild_id = %s',
+                    (guild_id,)
+                )
+                row = await cursor.fetchone()
+        return row[0] if row else None
+
+    async def _save_checkpoint(self, guild_id: int, after: Optional[int]):
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                if after is None:
+                    await cursor.execute('DELETE FROM egb_role_reconcile_state WHERE guild_id = %s', (guild_id,))
+                else:
+                    await cursor.execute(
+                        '''INSERT INTO egb_role_reconcile_state (guild_id, last_member_id) VALUES (%s, %s)
+                           ON DUPLICATE KEY UPDATE last_member_id = VALUES(last_member_id)''',
+                        (guild_id, after)
+                    )
+
+    # ===== RUN =====
+    async def run(self, guild: discord.Guild, dry_run: bool = False, budget: Optional[int] = None,
+                  progress: Optional[Callable[[dict], Awaitable[None]]] = None) -> dict:
+        """
+        Reconcile the roles of a guild, from its checkpoint if a previous run ran out of budget.
+        progress(report) is awaited after every chunk.
+        Returns {'checked', 'fixed', 'skipped', 'errors', 'requests', 'done', 'resumed_from'}.
+        """
+        async with self._locks.setdefault(guild.id, asyncio.Lock()):
+            return await self._run(guild, dry_run, self.budget if budget is None else budget, progress)
+
+    async def _run(self, guild: discord.Guild, dry_run: bool, budget: int, progress) -> dict:
+        # A dry run always scans the whole guild and never moves the checkpoint
+        after = None if dry_run else await self._load_checkpoint(guild.id)
+        report = {'checked': 0, 'fixed': 0, 'skipped': 0, 'errors': 0, 'requests': 0,
+                  'done': False, 'resumed_from': after}
+        if not guild.me.guild_permissions.manage_roles:
+            logger.warning(f"Role reconciliation skipped in guild {guild.id}: missing Manage Roles")
+            return report
+        if not guild.chunked:
+            await guild.chunk()
+
+        state = self.bot.guild_state(guild.id)
+        clan_names = set(ClanSystem.get_all_clan_role_names())
+        wings_name = self.bot.config.role_wings
+        members = sorted((m for m in guild.members if not m.bot and (after is None or m.id > after)),
+                         key=lambda m: m.id)
+
+        for start in range(0, len(members), self.CHUNK_SIZE):
+            chunk = members[start:start + self.CHUNK_SIZE]
+            characters = await state.get_characters([member.id for member in chunk])
+            for member in chunk:
+                previous, after = after, member.id
+                report['checked'] += 1
+                character = characters.get(member.id)
+                if character is None:
+                    continue
+
+                clan_info = ClanSystem.get_clan_by_level(character.get_level())
+                expected = {clan_info['name']} | ({wings_name} if clan_info['has_wings'] else set())
+                current = {role.name for role in member.roles if role.name in clan_names or role.name == wings_name}
+                if current == expected:
+                    continue
+                # The bot cannot edit the owner or a member ranked at or above it (the admins the
+                # live path sends a DM to), nor give or take roles at or above its highest role
+                if (member.id == guild.owner_id or member.top_role >= guild.me.top_role
+                        or any(role >= guild.me.top_role for role in guild.roles if role.name in current ^ expected)):
+                    report['skipped'] += 1
+                    continue
+                if dry_run:
+                    report['fixed'] += 1
+                    continue
+
+                if report['requests'] + 1 + self._missing_roles(guild, expected) > budget:
+                    await self._save_checkpoint(guild.id, previous)
+                    logger.info(
+                        f"Role reconciliation of guild {guild.id} paused after {report['checked'] - 1} "
+                        f"member(s): budget of {budget} request(s) spent"
+                    )
+                    return report
+                try:
+                    await self._fix(member, clan_info, expected, clan_names, wings_name, report)
+                    report['fixed'] += 1
+                except discord.Forbidden:
+                    report['skipped'] += 1
+                except discord.HTTPException as e:
+                    report['errors'] += 1
+                    logger.error(f"Error fixing roles of {member.id} in guild {guild.id}: {e}")
+            if not dry_run:
+                await self._save_checkpoint(guild.id, after)
+            if progress:
+                await progress(dict(report))
+
+        if not dry_run:
+            await self._save_checkpoint(guild.id, None)
+        report['done'] = True
+        logger.info(
+            f"Role reconciliation of guild {guild.id}{' (dry run)' if dry_run else ''}: "
+            f"{report['checked']} checked, {report['fixed']} fixed, {report['skipped']} skipped, "
+            f"{report['errors']} error(s), {report['requests']} request(s)"
+        )
+        return report
+
+    @staticmethod
+    def _missing_roles(guild: discord.Guild, names: set) -> int:
+        return sum(1 for name in names if discord.utils.get(guild.roles, name=name) is None)
+
+    async def _fix(self, member: discord.Member, clan_info: dict, expected: set, clan_names: set,
+                   wings_name: str, report: dict):
+        """Create the missing roles, then set the member's roles in one request"""
+        guild = member.guild
+        wanted = []
+        for name in expected:
+            role = discord.utils.get(guild.roles, name=name)
+            if role is None:
+                await self._pace(report)
+                if name == wings_name:
+                    role = await guild.create_role(name=name, color=discord.Color.purple(), reason="Razielim wings")
+                else:
+                    role = await guild.create_role(name=name, color=clan_info['color'], reason="Vampire clan progression")
+            wanted.append(role)
+
+        roles = [role for role in member.roles
+                 if not role.is_default() and role.name not in clan_names and role.name != wings_name]
+        await self._pace(report)
+        await member.edit(roles=roles + wanted, reason="Clan role reconciliation")
+
+    async def _pace(self, report: dict):
+        """Wait for the next request slot (requests_per_minute) and count the request"""
+        delay = self._next_request_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self._next_request_at = time.monotonic() + 60 / self.requests_per_minute
+        report['requests'] += 1
+
+    # ===== BACKGROUND =====
+    def start(self, interval_hours: float):
+        """Reconcile the guilds of this instance every interval_hours in the background (0 disables it)"""
+        if self._task or interval_hours <= 0:
+            return
+        self._task = asyncio.create_task(self._run_forever(interval_hours * 3600))
+
+    async def stop(self):
+        """Stop the background task"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run_forever(self, interval_seconds: float):
+        while True:
+            await asyncio.sleep(interval_seconds)
+            for guild in list(self.bot.guilds):
+                try:
+                    await self.run(guild)
+                except Exception as e:
+                    logger.error(f"Error in role reconciliation of guild {guild.id}: {e}")
@@ -0,0 +1,155 @@
+import aiomysql
+from datetime import datetime
+from typing import Optional
+
+
+class SacrificeManager:
+    """
+    Manages the sacrifice links (egb_sacrifice_links) of one guild: a caster binds a victim for 15 minutes,
+    and the victim loses a level if the caster's probability reaches 0 meanwhile.
+    Active links are cached in memory; once load_all() has run, a cache miss
+    means there is no active link.
+    """
+
+    def __init__(self, pool: aiomysql.Pool, guild_id: int, expiry_scheduler=None, change_feed=None):
+        self.pool = pool
+        self.guild_id = guild_id
+        self.expiry_scheduler = expiry_scheduler
+        self.change_feed = change_feed
+        self._links: dict[int, dict] = {}  # link id -> {'id', 'caster_id', 'victim_id', 'expires_at'}
+        self._warm = False
+
+    async def load_all(self) -> int:
+        """
+        Stream every active sacrifice link of the guild into the cache.
+        Returns the number of links loaded.
+        """
+        links = {}
+        async with self.pool.acquire() as conn:
+            async with conn.cursor(aiomysql.SSDictCursor) as cursor:
+                await cursor.execute(
+                    '''SELECT id, caster_id, victim_id, expires_at FROM egb_sacrifice_links
+                       WHERE guild_id = %s AND active = TRUE AND expires_at > NOW()''',
+                    (self.guild_id,)
+                )
+                while rows := await cursor.fetchmany(1000):
+                    for row in rows:
+                        links[row['id']] = row
+
+        links.update(self._links)
+        self._links = links
+        self._warm = True
+        return len(links)
+
+    async def refresh(self):
+        """Read the active links again after another instance changed them (the table holds a handful of rows)"""
+        self._links = {}
+        if self._warm:
+            self._warm = False
+            await self.load_all()
+
+    def _active_links(self):
+        now = datetime.now()
+        return (link for link in self._links.values() if link['expires_at'] > now)
+
+    async def get_active_link_by_caster(self, caster_id: int) -> Optional[dict]:
+        """Active link cast by this player, or None"""
+        if self._warm:
+            return next((link for link in self._active_links() if link['caster_id'] == caster_id), None)
+
+        async with self.pool.acquire() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                await cursor.execute(
+                    '''SELECT id, caster_id, victim_id, expires_at FROM egb_sacrifice_links
+                       WHERE guild_id = %s AND caster_id = %s AND active = TRUE AND expires_at > NOW()''',
+                    (self.guild_id, caster_id)
+                )
+                return await cursor.fetchone()
+
+    async def has_active_link_on_victim(self, victim_id: int) -> bool:
+        """Check if this player is already the victim of an active link"""
+        if self._warm:
+            return any(link['victim_id'] == victim_id for link in self._active_links())
+
+        async with self.pool.acquire() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                await cursor.execute(
+                    '''SELECT id FROM egb_sacrifice_links
+                       WHERE guild_id = %s AND victim_id = %s AND active = TRUE AND expires_at > NOW()''',
+                    (self.guild_id, victim_id)
+                )
+                return await cursor.fetchone() is not None
+
+    async def create_link(self, caster_id: int, victim_id: int, expires_at: datetime) -> int:
+        """Insert an active sacrifice link. Returns its id."""
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    '''INSERT INTO egb_sacrifice_links (guild_id, caster_id, victim_id, expires_at, active)
+                       VALUES (%s, %s, %s, %s, TRUE)''',
+                    (self.guild_id, caster_id, victim_id, expires_at)
+                )
+                link_id = cursor.lastrowid
+                await conn.commit()
+        self._links[link_id] = {
+            'id': link_id, 'caster_id': caster_id, 'victim_id': victim_id, 'expires_at': expires_at
+        }
+        self._publish()
+        if self.expiry_scheduler:
+            self.expiry_scheduler.schedule(self.guild_id, 'sacrifice', link_id, expires_at)
+        return link_id
+
+    async def deactivate_link(self, link_id: int):
+        """Destroy a sacrifice link once it has triggered"""
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    'UPDATE egb_sacrifice_links SET active = FALSE WHERE id = %s',
+                    (link_id,)
+                )
+                await conn.commit()
+        self._links.pop(link_id, None)
+        self._publish()
+
+    async def load_expiries(self) -> list[tuple[datetime, int]]:
+        """Every link of the guild still marked active, expired or not, as (expires_at, link_id)"""
+        expiries = []
+        async with self.pool.acquire() as conn:
+            async with conn.cursor(aiomysql.SSCursor) as cursor:
+                await cursor.execute(
+                    'SELECT id, expires_at FROM egb_sacrifice_links WHERE guild_id = %s AND active = TRUE',
+                    (self.guild_id,)
+                )
+                while rows := await cursor.fetchmany(1000):
+                    expiries.extend((expires_at, link_id) for link_id, expires_at in rows)
+        return expiries
+
+    async def expire_links(self, link_ids: list[int], now: datetime) -> int:
+        """
+        Deactivate the given links if they ended before `now`, in one batched UPDATE.
+        Returns the number of links deactivated.
+        """
+        if not link_ids:
+            return 0
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    f'''UPDATE egb_sacrifice_links SET active = FALSE
+                        WHERE guild_id = %s AND id IN ({', '.join(['%s'] * len(link_ids))})
+                          AND active = TRUE AND expires_at <= %s''',
+                    (self.guild_id, *link_ids, now)
+                )
+                count = cursor.rowcount
+                await conn.commit()
+        for link_id in link_ids:
+            link = self._links.get(link_id)
+            if link and link['expires_at'] <= now:
+                del self._links[link_id]
+        if count:
+            self._publish()
+        return count
+
+    def _publish(self):
+        """Tell the other instances that the sacrifice links of the guild changed"""
+        if self.change_feed:
+            self.change_feed.publish(self.guild_id, 'sacrifice')
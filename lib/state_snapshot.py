@@ -0,0 +1,240 @@
+import asyncio
+import mmap
+import os
+import struct
+import logging
+import time
+from datetime import datetime
+from typing import Callable, Iterable, Optional
+import aiomysql
+from .character import Character
+
+logger = logging.getLogger(__name__)
+
+
+class StateSnapshot:
+    """
+    Compact binary snapshot of the in-memory game state of every warm guild
+    (characters, ability cooldowns, bonus rows and effects), written periodically
+    to local disk so a restart does not have to re-read every table.
+
+    The file carries a database high-water mark: a restart memory-maps the file,
+    fills the caches from it and re-reads only the rows updated at or after the mark
+    (GuildState.restore). The mark is taken from the database clock a safety margin
+    before the caches are serialized, so writes still in flight are re-read too.
+
+    Layout (little-endian): header, then per guild a section header followed by
+    fixed-size records; ability names are stored once per guild.
+    """
+
+    MAGIC = b'EGBSNAP1'
+    VERSION = 1
+    MARK_MARGIN_SECONDS = 60
+
+    HEADER = struct.Struct('<8sIqqI')        # magic, version, written_at, mark, guilds
+    GUILD = struct.Struct('<qIIIII')         # guild_id, characters, cooldowns, bonuses, effects, ability names
+    NAME_LEN = struct.Struct('<H')
+    CHARACTER = struct.Struct('<qiqi')       # discord_id, level, last_attempt, last_successful_levelup ordinal
+    COOLDOWN = struct.Struct('<qHq')         # discord_id, ability name index, last_used
+    BONUS = struct.Struct('<qiBqiqqiiii')    # discord_id, then BonusManager.BONUS_COLUMNS
+    EFFECT = struct.Struct('<qBiq')          # discord_id, effect type index, amount, source_discord_id
+
+    EFFECT_TYPES = ('bless', 'curse', 'steal_bonus', 'steal_malus')
+    NONE = -1  # unset epoch / ordinal
+
+    def __init__(self, pool: aiomysql.Pool, path: str):
+        self.pool = pool
+        self.path = path
+        self._task: Optional[asyncio.Task] = None
+
+    # ===== WRITE =====
+    async def save(self, states: Iterable) -> int:
+        """
+        Write a snapshot of the given GuildStates (only fully warm ones are kept: a cold
+        cache is partial, and restoring it as complete would hide rows).
+        Returns the number of bytes written.
+        """
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute('SELECT NOW() - INTERVAL %s SECOND', (self.MARK_MARGIN_SECONDS,))
+                (mark,) = await cursor.fetchone()
+
+        # No await while encoding: the caches cannot change under us
+        data = self._encode([state for state in states if state.warmed_up], mark)
+        await asyncio.to_thread(self._write_file, data)
+        return len(data)
+
+    def _write_file(self, data: bytes):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    @classmethod
+    def _epoch(cls, value: Optional[datetime]) -> int:
+        return int(value.timestamp()) if value else cls.NONE
+
+    @classmethod
+    def _encode(cls, states: list, mark: datetime) -> bytes:
+        exports = []
+        for state in states:
+            cooldowns = state.ability_manager.export_state()
+            bonus_state = state.bonus_manager.export_state()
+            if cooldowns is not None and bonus_state is not None:
+                exports.append((state, cooldowns, bonus_state))
+
+        parts = [cls.HEADER.pack(cls.MAGIC, cls.VERSION, int(time.time()), cls._epoch(mark), len(exports))]
+        none = cls.NONE
+        for state, cooldowns, (bonuses, effects) in exports:
+            characters = list(state.characters.values())
+            names = sorted({ability_name for _, ability_name in cooldowns})
+            name_index = {name: index for index, name in enumerate(names)}
+            effect_rows = [(discord_id, row) for discord_id, rows in effects.items() for row in rows]
+
+            parts.append(cls.GUILD.pack(
+                state.guild_id, len(characters), len(cooldowns), len(bonuses), len(effect_rows), len(names)
+            ))
+            for name in names:
+                encoded = name.encode('utf-8')
+                parts.append(cls.NAME_LEN.pack(len(encoded)) + encoded)
+            pack = cls.CHARACTER.pack
+            for character in characters:
+                discord_id, level, last_attempt, last_success = character.epochs()
+                parts.append(pack(
+                    discord_id, level,
+                    none if last_attempt is None else last_attempt,
+                    none if last_success is None else last_success
+                ))
+            pack = cls.COOLDOWN.pack
+            for (discord_id, ability_name), last_used in cooldowns.items():
+                parts.append(pack(discord_id, name_index[ability_name], cls._epoch(last_used)))
+            pack = cls.BONUS.pack
+            for discord_id, row in bonuses.items():
+                parts.append(pack(
+                    discord_id,
+                    row.get('devour_bonus') or 0,
+                    1 if row.get('swim_active') else 0,
+                    cls._epoch(row.get('leader_curse_until')),
+                    row.get('oppression_malus') or 0,
+                    cls._epoch(row.get('oppression_until')),
+                    cls._epoch(row.get('shield_until')),
+                    row.get('bless_total') or 0,
+                    row.get('curse_total') or 0,
+                    row.get('steal_bonus_total') or 0,
+                    row.get('steal_malus_total') or 0,
+                ))
+            pack = cls.EFFECT.pack
+            for discord_id, row in effect_rows:
+                parts.append(pack(
+                    discord_id, cls.EFFECT_TYPES.index(row['effect_type']), row['amount'], row['source_discord_id']
+                ))
+        return b''.join(parts)
+
+    # ===== READ =====
+    def read(self) -> Optional[tuple[datetime, dict[int, dict]]]:
+        """
+        Memory-map and decode the snapshot file.
+        Returns (mark, {guild_id: {'characters', 'cooldowns', 'bonuses', 'effects'}}),
+        or None if there is no usable snapshot.
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return self._decode(memoryview(mm))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, struct.error, IndexError) as e:
+            logger.warning(f"Ignoring unreadable state snapshot {self.path}: {e}")
+            return None
+
+    @classmethod
+    def _datetime(cls, epoch: int) -> Optional[datetime]:
+        return None if epoch == cls.NONE else datetime.fromtimestamp(epoch)
+
+    @classmethod
+    def _decode(cls, view: memoryview) -> tuple[datetime, dict[int, dict]]:
+        magic, version, _, mark, guild_count = cls.HEADER.unpack_from(view, 0)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise ValueError("not a state snapshot or unsupported version")
+        offset = cls.HEADER.size
+        to_datetime = cls._datetime
+        none = cls.NONE
+
+        def records(record: struct.Struct, count: int):
+            nonlocal offset
+            end = offset + record.size * count
+            if end > len(view):
+                raise ValueError("truncated snapshot")
+            rows = record.iter_unpack(view[offset:end])
+            offset = end
+            return rows
+
+        guilds = {}
+        try:
+            for _ in range(guild_count):
+                guild_id, n_characters, n_cooldowns, n_bonuses, n_effects, n_names = cls.GUILD.unpack_from(view, offset)
+                offset += cls.GUILD.size
+                names = []
+                for _ in range(n_names):
+                    (length,) = cls.NAME_LEN.unpack_from(view, offset)
+                    offset += cls.NAME_LEN.size
+                    names.append(bytes(view[offset:offset + length]).decode('utf-8'))
+                    offset += length
+
+                characters = Character.from_epochs(
+                    (discord_id, level,
+                     None if last_attempt == none else last_attempt,
+                     None if last_success == none else last_success)
+                    for discord_id, level, last_attempt, last_success in records(cls.CHARACTER, n_characters)
+                )
+                cooldowns = {
+                    (discord_id, names[name_index]): to_datetime(last_used)
+                    for discord_id, name_index, last_used in records(cls.COOLDOWN, n_cooldowns)
+                }
+                bonuses = {}
+                for (discord_id, devour, swim, curse_until, oppression_malus, oppression_until,
+                     shield_until, bless, curse, steal_bonus, steal_malus) in records(cls.BONUS, n_bonuses):
+                    bonuses[discord_id] = {
+                        'devour_bonus': devour, 'swim_active': swim,
+                        'leader_curse_until': to_datetime(curse_until),
+                        'oppression_malus': oppression_malus, 'oppression_until': to_datetime(oppression_until),
+                        'shield_until': to_datetime(shield_until),
+                        'bless_total': bless, 'curse_total': curse,
+                        'steal_bonus_total': steal_bonus, 'steal_malus_total': steal_malus,
+                    }
+                effects = {}
+                for discord_id, type_index, amount, source_id in records(cls.EFFECT, n_effects):
+                    effects.setdefault(discord_id, []).append(
+                        {'effect_type': cls.EFFECT_TYPES[type_index], 'amount': amount, 'source_discord_id': source_id}
+                    )
+                guilds[guild_id] = {
+                    'characters': characters, 'cooldowns': cooldowns, 'bonuses': bonuses, 'effects': effects,
+                }
+        finally:
+            view.release()
+        return to_datetime(mark), guilds
+
+    # ===== BACKGROUND =====
+    def start(self, get_states: Callable[[], Iterable], interval_minutes: float):
+        """Write a snapshot every interval_minutes (0 disables it); get_states() returns the GuildStates"""
+        if self._task or interval_minutes <= 0:
+            return
+        self._task = asyncio.create_task(self._run_forever(get_states, interval_minutes * 60))
+
+    async def stop(self):
+        """Stop the background task"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run_forever(self, get_states, interval_seconds: float):
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await self.save(get_states())
+            except Exception as e:
+                logger.error(f"Error writing state snapshot: {e}")
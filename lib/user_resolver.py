@@ -0,0 +1,111 @@
+import asyncio
+import time
+from typing import Iterable, Optional
+import discord
+
+
+class UserResolver:
+    """
+    Resolves Discord ids to users without hitting the REST API when possible.
+    Lookup order: guild member cache, client user cache, local TTL cache,
+    then a rate-limited fetch_user (the only step that does a REST call).
+    """
+
+    def __init__(self, bot, ttl_seconds: int = 3600, max_concurrency: int = 5, fetch_interval: float = 0.2):
+        self.bot = bot
+        self.ttl_seconds = ttl_seconds
+        self.fetch_interval = fetch_interval  # minimum delay between two REST calls
+        self._cache: dict[int, tuple[float, discord.abc.User]] = {}  # discord_id -> (expires_at, user)
+        self._inflight: dict[int, asyncio.Task] = {}
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._rate_lock = asyncio.Lock()
+        self._next_fetch_at = 0.0
+        self._stats = {'member': 0, 'user': 0, 'cache': 0, 'fetch': 0, 'failed': 0}
+
+    @property
+    def stats(self) -> dict:
+        """Hit/miss counters per lookup step"""
+        return dict(self._stats)
+
+    def get_cached(self, discord_id: int, guild: Optional[discord.Guild] = None) -> Optional[discord.abc.User]:
+        """Resolve from the caches only (no REST call). Returns None on a miss."""
+        if guild:
+            member = guild.get_member(discord_id)
+            if member:
+                self._stats['member'] += 1
+                return member
+
+        user = self.bot.get_user(discord_id)
+        if user:
+            self._stats['user'] += 1
+            return user
+
+        cached = self._cache.get(discord_id)
+        if cached:
+            expires_at, user = cached
+            if expires_at > time.monotonic():
+                self._stats['cache'] += 1
+                return user
+            del self._cache[discord_id]
+        return None
+
+    def cached_display_name(self, discord_id: int, guild: Optional[discord.Guild] = None) -> str:
+        """Display name from the caches only, '#<id>' on a miss"""
+        user = self.get_cached(discord_id, guild)
+        return user.display_name if user else f"#{discord_id}"
+
+    async def resolve(self, discord_id: int, guild: Optional[discord.Guild] = None) -> discord.abc.User:
+        """
+        Resolve a user, fetching it over REST only on a cache miss.
+        Raises like bot.fetch_user (discord.NotFound, discord.HTTPException) if it cannot be fetched.
+        """
+        user = self.get_cached(discord_id, guild)
+        if user:
+            return user
+
+        # Concurrent lookups of the same id share one REST call
+        task = self._inflight.get(discord_id)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(discord_id))
+            self._inflight[discord_id] = task
+            task.add_done_callback(lambda _: self._inflight.pop(discord_id, None))
+        return await asyncio.shield(task)
+
+    async def resolve_many(self, discord_ids: Iterable[int],
+                           guild: Optional[discord.Guild] = None) -> dict[int, Optional[discord.abc.User]]:
+        """
+        Resolve several users; REST fetches run concurrently (bounded by max_concurrency).
+        Returns {discord_id: user}, with None for ids that could not be resolved.
+        """
+        discord_ids = list(dict.fromkeys(discord_ids))
+        users = await asyncio.gather(*(self.resolve(i, guild) for i in discord_ids), return_exceptions=True)
+        return {
+            discord_id: None if isinstance(user, BaseException) else user
+            for discord_id, user in zip(discord_ids, users)
+        }
+
+    async def display_names(self, discord_ids: Iterable[int], guild: Optional[discord.Guild] = None) -> dict[int, str]:
+        """Display name of several users, '#<id>' for the ones that could not be resolved"""
+        users = await self.resolve_many(discord_ids, guild)
+        return {
+            discord_id: user.display_name if user else f"#{discord_id}"
+            for discord_id, user in users.items()
+        }
+
+    async def _fetch(self, discord_id: int) -> discord.abc.User:
+        async with self._semaphore:
+            async with self._rate_lock:
+                delay = self._next_fetch_at - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self._next_fetch_at = time.monotonic() + self.fetch_interval
+
+            try:
+                user = await self.bot.fetch_user(discord_id)
+            except Exception:
+                self._stats['failed'] += 1
+                raise
+
+        self._stats['fetch'] += 1
+        self._cache[discord_id] = (time.monotonic() + self.ttl_seconds, user)
+        return user
@@ -0,0 +1,71 @@
+import argparse
+import sys
+from dotenv import load_dotenv
+from lib.balance_simulator import BalanceSimulator, SimulationParams, format_report
+from lib.config import Config
+
+
+def _range(value: str) -> tuple[int, int]:
+    """Parse 'low-high' (or a single value) into an inclusive range"""
+    low, _, high = value.partition('-')
+    try:
+        return int(low), int(high or low)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected LOW-HIGH, got {value!r}")
+
+
+def main():
+    """
+    Offline balance simulation of the levelup economy.
+    Levelup rules default to the .env settings; every rule and ability amount can be overridden.
+    """
+    load_dotenv()
+    try:
+        config = Config.from_env()
+    except ValueError as e:
+        print(f"ERROR: Invalid configuration - {e}", file=sys.stderr)
+        return 1
+
+    parser = argparse.ArgumentParser(description="Monte-Carlo simulation of the levelup economy")
+    parser.add_argument('--players', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--runs', type=int, default=1, help="independent guilds simulated at once")
+    parser.add_argument('--step-hours', type=int, default=1, help="time resolution (divides 24)")
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--base-chance', type=int, default=config.base_levelup_chance)
+    parser.add_argument('--bonus-per-hour', type=int, default=config.bonus_per_hour)
+    parser.add_argument('--max-chance', type=int, default=config.max_levelup_chance)
+    parser.add_argument('--cooldown-hours', type=int, default=config.levelup_cooldown_hours)
+    parser.add_argument('--active-share', type=float, default=0.8, help="share of players who play")
+    parser.add_argument('--attempts-per-day', type=float, default=3.0, help="mean attempts of an active player")
+    parser.add_argument('--min-chance', type=float, default=0, help="players wait for this chance before attempting")
+    parser.add_argument('--ability-use', type=float, default=0.5, help="daily probability of using an available ability")
+    parser.add_argument('--bless', type=_range, default=(3, 8), metavar='LOW-HIGH')
+    parser.add_argument('--devour', type=_range, default=(3, 8), metavar='LOW-HIGH')
+    parser.add_argument('--curse', type=int, default=5)
+    parser.add_argument('--steal', type=_range, default=(5, 10), metavar='LOW-HIGH')
+    parser.add_argument('--oppress', type=_range, default=(20, 50), metavar='LOW-HIGH')
+    parser.add_argument('--entomb-days', type=_range, default=(1, 2), metavar='LOW-HIGH')
+    args = parser.parse_args()
+
+    try:
+        params = SimulationParams(
+            players=args.players, days=args.days, runs=args.runs, step_hours=args.step_hours, seed=args.seed,
+            base_chance=args.base_chance, bonus_per_hour=args.bonus_per_hour,
+            max_chance=args.max_chance, cooldown_hours=args.cooldown_hours,
+            active_share=args.active_share, attempts_per_day=args.attempts_per_day,
+            min_chance=args.min_chance, ability_use=args.ability_use,
+            bless_range=args.bless, devour_range=args.devour, curse_amount=args.curse,
+            steal_range=args.steal, oppress_range=args.oppress, entomb_days=args.entomb_days,
+        )
+        simulator = BalanceSimulator(params)
+    except (ValueError, RuntimeError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+
+    print(format_report(simulator.run()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
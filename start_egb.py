@@ -1,20 +1,223 @@
+import argparse
+import gzip
+import io
+import json
+import logging
+import os
+import shutil
+import signal
 import subprocess
 import sys
+import threading
+import time
 from datetime import datetime
-import io
+from logging.handlers import RotatingFileHandler
+from typing import Optional
 
 if sys.stdout.encoding != 'utf-8':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 if sys.stderr.encoding != 'utf-8':
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
-timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-output_file = f"out/output_{timestamp}.txt"
-error_file = f"out/error_{timestamp}.txt"
+ROOT = os.path.dirname(os.path.abspath(__file__))
+OUT_DIR = os.path.join(ROOT, "out")
+HEARTBEAT_FILE = os.path.join(OUT_DIR, "egb.heartbeat")  # touched by the bot (LoopMonitor)
+STATE_FILE = os.path.join(OUT_DIR, "supervisor_state.json")
+POLL_SECONDS = 5
+STOP_TIMEOUT_SECONDS = 30
+
+
+def _gzip_rotator(source: str, dest: str):
+    with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+def _output_log(name: str, max_mb: float, keep: int) -> logging.Logger:
+    """Raw lines of the bot written to out/<name>.txt, rotated by size into gzip files"""
+    handler = RotatingFileHandler(
+        os.path.join(OUT_DIR, f"{name}.txt"), maxBytes=int(max_mb * 1024 * 1024), backupCount=keep, encoding='utf-8'
+    )
+    handler.namer = lambda default_name: f"{default_name}.gz"
+    handler.rotator = _gzip_rotator
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger = logging.getLogger(f"supervisor.{name}")
+    logger.propagate = False
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+class Supervisor:
+    """
+    Runs egb.py and restarts it when it crashes or hangs.
+    - Restarts wait an exponential backoff, reset once a run lasted `stable_after` seconds.
+    - A run is hung when the heartbeat file is older than `heartbeat_timeout` (after the
+      startup grace): the bot is stopped, then killed, and restarted.
+    - The bot's stdout/stderr go to out/output.txt and out/error.txt, rotated and gzipped.
+    - Counters (starts, crashes, hangs, crash loop) are kept in out/supervisor_state.json.
+    A clean exit of the bot (exit code 0) or SIGINT/SIGTERM stops the supervisor.
+    """
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.output = _output_log('output', args.max_log_mb, args.keep_logs)
+        self.errors = _output_log('error', args.max_log_mb, args.keep_logs)
+        self.stopping = threading.Event()
+        self.process: Optional[subprocess.Popen] = None
+        self.state = self._load_state()
+
+    # ===== STATE =====
+    def _load_state(self) -> dict:
+        state = {'starts': 0, 'crashes': 0, 'hangs': 0, 'consecutive_failures': 0,
+                 'last_exit_code': None, 'last_failure_at': None}
+        try:
+            with open(STATE_FILE, encoding='utf-8') as f:
+                state.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+        return state
+
+    def _save_state(self):
+        tmp_path = f"{STATE_FILE}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, STATE_FILE)
+
+    def _event(self, message: str):
+        """Supervisor event: on the console and in error.txt, next to the bot's own errors"""
+        line = f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [supervisor] {message}"
+        print(line, flush=True)
+        self.errors.info(line)
+
+    # ===== RUN =====
+    def stop(self, *_):
+        """Signal handler: stop the bot and do not restart it"""
+        self.stopping.set()
+        if self.process and self.process.poll() is None:
+            self._interrupt()
+
+    def _interrupt(self):
+        """
+        Ask the bot to shut down cleanly: SIGINT runs ElderGod.close() (state snapshot, lease release,
+        pending change-feed entries, queued log records). _run_once kills it after STOP_TIMEOUT_SECONDS.
+        """
+        if os.name == 'nt':
+            self.process.terminate()  # no SIGINT for a child process on Windows
+        else:
+            self.process.send_signal(signal.SIGINT)
+
+    def run(self) -> int:
+        backoff = self.args.backoff_initial
+        while not self.stopping.is_set():
+            started_at = time.monotonic()
+            exit_code, hung = self._run_once()
+            runtime = time.monotonic() - started_at
+            if self.stopping.is_set():
+                self._event(f"Stopped (bot exit code {exit_code})")
+                return 0
+            if exit_code == 0 and not hung:
+                self._event("Bot exited cleanly, not restarting")
+                return 0
+
+            if runtime >= self.args.stable_after:
+                backoff = self.args.backoff_initial
+                self.state['consecutive_failures'] = 0
+            self.state['hangs' if hung else 'crashes'] += 1
+            self.state['consecutive_failures'] += 1
+            self.state['last_exit_code'] = exit_code
+            self.state['last_failure_at'] = datetime.now().isoformat(timespec='seconds')
+            self._save_state()
+            self._event(
+                f"Bot {'hung' if hung else 'crashed'} after {runtime:.0f}s (exit code {exit_code}), "
+                f"{self.state['consecutive_failures']} failure(s) in a row, restarting in {backoff}s"
+            )
+            if self.stopping.wait(backoff):
+                break
+            backoff = min(backoff * 2, self.args.backoff_max)
+        return 0
+
+    def _run_once(self) -> tuple[int, bool]:
+        """Start egb.py and wait for it to exit; returns (exit code, killed because hung)"""
+        try:
+            os.remove(HEARTBEAT_FILE)
+        except FileNotFoundError:
+            pass
+        self.process = subprocess.Popen(
+            [sys.executable, "-u", "egb.py"], cwd=ROOT,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, encoding='utf-8', errors='replace'
+        )
+        self.state['starts'] += 1
+        self._save_state()
+        self._event(f"Started egb.py (pid {self.process.pid}, start #{self.state['starts']})")
+
+        pumps = [
+            threading.Thread(target=self._pump, args=(self.process.stdout, self.output), daemon=True),
+            threading.Thread(target=self._pump, args=(self.process.stderr, self.errors), daemon=True),
+        ]
+        for pump in pumps:
+            pump.start()
+
+        hung = False
+        started_at = time.time()
+        while self.process.poll() is None:
+            if self.stopping.wait(POLL_SECONDS):
+                break
+            if self._heartbeat_stale(started_at):
+                hung = True
+                self._event(f"No heartbeat for {self.args.heartbeat_timeout}s, stopping the bot")
+                self._interrupt()
+                break
+
+        try:
+            self.process.wait(STOP_TIMEOUT_SECONDS)
+        except subprocess.TimeoutExpired:
+            self._event("Bot did not stop, killing it")
+            self.process.kill()
+            self.process.wait()
+        for pump in pumps:
+            pump.join(STOP_TIMEOUT_SECONDS)
+        return self.process.returncode, hung
+
+    def _heartbeat_stale(self, started_at: float) -> bool:
+        now = time.time()
+        if now - started_at < self.args.startup_grace:
+            return False
+        try:
+            last_beat = max(os.path.getmtime(HEARTBEAT_FILE), started_at)
+        except OSError:
+            last_beat = started_at + self.args.startup_grace  # never written: count from the end of the grace
+        return now - last_beat > self.args.heartbeat_timeout
+
+    @staticmethod
+    def _pump(stream, logger: logging.Logger):
+        for line in stream:
+            logger.info(line.rstrip('\n'))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run egb.py and restart it when it crashes or hangs")
+    parser.add_argument('--backoff-initial', type=int, default=5, help="first restart delay (s)")
+    parser.add_argument('--backoff-max', type=int, default=300, help="longest restart delay (s)")
+    parser.add_argument('--stable-after', type=int, default=600, help="a run this long (s) resets the backoff")
+    parser.add_argument('--heartbeat-timeout', type=int, default=120, help="hung after this long (s) without heartbeat, 0 disables")
+    parser.add_argument('--startup-grace', type=int, default=300, help="no heartbeat check during startup (s)")
+    parser.add_argument('--max-log-mb', type=float, default=10, help="size of output.txt/error.txt before rotation")
+    parser.add_argument('--keep-logs', type=int, default=5, help="rotated .gz files kept per output")
+    args = parser.parse_args()
+    if args.heartbeat_timeout <= 0:
+        args.heartbeat_timeout = float('inf')
+
+    os.makedirs(OUT_DIR, exist_ok=True)
+    supervisor = Supervisor(args)
+    signal.signal(signal.SIGINT, supervisor.stop)
+    signal.signal(signal.SIGTERM, supervisor.stop)
+
+    print("Starting bot...")
+    print(f"Output: {os.path.join(OUT_DIR, 'output.txt')}")
+    print(f"Errors: {os.path.join(OUT_DIR, 'error.txt')}")
+    return supervisor.run()
 
-print(f"Starting bot...")
-print(f"Output: {output_file}")
-print(f"Errors: {error_file}")
 
-with open(output_file, 'w') as out, open(error_file, 'w') as err:
-    subprocess.run([sys.executable, "-u", "egb.py"], stdout=out, stderr=err)
\ No newline at end of file
+if __name__ == "__main__":
+    sys.exit(main())